@@ -0,0 +1,111 @@
+"""
+Non-blocking jump actuator.
+
+The bots used to do press(space) -> sleep(0.04) -> release(space) inside the
+perception loop, stalling it for more than a frame on every jump. JumpActuator
+owns the keyboard on its own thread instead: tap() only records the request and
+returns, the worker presses the key and releases it when the hold time is up.
+
+Overlapping taps are merged: a tap that arrives while the key is still held (or
+a press is pending) is dropped rather than queued, so a run of "JUMP" frames
+produces one clean jump. cooldown_ms additionally debounces taps that come in
+right after a release.
+"""
+import threading
+import time
+
+from stage_timer import StageHistogram
+
+
+class JumpActuator:
+    def __init__(self, controller, key, hold_ms=40, cooldown_ms=0, clock=time.perf_counter):
+        self.controller = controller
+        self.key = key
+        self.hold_ms = hold_ms
+        self.cooldown_ms = cooldown_ms
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._pending = None     # (request_time, hold_ms) waiting to be pressed
+        self._release_at = None  # Deadline while the key is held
+        self._released_at = float("-inf")
+        self._stop = False
+
+        # Stats
+        self.requested = 0
+        self.pressed = 0
+        self.merged = 0
+        self.debounced = 0
+        self.latency = StageHistogram()  # tap() -> key actually pressed (ms)
+
+        self._thread = threading.Thread(target=self._run, name="actuator", daemon=True)
+        self._thread.start()
+
+    def tap(self, hold_ms=None):
+        """Requests a key tap. Never blocks; returns False if merged/debounced."""
+        now = self.clock()
+        with self._cond:
+            self.requested += 1
+            if self._pending is not None or self._release_at is not None:
+                self.merged += 1
+                return False
+            if (now - self._released_at) * 1000.0 < self.cooldown_ms:
+                self.debounced += 1
+                return False
+            self._pending = (now, self.hold_ms if hold_ms is None else hold_ms)
+            self._cond.notify()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stop or self._pending is not None:
+                        break
+                    if self._release_at is not None:
+                        timeout = self._release_at - self.clock()
+                        if timeout <= 0:
+                            break
+                        self._cond.wait(timeout)
+                    else:
+                        self._cond.wait()
+
+                if self._pending is not None and not self._stop:
+                    requested_at, hold_ms = self._pending
+                    action = "press"
+                elif self._release_at is not None:
+                    action = "release"
+                else:
+                    return  # Stopped with nothing held
+
+            # Talk to the OS outside the lock so tap() never waits on it
+            if action == "press":
+                self.controller.press(self.key)
+                pressed_at = self.clock()
+                with self._cond:
+                    self._pending = None
+                    self._release_at = pressed_at + hold_ms / 1000.0
+                    self.pressed += 1
+                    self.latency.add((pressed_at - requested_at) * 1000.0)
+            else:
+                self.controller.release(self.key)
+                with self._cond:
+                    self._release_at = None
+                    self._released_at = self.clock()
+
+    def close(self):
+        """Stops the worker, releasing the key first if it is held."""
+        with self._cond:
+            self._stop = True
+            self._pending = None
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "pressed": self.pressed,
+            "merged": self.merged,
+            "debounced": self.debounced,
+            "latency": self.latency.summary(),
+        }
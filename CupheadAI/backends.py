@@ -0,0 +1,445 @@
+"""
+Pluggable inference backends for the vision models (the expensive stage of both
+pipelines): the YOLO detector of Pipeline A and the autoencoder of Pipeline B.
+
+Each backend has a name, an artifact next to the original model, an exporter
+and a loader:
+
+    detector: ultralytics (best.pt), onnx, onnx-int8, openvino, openvino-int8,
+              tflite, tflite-int8
+    encoder:  keras (potato_encoder.keras), onnx, onnx-int8, openvino,
+              openvino-int8, tflite, tflite-int8
+
+Detector exports are loaded back through ultralytics.YOLO, so predict() and the
+Results API stay the same and detect_objects() does not change. Encoder backends
+are callables: encoder(input_frames (B, 72, 128, 1) float32) -> (B, 512) ndarray.
+
+int8 variants are calibrated on datasets/raw_images (the frames we labelled, so
+they match what the bots see in the potato fight).
+
+Commands (run from CupheadAI/):
+    python backends.py export encoder onnx-int8
+    python backends.py export detector openvino
+    python backends.py golden             # reference outputs from the default backends
+    python backends.py check [detector|encoder]   # parity vs golden + CPU latency table
+
+Every runtime here (onnxruntime, openvino, nncf, tf2onnx) is optional and only
+imported by the backend that needs it.
+"""
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from detections import boxes_array
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+YOLO_PATH = os.path.join(MODELS_DIR, "best.pt")
+ENCODER_PATH = os.path.join(MODELS_DIR, "potato_encoder.keras")
+CALIBRATION_DIR = os.path.join(BASE_DIR, "..", "datasets", "raw_images")
+DATA_YAML = os.path.join(BASE_DIR, "..", "datasets", "yolov8", "data.yaml")
+GOLDEN_PATH = os.path.join(MODELS_DIR, "golden_outputs.npz")
+
+# Must match play_game_a / play_game_b
+YOLO_IMGSZ = 640
+YOLO_CONF = 0.13
+IMG_WIDTH = 128
+IMG_HEIGHT = 72
+
+# Parity thresholds vs. the golden outputs of the default backends
+ENCODER_MIN_COSINE = {"fp32": 0.9999, "int8": 0.98}
+DETECTOR_MIN_F1 = {"fp32": 0.95, "int8": 0.85}
+
+
+# --- CALIBRATION DATA ---
+def calibration_images(limit=None):
+    """BGR frames from datasets/raw_images, in a stable order."""
+    paths = sorted(glob.glob(os.path.join(CALIBRATION_DIR, "*.jpg")))[:limit]
+    if not paths:
+        raise FileNotFoundError(f"No calibration images in {CALIBRATION_DIR}")
+    return [cv2.imread(p) for p in paths]
+
+
+def encoder_input(bgr):
+    """Same preprocessing as play_game_b.preprocess_frame, from a BGR image."""
+    frame = cv2.resize(bgr, (IMG_WIDTH, IMG_HEIGHT))
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return (frame.astype(np.float32) / 255.0)[None, :, :, None]
+
+
+def detector_input(bgr, size=YOLO_IMGSZ):
+    """Letterboxed NCHW RGB float32, like ultralytics feeds an exported model."""
+    h, w = bgr.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = round(h * scale), round(w * scale)
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(bgr, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    rgb = canvas[:, :, ::-1].transpose(2, 0, 1)
+    return (rgb.astype(np.float32) / 255.0)[None]
+
+
+def calibration_yaml():
+    """A data.yaml whose val split is datasets/raw_images (for ultralytics int8 export)."""
+    names = ['cuphead', 'potato', 'projectile']
+    if os.path.exists(DATA_YAML):
+        with open(DATA_YAML) as f:
+            for line in f:
+                if line.startswith("names:"):
+                    names = [n.strip(" '\"") for n in line.split("[", 1)[1].rsplit("]", 1)[0].split(",")]
+    path = os.path.join(tempfile.mkdtemp(), "calibration.yaml")
+    with open(path, "w") as f:
+        f.write(f"path: {os.path.abspath(CALIBRATION_DIR)}\ntrain: .\nval: .\n")
+        f.write(f"nc: {len(names)}\nnames: {json.dumps(names)}\n")
+    return path
+
+
+class OnnxCalibrationReader:
+    """onnxruntime.quantization CalibrationDataReader over raw_images."""
+    def __init__(self, input_name, make_input, limit=None):
+        self._inputs = iter([{input_name: make_input(img)} for img in calibration_images(limit)])
+
+    def get_next(self):
+        return next(self._inputs, None)
+
+
+def quantize_onnx(fp32_path, int8_path, make_input):
+    from onnxruntime.quantization import QuantType, quantize_static
+    import onnx
+
+    input_name = onnx.load(fp32_path).graph.input[0].name
+    quantize_static(fp32_path, int8_path, OnnxCalibrationReader(input_name, make_input),
+                    weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8)
+
+
+# --- REGISTRY ---
+DETECTORS = {}
+ENCODERS = {}
+
+
+class Backend:
+    def __init__(self, kind, name, artifact, exporter, loader, precision="fp32"):
+        self.kind = kind
+        self.name = name
+        self.artifact = artifact
+        self.exporter = exporter
+        self.loader = loader
+        self.precision = precision
+
+    @property
+    def exported(self):
+        return os.path.exists(self.artifact)
+
+    def export(self):
+        if self.exporter is None:
+            return self.artifact
+        print(f"Exporting {self.kind} -> {self.name} ({self.artifact})...")
+        self.exporter(self)
+        return self.artifact
+
+    def load(self):
+        if not self.exported:
+            self.export()
+        return self.loader(self)
+
+
+def register(registry, kind, name, artifact, exporter=None, loader=None, precision="fp32"):
+    registry[name] = Backend(kind, name, os.path.join(MODELS_DIR, artifact), exporter, loader, precision)
+
+
+# --- DETECTOR (YOLO) ---
+def _load_yolo(backend):
+    from ultralytics import YOLO
+    return YOLO(backend.artifact, task="detect")
+
+
+def _export_yolo(fmt, int8=False):
+    def exporter(backend):
+        from ultralytics import YOLO
+        kwargs = {"format": fmt, "imgsz": YOLO_IMGSZ}
+        if int8:
+            kwargs.update(int8=True, data=calibration_yaml())
+        out = YOLO(YOLO_PATH).export(**kwargs)
+        if os.path.abspath(out) != os.path.abspath(backend.artifact):
+            if os.path.exists(backend.artifact):
+                shutil.rmtree(backend.artifact) if os.path.isdir(backend.artifact) else os.remove(backend.artifact)
+            shutil.move(out, backend.artifact)
+    return exporter
+
+
+def _export_yolo_onnx_int8(backend):
+    fp32 = DETECTORS["onnx"]
+    if not fp32.exported:
+        fp32.export()
+    quantize_onnx(fp32.artifact, backend.artifact, detector_input)
+
+
+register(DETECTORS, "detector", "ultralytics", "best.pt", loader=_load_yolo)
+register(DETECTORS, "detector", "onnx", "best.onnx", _export_yolo("onnx"), _load_yolo)
+register(DETECTORS, "detector", "onnx-int8", "best_int8.onnx", _export_yolo_onnx_int8, _load_yolo, "int8")
+register(DETECTORS, "detector", "openvino", "best_openvino_model", _export_yolo("openvino"), _load_yolo)
+register(DETECTORS, "detector", "openvino-int8", "best_int8_openvino_model",
+         _export_yolo("openvino", int8=True), _load_yolo, "int8")
+register(DETECTORS, "detector", "tflite", "best_float32.tflite", _export_yolo("tflite"), _load_yolo)
+register(DETECTORS, "detector", "tflite-int8", "best_int8.tflite", _export_yolo("tflite", int8=True), _load_yolo, "int8")
+
+
+# --- ENCODER (AUTOENCODER) ---
+class KerasEncoder:
+    def __init__(self, path):
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(path, compile=False)
+
+    def __call__(self, x):
+        return self.model(x, training=False).numpy()
+
+
+class TFLiteEncoder:
+    def __init__(self, path):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=path)
+        self.interpreter.allocate_tensors()
+        self.inp = self.interpreter.get_input_details()[0]
+        self.out = self.interpreter.get_output_details()[0]
+
+    def __call__(self, x):
+        # Float I/O is kept even for int8 models (see _export_encoder_tflite)
+        x = np.asarray(x, dtype=np.float32)
+        if tuple(self.inp["shape"]) != x.shape:
+            # Batched calls (inference_server.py): resize the input once per batch size
+            self.interpreter.resize_tensor_input(self.inp["index"], x.shape)
+            self.interpreter.allocate_tensors()
+            self.inp = self.interpreter.get_input_details()[0]
+            self.out = self.interpreter.get_output_details()[0]
+        self.interpreter.set_tensor(self.inp["index"], x)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.out["index"]).copy()
+
+
+class OnnxEncoder:
+    def __init__(self, path):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x):
+        return self.session.run(None, {self.input_name: np.asarray(x, dtype=np.float32)})[0]
+
+
+class OpenVINOEncoder:
+    def __init__(self, path):
+        import openvino as ov
+        self.compiled = ov.Core().compile_model(path, "CPU")
+        self.output = self.compiled.output(0)
+
+    def __call__(self, x):
+        return self.compiled(np.asarray(x, dtype=np.float32))[self.output]
+
+
+def _keras_encoder():
+    import tensorflow as tf
+    return tf.keras.models.load_model(ENCODER_PATH, compile=False)
+
+
+def _representative_dataset():
+    for img in calibration_images():
+        yield [encoder_input(img)]
+
+
+def _export_encoder_tflite(int8):
+    def exporter(backend):
+        import tensorflow as tf
+        converter = tf.lite.TFLiteConverter.from_keras_model(_keras_encoder())
+        if int8:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = _representative_dataset
+        with open(backend.artifact, "wb") as f:
+            f.write(converter.convert())
+    return exporter
+
+
+def _export_encoder_onnx(backend):
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None, IMG_HEIGHT, IMG_WIDTH, 1), tf.float32, name="frame"),)
+    tf2onnx.convert.from_keras(_keras_encoder(), input_signature=spec, output_path=backend.artifact)
+
+
+def _export_encoder_onnx_int8(backend):
+    fp32 = ENCODERS["onnx"]
+    if not fp32.exported:
+        fp32.export()
+    quantize_onnx(fp32.artifact, backend.artifact, encoder_input)
+
+
+def _export_encoder_openvino(int8):
+    def exporter(backend):
+        import openvino as ov
+        ov_model = ov.convert_model(_keras_encoder(), input=[(-1, IMG_HEIGHT, IMG_WIDTH, 1)])
+        if int8:
+            import nncf
+            data = nncf.Dataset([encoder_input(img) for img in calibration_images()])
+            ov_model = nncf.quantize(ov_model, data)
+        ov.save_model(ov_model, backend.artifact)
+    return exporter
+
+
+register(ENCODERS, "encoder", "keras", "potato_encoder.keras", loader=lambda b: KerasEncoder(b.artifact))
+register(ENCODERS, "encoder", "onnx", "potato_encoder.onnx", _export_encoder_onnx, lambda b: OnnxEncoder(b.artifact))
+register(ENCODERS, "encoder", "onnx-int8", "potato_encoder_int8.onnx", _export_encoder_onnx_int8,
+         lambda b: OnnxEncoder(b.artifact), "int8")
+register(ENCODERS, "encoder", "openvino", "potato_encoder_openvino.xml", _export_encoder_openvino(False),
+         lambda b: OpenVINOEncoder(b.artifact))
+register(ENCODERS, "encoder", "openvino-int8", "potato_encoder_int8_openvino.xml", _export_encoder_openvino(True),
+         lambda b: OpenVINOEncoder(b.artifact), "int8")
+register(ENCODERS, "encoder", "tflite", "potato_encoder.tflite", _export_encoder_tflite(False),
+         lambda b: TFLiteEncoder(b.artifact))
+register(ENCODERS, "encoder", "tflite-int8", "potato_encoder_int8.tflite", _export_encoder_tflite(True),
+         lambda b: TFLiteEncoder(b.artifact), "int8")
+
+
+def load_detector(name="ultralytics"):
+    """YOLO model for play_game_a (exports the backend first if needed)."""
+    return DETECTORS[name].load()
+
+
+def load_encoder(name="keras"):
+    """Encoder callable for play_game_b (exports the backend first if needed)."""
+    return ENCODERS[name].load()
+
+
+# --- GOLDEN OUTPUTS / PARITY ---
+def detect_boxes(model, bgr):
+    """(N, 6) array of [x1, y1, x2, y2, conf, cls] for one frame."""
+    return boxes_array(model.predict(bgr, conf=YOLO_CONF, imgsz=YOLO_IMGSZ, verbose=False)[0])
+
+
+def _iou(a, b):
+    x1, y1 = np.maximum(a[0], b[:, 0]), np.maximum(a[1], b[:, 1])
+    x2, y2 = np.minimum(a[2], b[:, 2]), np.minimum(a[3], b[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = lambda r: (r[..., 2] - r[..., 0]) * (r[..., 3] - r[..., 1])
+    return inter / (area(a) + area(b) - inter + 1e-9)
+
+
+def box_f1(golden, got, iou_thresh=0.5):
+    """Greedy same-class IoU matching of `got` against `golden` boxes -> F1."""
+    if len(golden) == 0 and len(got) == 0:
+        return 1.0
+    matched = 0
+    free = np.ones(len(golden), dtype=bool)
+    for box in got:
+        cand = np.where(free & (golden[:, 5] == box[5]))[0]
+        if len(cand):
+            ious = _iou(box, golden[cand])
+            best = int(np.argmax(ious))
+            if ious[best] >= iou_thresh:
+                free[cand[best]] = False
+                matched += 1
+    return 2 * matched / (len(golden) + len(got))
+
+
+def make_golden(limit=None):
+    """Runs the default backends over the calibration frames and stores their outputs."""
+    images = calibration_images(limit)
+    arrays = {}
+    if ENCODERS["keras"].exported:
+        encoder = load_encoder("keras")
+        arrays["latents"] = np.concatenate([encoder(encoder_input(img)) for img in images])
+    if DETECTORS["ultralytics"].exported:
+        detector = load_detector("ultralytics")
+        boxes = [detect_boxes(detector, img) for img in images]
+        arrays["boxes"] = np.concatenate(boxes) if boxes else np.zeros((0, 6), np.float32)
+        arrays["boxes_per_image"] = np.array([len(b) for b in boxes])
+    np.savez(GOLDEN_PATH, n_images=len(images), **arrays)
+    print(f"Golden outputs for {len(images)} frames -> {GOLDEN_PATH}")
+
+
+def _latency(fn, inputs, repeat=3):
+    fn(inputs[0])  # Warm-up
+    times = []
+    for _ in range(repeat):
+        for x in inputs:
+            t0 = time.perf_counter()
+            fn(x)
+            times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return float(np.mean(times)), times[len(times) // 2], times[int(len(times) * 0.95)]
+
+
+def check(kinds=("encoder", "detector")):
+    """Parity of every exported backend vs the golden outputs, plus a CPU latency table."""
+    try:
+        golden = np.load(GOLDEN_PATH)
+    except FileNotFoundError:
+        print(f"No golden outputs at {GOLDEN_PATH}: run `python backends.py golden` first")
+        return False
+    images = calibration_images(int(golden["n_images"]))
+    rows = []
+    ok = True
+
+    if "encoder" in kinds and "latents" in golden:
+        ref = golden["latents"]
+        inputs = [encoder_input(img) for img in images]
+        for backend in ENCODERS.values():
+            if not backend.exported:
+                continue
+            encoder = backend.load()
+            got = np.concatenate([encoder(x) for x in inputs])
+            cos = np.sum(ref * got, axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(got, axis=1) + 1e-9)
+            passed = float(cos.min()) >= ENCODER_MIN_COSINE[backend.precision]
+            rows.append(("encoder", backend.name, f"min cos {cos.min():.5f}", passed) + _latency(encoder, inputs))
+
+    if "detector" in kinds and "boxes" in golden:
+        split = np.cumsum(golden["boxes_per_image"])[:-1]
+        ref = np.split(golden["boxes"], split)
+        for backend in DETECTORS.values():
+            if not backend.exported:
+                continue
+            detector = backend.load()
+            f1 = np.mean([box_f1(r, detect_boxes(detector, img)) for r, img in zip(ref, images)])
+            passed = f1 >= DETECTOR_MIN_F1[backend.precision]
+            rows.append(("detector", backend.name, f"box F1 {f1:.3f}", passed)
+                        + _latency(lambda img: detect_boxes(detector, img), images))
+
+    print(f"\n{'model':<9} {'backend':<15} {'parity':<18} {'ok':<5} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    print("-" * 76)
+    for kind, name, parity, passed, mean, p50, p95 in rows:
+        ok &= passed
+        print(f"{kind:<9} {name:<15} {parity:<18} {'PASS' if passed else 'FAIL':<5} "
+              f"{mean:>8.2f} {p50:>8.2f} {p95:>8.2f}")
+    return ok
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) == 3 and args[0] == "export":
+        registry = {"detector": DETECTORS, "encoder": ENCODERS}[args[1]]
+        registry[args[2]].export()
+    elif args[:1] == ["golden"]:
+        make_golden()
+    elif args[:1] == ["check"]:
+        sys.exit(0 if check(args[1:] or ("encoder", "detector")) else 1)
+    else:
+        print(__doc__)
+        print("detector backends:", ", ".join(DETECTORS))
+        print("encoder backends: ", ", ".join(ENCODERS))
+
+
+if __name__ == "__main__":
+    main()
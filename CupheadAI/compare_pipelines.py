@@ -0,0 +1,236 @@
+"""
+End-to-end compute cost of Pipeline A vs Pipeline B on the same recorded frames.
+
+pipeline_*_survival.json say how long each bot survives, not what it costs to
+run. This feeds the same gameplay recording through the full stack of each bot
+(A: DetectorInput + YOLO + physics + MLP, B: preprocess + encoder + GRU, i.e.
+the replay.py runners, which use the live bots' preprocessing) and reports, per
+pipeline:
+
+    FPS          sustained decisions per second (frames / time spent in the stack)
+    latency      per-decision mean / p50 / p95 / p99 / max (ms)
+    CPU          process CPU time / wall time while in the stack (100% = one core)
+    RSS          resident memory after loading the models, and the peak
+                 (on macOS without psutil, "after loading" is the peak up to then)
+
+Every pipeline runs in its own process, so peak RSS is its own and model
+runtimes (torch, TensorFlow) don't share warm caches. Video decoding happens
+between the timed steps and is not counted. The first --warmup frames (model
+warm-up, B's 10-frame history) are run but not scored.
+
+Pipelines can carry config overrides (the bots' module constants), so backend
+choices compare in the same table:
+
+    python compare_pipelines.py "[CS156] Pipeline A final gameplay.mp4"
+    python compare_pipelines.py VIDEO a b "a:DETECTOR_BACKEND='onnx'" "b:ENCODER_BACKEND='onnx-int8',GRU_MODE='stateful'"
+    python compare_pipelines.py VIDEO --frames 1800 --output pipeline_benchmark.json
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FRAMES = 1200  # 40 s at 30 FPS
+WARMUP_FRAMES = 30
+
+
+def parse_spec(spec):
+    """'b:ENCODER_BACKEND='onnx',GRU_MODE='stateful'' -> ('b', {'ENCODER_BACKEND': 'onnx', ...})."""
+    pipeline, _, rest = spec.partition(":")
+    if pipeline not in ("a", "b"):
+        raise argparse.ArgumentTypeError(f"Unknown pipeline in {spec!r} (a or b)")
+    overrides = {}
+    for item in filter(None, rest.split(",")):
+        key, _, value = item.partition("=")
+        try:
+            overrides[key.strip()] = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            overrides[key.strip()] = value.strip()  # Bare string
+    return pipeline, overrides
+
+
+def _rss_mb():
+    """(current, peak) resident set size in MB, None where the platform can't say."""
+    current = peak = None
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak /= 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KB elsewhere
+    except ImportError:
+        pass
+    try:
+        import psutil
+        current = psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        try:
+            with open("/proc/self/statm") as f:
+                current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError, AttributeError):
+            current = peak  # No /proc (macOS): the peak so far is the closest figure
+    return current, peak
+
+
+# --- WORKER (one pipeline, own process) ---
+def run_worker(spec, video, start, frames, warmup, crop):
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    import importlib
+    from frame_source import VideoSource
+    from replay import make_runner
+
+    pipeline, overrides = parse_spec(spec)
+    bot = importlib.import_module(f"play_game_{pipeline}")
+    for key, value in overrides.items():
+        if not hasattr(bot, key):
+            raise SystemExit(f"play_game_{pipeline} has no setting {key}")
+        setattr(bot, key, value)
+
+    t_load = time.perf_counter()
+    runner = make_runner(pipeline)
+    load_s = time.perf_counter() - t_load
+    rss_loaded, _ = _rss_mb()
+
+    source = VideoSource(video, size=(bot.MONITOR['width'], bot.MONITOR['height']), crop=crop,
+                         start_frame=start, end_frame=start + warmup + frames)
+    latencies, wall, cpu = [], 0.0, 0.0
+    decisions = jumps = 0
+    n = 0
+    while True:
+        screenshot = source.read()
+        if screenshot is None:
+            break
+        c0, t0 = time.process_time(), time.perf_counter()
+        jump_prob = runner.step(screenshot, source.video_time)
+        t1, c1 = time.perf_counter(), time.process_time()
+        n += 1
+        if n <= warmup:
+            continue
+        latencies.append(t1 - t0)
+        wall += t1 - t0
+        cpu += c1 - c0
+        if jump_prob is not None:
+            decisions += 1
+            jumps += jump_prob > bot.DECISION_THRESH
+    source.close()
+    _, rss_peak = _rss_mb()
+
+    ms = np.array(latencies) * 1000
+    return {
+        "spec": spec,
+        "pipeline": pipeline,
+        "overrides": overrides,
+        "frames": len(latencies),
+        "decisions": decisions,
+        "jumps": int(jumps),
+        "load_seconds": round(load_s, 2),
+        "fps": round(len(latencies) / wall, 2) if wall else None,
+        "latency_ms": {k: round(float(v), 3) for k, v in [
+            ("mean", ms.mean() if len(ms) else np.nan),
+            ("p50", np.percentile(ms, 50) if len(ms) else np.nan),
+            ("p95", np.percentile(ms, 95) if len(ms) else np.nan),
+            ("p99", np.percentile(ms, 99) if len(ms) else np.nan),
+            ("max", ms.max() if len(ms) else np.nan),
+        ]},
+        "cpu_percent": round(100 * cpu / wall, 1) if wall else None,
+        "rss_loaded_mb": None if rss_loaded is None else round(rss_loaded, 1),
+        "rss_peak_mb": None if rss_peak is None else round(rss_peak, 1),
+    }
+
+
+# --- DRIVER ---
+def _fmt(value, spec=".1f"):
+    return "-" if value is None else format(value, spec)
+
+
+def print_table(results):
+    header = (f"{'pipeline':<36} {'frames':>6} {'FPS':>7} {'mean':>7} {'p50':>7} {'p95':>7} {'p99':>7} "
+              f"{'max':>7} {'CPU %':>6} {'RSS load':>9} {'RSS peak':>9}")
+    print(header)
+    print(f"{'':<36} {'':>6} {'':>7} {'(ms)':>7} {'(ms)':>7} {'(ms)':>7} {'(ms)':>7} {'(ms)':>7} "
+          f"{'':>6} {'(MB)':>9} {'(MB)':>9}")
+    print("-" * len(header))
+    for r in results:
+        if "error" in r:
+            print(f"{r['spec']:<36} failed: {r['error']}")
+            continue
+        lat = r["latency_ms"]
+        print(f"{r['spec']:<36} {r['frames']:>6} {_fmt(r['fps']):>7} {lat['mean']:>7.2f} {lat['p50']:>7.2f} "
+              f"{lat['p95']:>7.2f} {lat['p99']:>7.2f} {lat['max']:>7.2f} {_fmt(r['cpu_percent'], '.0f'):>6} "
+              f"{_fmt(r['rss_loaded_mb'], '.0f'):>9} {_fmt(r['rss_peak_mb'], '.0f'):>9}")
+
+
+def run_all(specs, video, start, frames, warmup, crop):
+    """Runs every pipeline spec in a fresh interpreter and collects their results."""
+    results = []
+    for spec in specs:
+        print(f"--- {spec} ---", flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "result.json")
+            cmd = [sys.executable, os.path.abspath(__file__), os.path.abspath(video),
+                   "--worker", spec, "--result", out,
+                   "--start", str(start), "--frames", str(frames), "--warmup", str(warmup)]
+            if crop:
+                cmd += ["--crop", *(str(crop[k]) for k in ("top", "left", "width", "height"))]
+            proc = subprocess.run(cmd, cwd=BASE_DIR)  # Workers import the bots from here
+            if proc.returncode != 0 or not os.path.exists(out):
+                results.append({"spec": spec, "error": f"worker exited with {proc.returncode}"})
+                continue
+            with open(out) as f:
+                results.append(json.load(f))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline A vs B: FPS, latency, CPU and memory on a recording.")
+    parser.add_argument("video", help='Recording to replay, e.g. "[CS156] Pipeline A final gameplay.mp4"')
+    parser.add_argument("pipelines", nargs="*", default=["a", "b"],
+                        help="a, b, or with overrides: \"b:ENCODER_BACKEND='onnx',GRU_MODE='stateful'\"")
+    parser.add_argument("--start", type=int, default=0, help="First frame")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="Scored frames per pipeline")
+    parser.add_argument("--warmup", type=int, default=WARMUP_FRAMES, help="Unscored frames first")
+    parser.add_argument("--crop", type=int, nargs=4, metavar=("TOP", "LEFT", "W", "H"),
+                        help="Game region inside the video (as in replay.py)")
+    parser.add_argument("--output", help="Also write the report as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    crop = None
+    if args.crop:
+        top, left, w, h = args.crop
+        crop = {'top': top, 'left': left, 'width': w, 'height': h}
+
+    if args.worker:
+        result = run_worker(args.worker, args.video, args.start, args.frames, args.warmup, crop)
+        with open(args.result, "w") as f:
+            json.dump(result, f)
+        return
+
+    for spec in args.pipelines:
+        parse_spec(spec)  # Fail early on typos
+    results = run_all(args.pipelines, args.video, args.start, args.frames, args.warmup, crop)
+    print(f"\n{os.path.basename(args.video)}: frames {args.start}+{args.warmup} warm-up, "
+          f"up to {args.frames} scored | {platform.platform()}, {os.cpu_count()} CPUs\n")
+    print_table(results)
+    if args.output:
+        report = {
+            "video": args.video, "start": args.start, "warmup": args.warmup, "frames": args.frames,
+            "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                        "cpu_count": os.cpu_count(), "python": platform.python_version()},
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Precomputed decision lookup table for Pipeline A.
+
+The MLP only ever sees the normalized (dist_x, dist_y, velocity) triple, so its
+whole decision surface (the "MLP Decision Boundary Heatmap") can be sampled once
+on a grid and answered per frame with an O(1) lookup instead of a forward pass.
+
+The table is a float32 .npy of jump probabilities, memory-mapped on load, with a
+.json sidecar describing the grid and the model it was sampled from. Inputs
+outside the grid are clamped to its edge (dist_x = 1.0 is the "no projectile"
+state, so the default dist_x range includes it).
+
+Run this file to build the table and report its deviation from the real model.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from numpy_runtime import MLP_PATH, file_hash, load_or_export
+
+LUT_PATH = os.path.splitext(MLP_PATH)[0] + "_lut.npy"
+
+# (min, max, points) per normalized state dimension. The capture is 719x399, so
+# real distances stay within ~0.6; dist_x = 1.0 is the "no projectile" state.
+# ~0.01 spacing: 9.4 MB, decision flips on <0.1% of random states.
+DEFAULT_GRID = (
+    (-0.6, 1.0, 161),  # dist_x / 1280
+    (-0.6, 0.6, 121),  # dist_y / 720
+    (-1.5, 1.5, 121),  # velocity / 50
+)
+
+
+class DecisionLUT:
+    """Drop-in for the MLP: predict((B, 3)) -> (B, 1) jump probabilities."""
+    def __init__(self, table, grid, interpolate=True, source_hash=None):
+        self.table = table
+        self.grid = tuple(tuple(g) for g in grid)
+        self.interpolate = interpolate
+        self.source_hash = source_hash
+        self.lo = np.array([g[0] for g in grid], dtype=np.float64)
+        self.hi = np.array([g[1] for g in grid], dtype=np.float64)
+        self.n = np.array([g[2] for g in grid])
+        self.step = (self.hi - self.lo) / (self.n - 1)
+        # Plain-Python views for the single-sample fast path: indexing a
+        # memoryview is much cheaper than indexing a numpy memmap
+        self._flat = memoryview(np.ascontiguousarray(table).reshape(-1)).cast("B").cast("f")
+        self._lo = self.lo.tolist()
+        self._hi = self.hi.tolist()
+        self._inv_step = (1.0 / self.step).tolist()
+        self._last = (self.n - 1).tolist()
+        ny, nz = int(self.n[1]), int(self.n[2])
+        self._strides = (ny * nz, nz)
+
+    # --- Build / save / load ---
+    @classmethod
+    def build(cls, model, grid=DEFAULT_GRID, path=None, interpolate=True, source_hash=None, batch=65536):
+        """Samples `model` (anything with a batched predict) on the grid."""
+        axes = [np.linspace(lo, hi, n, dtype=np.float32) for lo, hi, n in grid]
+        shape = tuple(n for _, _, n in grid)
+        if path:
+            table = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+        else:
+            table = np.empty(shape, dtype=np.float32)
+        points = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+        flat = table.reshape(-1)
+        for i in range(0, len(points), batch):
+            flat[i:i + batch] = model.predict(points[i:i + batch])[:, 0]
+        if path:
+            table.flush()
+            with open(path + ".json", "w") as f:
+                json.dump({"grid": grid, "source_hash": source_hash}, f, indent=4)
+            table = np.load(path, mmap_mode="r")
+        return cls(table, grid, interpolate, source_hash)
+
+    @classmethod
+    def load(cls, path, interpolate=True):
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        return cls(np.load(path, mmap_mode="r"), meta["grid"], interpolate, meta.get("source_hash"))
+
+    # --- Lookup ---
+    def lookup(self, dist_x, dist_y, velocity):
+        """Single normalized state -> probability, in plain Python (no array overhead)."""
+        g = []
+        for v, lo, hi, inv in zip((dist_x, dist_y, velocity), self._lo, self._hi, self._inv_step):
+            v = lo if v < lo else hi if v > hi else v
+            g.append((v - lo) * inv)
+        t = self._flat
+        sx, sy = self._strides
+        if not self.interpolate:
+            return t[int(g[0] + 0.5) * sx + int(g[1] + 0.5) * sy + int(g[2] + 0.5)]
+
+        i, j, k = (min(int(v), last - 1) for v, last in zip(g, self._last))
+        fx, fy, fz = g[0] - i, g[1] - j, g[2] - k
+        o = i * sx + j * sy + k
+        c00 = t[o] * (1 - fz) + t[o + 1] * fz
+        c01 = t[o + sy] * (1 - fz) + t[o + sy + 1] * fz
+        o += sx
+        c10 = t[o] * (1 - fz) + t[o + 1] * fz
+        c11 = t[o + sy] * (1 - fz) + t[o + sy + 1] * fz
+        c0 = c00 * (1 - fy) + c01 * fy
+        c1 = c10 * (1 - fy) + c11 * fy
+        return c0 * (1 - fx) + c1 * fx
+
+    def predict(self, x):
+        """Batched lookup. x: (B, 3) normalized states -> (B, 1)."""
+        x = np.asarray(x, dtype=np.float64).reshape(-1, 3)
+        if len(x) == 1:
+            return np.array([[self.lookup(*x[0])]], dtype=np.float32)
+
+        g = (np.clip(x, self.lo, self.hi) - self.lo) / self.step
+        if not self.interpolate:
+            i, j, k = np.rint(g).astype(np.intp).T
+            return np.asarray(self.table[i, j, k], dtype=np.float32)[:, None]
+
+        idx = np.minimum(np.floor(g).astype(np.intp), self.n - 2)
+        f = g - idx
+        out = np.zeros(len(x))
+        for dx in (0, 1):
+            wx = f[:, 0] if dx else 1 - f[:, 0]
+            for dy in (0, 1):
+                wy = f[:, 1] if dy else 1 - f[:, 1]
+                for dz in (0, 1):
+                    wz = f[:, 2] if dz else 1 - f[:, 2]
+                    out += wx * wy * wz * self.table[idx[:, 0] + dx, idx[:, 1] + dy, idx[:, 2] + dz]
+        return out.astype(np.float32)[:, None]
+
+
+def load_or_build(keras_path=MLP_PATH, path=LUT_PATH, grid=DEFAULT_GRID, interpolate=True):
+    """Loads the LUT, rebuilding it if missing, sampled on another grid or from another model."""
+    source_hash = file_hash(keras_path) if os.path.exists(keras_path) else None
+    if os.path.exists(path) and os.path.exists(path + ".json"):
+        lut = DecisionLUT.load(path, interpolate)
+        if lut.grid == tuple(tuple(g) for g in grid) and lut.source_hash in (source_hash, None):
+            return lut
+    print(f"Building decision LUT {path}...")
+    model = load_or_export(keras_path)
+    return DecisionLUT.build(model, grid, path, interpolate, source_hash)
+
+
+def max_deviation(lut, model, n=200000, threshold=0.78, seed=0):
+    """
+    Max |LUT - model| over random states inside the grid (mostly off-grid points,
+    the worst case for the table), plus how often the jump decision flips.
+    """
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(lut.lo, lut.hi, size=(n, 3)).astype(np.float32)
+    ref = model.predict(x)[:, 0]
+    got = lut.predict(x)[:, 0]
+    err = np.abs(ref - got)
+    flips = np.mean((ref > threshold) != (got > threshold))
+    return float(err.max()), float(err.mean()), float(flips)
+
+
+def main():
+    model = load_or_export(MLP_PATH)
+    lut = load_or_build()
+    state = (0.2, -0.05, -0.3)
+
+    for interpolate in (True, False):
+        lut.interpolate = interpolate
+        worst, mean, flips = max_deviation(lut, model)
+        name = "trilinear" if interpolate else "nearest"
+        print(f"{name:<10}: max |lut - mlp| = {worst:.4f}, mean = {mean:.5f}, "
+              f"decision flips @ 0.78 = {flips:.3%}")
+
+    lut.interpolate = True
+    single = np.array([state], dtype=np.float32)
+    for name, fn in [("mlp (numpy)", lambda: model.predict(single)),
+                     ("lut lookup()", lambda: lut.lookup(*state)),
+                     ("lut predict()", lambda: lut.predict(single))]:
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(20000):
+            fn()
+        print(f"{name:<14}: {(time.perf_counter() - t0) / 20000 * 1e6:6.2f} us/decision")
+
+
+if __name__ == "__main__":
+    main()
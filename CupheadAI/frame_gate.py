@@ -0,0 +1,140 @@
+"""
+Change-detection gate: skip the models on frames that did not change.
+
+Both bots run their full model stack on every capture, even when the screen is
+the same as last time (idle moments, duplicate grabs when the loop outruns the
+game's frame rate). FrameGate samples every 8th pixel of each BGRA capture,
+averages 2x2 blocks of those into a ~45x25 thumbnail (one cell per 16x16 px,
+so a little noise cancels out) and compares it to the thumbnail of the last
+frame that was actually processed:
+
+    gate = FrameGate(threshold=8)
+    if gate.changed(screenshot):
+        ...run the models...
+    else:
+        ...reuse the last detection / latent / decision...
+
+A frame counts as changed when any thumbnail cell moved by more than
+`threshold` levels (0-255) in any channel; the max rather than the mean, so one
+small projectile moving is enough. Comparing against the last *processed*
+frame means slow drift still adds up to a change. At most `max_skip` frames in
+a row are skipped, and threshold 0 turns the gate off.
+
+    python frame_gate.py                                  # cost of changed() on a capture-sized frame
+    python frame_gate.py VIDEO --thresholds 2 4 8 16      # how many frames each sensitivity would skip
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+GATE_THRESHOLD = 8     # Levels a thumbnail cell must change by (higher = skips more)
+GATE_STEP = 8          # Sample every Nth pixel of the capture...
+GATE_POOL = 2          # ...and average PxP blocks of samples: one cell per 16x16 capture pixels
+GATE_MAX_SKIP = 30     # Never skip more than this many frames in a row
+CAPTURE_SIZE = (719, 399)  # Both bots' MONITOR region
+
+
+class FrameGate:
+    """
+    threshold: per-cell change (0-255) below which a frame is "unchanged"; 0 = gate off.
+    step, pool: thumbnail = PxP averages of every step-th pixel (a full resize
+               of the capture costs ~30x more than this).
+    max_skip:  process at least one frame in every max_skip + 1.
+    """
+    def __init__(self, threshold=GATE_THRESHOLD, step=GATE_STEP, pool=GATE_POOL, max_skip=GATE_MAX_SKIP):
+        self.threshold = threshold
+        self.step = step
+        self.pool = pool
+        self.max_skip = max_skip
+        self.checked = 0
+        self.skipped = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets the reference frame: the next frame is always processed."""
+        self.reference = None
+        self.run = 0            # Frames skipped in a row
+        self.last_change = 0.0  # Largest cell change of the last frame checked
+
+    def changed(self, frame):
+        """True if `frame` (BGRA or BGR) must be processed, False if the last result still holds."""
+        self.checked += 1
+        if self.threshold <= 0:
+            return True
+        thumb = self.thumbnail(frame)
+        if self.reference is not None and self.run < self.max_skip:
+            self.last_change = float(cv2.absdiff(thumb, self.reference).max())
+            if self.last_change <= self.threshold:
+                self.run += 1
+                self.skipped += 1
+                return False
+        self.reference = thumb
+        self.run = 0
+        return True
+
+    def thumbnail(self, frame):
+        p = self.pool
+        samples = frame[::self.step, ::self.step]
+        h, w = samples.shape[0] // p, samples.shape[1] // p
+        return cv2.resize(samples[:h * p, :w * p], (w, h), interpolation=cv2.INTER_AREA)
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def summary(self):
+        return f"Gate: skipped {self.skipped} / {self.checked} frames ({self.skip_ratio:.1%})"
+
+
+# --- MEASUREMENT ---
+def bench(n=2000, size=CAPTURE_SIZE):
+    """us per changed() call on a capture-sized BGRA frame."""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (size[1], size[0], 4), dtype=np.uint8)
+    gate = FrameGate()
+    gate.changed(frame)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        gate.changed(frame)
+    print(f"changed() on {size[0]}x{size[1]} BGRA: {(time.perf_counter() - t0) / n * 1e6:.1f} us")
+
+
+def sweep(video, thresholds, start=0, end=None, crop=None):
+    """Share of a recording's frames each threshold would skip (no models involved)."""
+    from frame_source import VideoSource
+    gates = [FrameGate(th) for th in thresholds]
+    source = VideoSource(video, size=CAPTURE_SIZE, crop=crop, start_frame=start, end_frame=end)
+    while True:
+        screenshot = source.read()
+        if screenshot is None:
+            break
+        for gate in gates:
+            gate.changed(screenshot)
+    source.close()
+    print(f"{'threshold':>9} {'skipped':>9}")
+    for th, gate in zip(thresholds, gates):
+        print(f"{th:>9g} {gate.skip_ratio:>9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost / skip rate of the change-detection gate.")
+    parser.add_argument("video", nargs="?", help="Recording to measure skip rates on")
+    parser.add_argument("--thresholds", type=float, nargs="*", default=[2, 4, 8, 16, 32])
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=None)
+    parser.add_argument("--crop", type=int, nargs=4, metavar=("TOP", "LEFT", "W", "H"),
+                        help="Game region inside the video (as in replay.py)")
+    args = parser.parse_args()
+    bench()
+    if args.video:
+        crop = None
+        if args.crop:
+            top, left, w, h = args.crop
+            crop = {'top': top, 'left': left, 'width': w, 'height': h}
+        sweep(args.video, args.thresholds, args.start, args.end, crop)
+
+
+if __name__ == "__main__":
+    main()
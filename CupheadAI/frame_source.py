@@ -0,0 +1,84 @@
+"""
+Frame sources for the bots.
+
+Both pipelines only need "give me the next BGRA frame of the game region".
+ScreenSource does that live through mss (what the bots always did);
+VideoSource does it from a recorded gameplay video so the same code can run
+headless (see replay.py).
+"""
+import cv2
+
+from preprocess import bgra_view
+
+
+class ScreenSource:
+    """Live screen capture of a monitor region through mss."""
+    def __init__(self, monitor):
+        # Imported here so headless replays don't need mss installed.
+        # mss handles are per-thread: create the source in the thread that reads it.
+        import mss
+        self.monitor = monitor
+        self.sct = mss.mss()
+        self.frame_idx = -1
+
+    def read(self):
+        """
+        Returns the next frame as a (H, W, 4) BGRA array. Raises on capture failure.
+        The array views the grab's own buffer (no copy); every grab gets a new buffer,
+        so frames stay valid after the next read().
+        """
+        frame = bgra_view(self.sct.grab(self.monitor))
+        self.frame_idx += 1
+        return frame
+
+    def close(self):
+        self.sct.close()
+
+
+class VideoSource:
+    """
+    Replays a gameplay recording as if it were the live capture.
+    Frames are returned as BGRA at the bot's capture size, like mss would.
+
+    crop: optional {'top', 'left', 'width', 'height'} region of the video to use
+          (pass the bot's MONITOR if the video is a full-screen recording).
+    size: (width, height) the frames are resized to after cropping.
+    """
+    def __init__(self, path, size=None, crop=None, start_frame=0, end_frame=None):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if self.fps <= 0: self.fps = 30.0
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.size = size
+        self.crop = crop
+        self.end_frame = end_frame
+        if start_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        self.frame_idx = start_frame - 1
+
+    @property
+    def video_time(self):
+        """Seconds into the recording of the last frame returned."""
+        return self.frame_idx / self.fps
+
+    def read(self):
+        """Returns the next frame as a (H, W, 4) BGRA array, or None at the end."""
+        if self.end_frame is not None and self.frame_idx + 1 >= self.end_frame:
+            return None
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.frame_idx += 1
+
+        if self.crop:
+            c = self.crop
+            frame = frame[c['top']:c['top'] + c['height'], c['left']:c['left'] + c['width']]
+        if self.size and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+
+    def close(self):
+        self.cap.release()
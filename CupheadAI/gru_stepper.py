@@ -0,0 +1,246 @@
+"""
+Incremental GRU decisions for Pipeline B.
+
+play_game_b.py rebuilds a (1, 10, 512) tensor and re-runs the whole 2-layer GRU
+on every frame. GRUStepper reuses the trained weights in NumPy and only does the
+work that is actually new for each frame:
+
+  "window"   -> Exact. Keeps a ring buffer of the first GRU layer's input
+                projections (latent @ W + b), so each latent is projected once
+                instead of 10 times. The cheap recurrent part is re-run over the
+                10-step window, which matches gru_model within float tolerance.
+  "stateful" -> Approximate. Carries the hidden states of both GRU layers from
+                frame to frame, so each latent costs exactly one recurrent step.
+                The state is not reset every 10 frames, so it remembers more than
+                the training window did; use verify() to check decisions agree.
+
+Run this file directly to verify against potato_gru.keras and benchmark the
+per-frame cost of each mode.
+"""
+import os
+import time
+
+import numpy as np
+
+from numpy_runtime import DenseLayer, GRULayer, NumpyModel, load_or_export
+
+SEQUENCE_LENGTH = 10
+LATENT_DIM = 512
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GRU_PATH = os.path.join(BASE_DIR, "models", "potato_gru.keras")
+
+
+class LatentRingBuffer:
+    """
+    Fixed-size ring buffer of row vectors.
+    Every row is written twice (at i and i + length) so the last `length` rows
+    are always one contiguous slice: window() never copies.
+    """
+    def __init__(self, length, dim, dtype=np.float32):
+        self.length = length
+        self._buf = np.zeros((2 * length, dim), dtype=dtype)
+        self._next = 0
+        self.count = 0
+
+    def push(self, row):
+        i = self._next
+        self._buf[i] = row
+        self._buf[i + self.length] = row
+        self._next = (i + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+
+    @property
+    def full(self):
+        return self.count == self.length
+
+    def window(self):
+        """Returns the last `length` rows, oldest first, as a view."""
+        return self._buf[self._next:self._next + self.length]
+
+    def reset(self):
+        self._next = 0
+        self.count = 0
+
+
+class GRUStepper:
+    """
+    Drop-in replacement for the sequence_buffer + gru_model call in play_game_b.
+    push(latent) returns the jump probability, or None while the window is filling.
+    """
+    def __init__(self, model, mode="window", sequence_length=SEQUENCE_LENGTH):
+        """model: NumpyModel of potato_gru (GRU -> GRU -> Dense)."""
+        if mode not in ("window", "stateful"):
+            raise ValueError(f"Unknown mode: {mode}")
+        kinds = [type(l) for l in model.layers]
+        if kinds != [GRULayer, GRULayer, DenseLayer]:
+            raise ValueError("Expected GRU -> GRU -> Dense, got: " + ", ".join(k.__name__ for k in kinds))
+        self.gru1, self.gru2, self.dense = model.layers
+        self.mode = mode
+        self.sequence_length = sequence_length
+        self.projections = LatentRingBuffer(sequence_length, 3 * self.gru1.units)
+        self.reset()
+
+    @classmethod
+    def from_keras(cls, gru_model, mode="window"):
+        return cls(NumpyModel.from_keras(gru_model), mode=mode)
+
+    @classmethod
+    def load(cls, keras_path=GRU_PATH, mode="window"):
+        """From the exported .npz (see numpy_runtime.py) - no TensorFlow needed."""
+        return cls(load_or_export(keras_path), mode=mode)
+
+    def reset(self):
+        """Forget all history (call on resume, like clearing sequence_buffer)."""
+        self.projections.reset()
+        self.h1 = np.zeros(self.gru1.units, dtype=np.float32)
+        self.h2 = np.zeros(self.gru2.units, dtype=np.float32)
+        self.seen = 0
+
+    def _head(self, h):
+        return float(self.dense(h)[0])
+
+    def push(self, latent):
+        x_proj = self.gru1.project(np.asarray(latent, dtype=np.float32).reshape(-1))
+        self.seen += 1
+
+        if self.mode == "stateful":
+            self.h1 = self.gru1.step(x_proj, self.h1)
+            self.h2 = self.gru2.step(self.gru2.project(self.h1), self.h2)
+            if self.seen < self.sequence_length:
+                return None
+            return self._head(self.h2)
+
+        self.projections.push(x_proj)
+        if not self.projections.full:
+            return None
+        seq1 = self.gru1.run(self.projections.window())
+        seq2 = self.gru2.run(self.gru2.project(seq1))
+        return self._head(seq2[-1])
+
+
+def window_probabilities(model, latents, resets=(), batch_size=4096, sequence_length=SEQUENCE_LENGTH):
+    """
+    Jump probability for every frame of a whole recording at once: frame i gets
+    the GRU output over latents[i - 9 .. i], exactly what GRUStepper("window")
+    returns live. Each latent is projected once, then all sliding windows run
+    through both GRU layers in batches.
+
+    model:   NumpyModel of potato_gru.
+    latents: (N, 512), e.g. a memory-mapped latent cache (see latent_cache.py).
+    resets:  frames where the bot cleared its history (run starts); windows
+             reaching back across one are NaN, like the live bot's None.
+    Returns (N,) float32, NaN while a window is filling.
+    """
+    gru1, gru2, dense = model.layers
+    n = len(latents)
+    probs = np.full(n, np.nan, dtype=np.float32)
+    if n < sequence_length:
+        return probs
+    # First frame each window may start at (history only reaches back to the last reset)
+    floor = np.zeros(n, dtype=np.int64)
+    for r in sorted(resets):
+        if 0 < r < n:
+            floor[r:] = r
+    for start in range(sequence_length - 1, n, batch_size):
+        end = min(start + batch_size, n)
+        lo = start - sequence_length + 1
+        proj = gru1.project(np.asarray(latents[lo:end], dtype=np.float32))
+        windows = np.lib.stride_tricks.sliding_window_view(proj, sequence_length, axis=0)
+        windows = np.ascontiguousarray(windows.transpose(0, 2, 1))  # (B, T, 3*units)
+        seq1 = gru1.run(windows)
+        seq2 = gru2.run(gru2.project(seq1))
+        probs[start:end] = dense(seq2[:, -1, :])[:, 0]
+    frames = np.arange(n)
+    probs[frames - sequence_length + 1 < floor] = np.nan
+    return probs
+
+
+def verify(gru_model, n_frames=300, tol=1e-4, threshold=0.36, seed=0):
+    """
+    Streams random latents through both stepper modes and gru_model's full-window
+    call. "window" must match within `tol`; for "stateful" the deviation and the
+    fraction of frames with the same jump decision are reported.
+    """
+    import tensorflow as tf
+
+    rng = np.random.default_rng(seed)
+    latents = rng.normal(size=(n_frames, LATENT_DIM)).astype(np.float32)
+    window = GRUStepper.from_keras(gru_model, mode="window")
+    stateful = GRUStepper.from_keras(gru_model, mode="stateful")
+
+    window_err = 0.0
+    stateful_err = 0.0
+    agree = 0
+    compared = 0
+    for i, z in enumerate(latents):
+        p_window = window.push(z)
+        p_stateful = stateful.push(z)
+        if i + 1 < SEQUENCE_LENGTH:
+            continue
+        seq = latents[i + 1 - SEQUENCE_LENGTH:i + 1][None]
+        p_ref = float(gru_model(tf.constant(seq), training=False)[0][0])
+        window_err = max(window_err, abs(p_window - p_ref))
+        stateful_err = max(stateful_err, abs(p_stateful - p_ref))
+        agree += (p_stateful > threshold) == (p_ref > threshold)
+        compared += 1
+
+    print(f"window   : max |p - p_keras| = {window_err:.2e} over {compared} frames "
+          f"({'OK' if window_err <= tol else 'FAIL'}, tol={tol:g})")
+    print(f"stateful : max |p - p_keras| = {stateful_err:.2e}, "
+          f"decision agreement @ {threshold} = {agree / max(compared, 1):.1%}")
+    return window_err <= tol
+
+
+def benchmark(gru_model, n_frames=300, seed=0):
+    """Per-frame cost of the original list + tf.concat path vs. both stepper modes."""
+    import tensorflow as tf
+
+    rng = np.random.default_rng(seed)
+    latents = [rng.normal(size=(1, LATENT_DIM)).astype(np.float32) for _ in range(n_frames)]
+    tf_latents = [tf.constant(z) for z in latents]
+
+    def run_original():
+        sequence_buffer = []
+        for z in tf_latents:
+            sequence_buffer.append(z)
+            if len(sequence_buffer) > SEQUENCE_LENGTH:
+                sequence_buffer.pop(0)
+            if len(sequence_buffer) == SEQUENCE_LENGTH:
+                seq_input = tf.concat([tf.expand_dims(v, axis=1) for v in sequence_buffer], axis=1)
+                float(gru_model(seq_input, training=False)[0][0])
+
+    def run_stepper(mode):
+        stepper = GRUStepper.from_keras(gru_model, mode=mode)
+        def run():
+            stepper.reset()
+            for z in latents:
+                stepper.push(z)
+        return run
+
+    print(f"{'mode':<10} {'ms/frame':>10} {'speedup':>8}")
+    base = None
+    for name, fn in [("original", run_original),
+                     ("window", run_stepper("window")),
+                     ("stateful", run_stepper("stateful"))]:
+        fn()  # Warm-up (graph tracing, BLAS init)
+        t0 = time.perf_counter()
+        fn()
+        ms = (time.perf_counter() - t0) * 1000 / n_frames
+        base = base or ms
+        print(f"{name:<10} {ms:>10.3f} {base / ms:>7.1f}x")
+
+
+def main():
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+    import tensorflow as tf
+
+    gru_model = tf.keras.models.load_model(GRU_PATH, compile=False)
+    print("--- Verify (stepper vs gru_model) ---")
+    verify(gru_model)
+    print("\n--- Benchmark ---")
+    benchmark(gru_model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,488 @@
+"""
+Local inference server shared by several bot processes.
+
+Every play_game_a / play_game_b instance normally loads its own YOLO,
+TensorFlow and models. With this server running, the models are loaded once and
+bots send it their inputs over a Unix socket (set INFERENCE_SERVER in the bot):
+
+    python inference_server.py serve                 # detector, encoder, mlp, gru
+    python inference_server.py serve --max-batch 8 --max-wait-ms 3
+    python inference_server.py bench --clients 4     # load test with synthetic inputs
+
+Dynamic batching: requests for the same model from all clients are queued; the
+batcher runs as soon as `max_batch` rows are waiting, every connection using the
+model has a request queued (each connection has at most one in flight), or the
+oldest request has waited `max_wait_ms`, whichever comes first.
+
+Models (input rows -> output rows):
+    detector  (H, W, 3) BGR uint8 frame -> (N, 6) boxes [x1, y1, x2, y2, conf, cls]
+    encoder   (72, 128, 1) float32      -> (512,) latent
+    mlp       (3,) normalized state     -> (1,) jump probability
+    gru       (10, 512) latent window   -> (1,) jump probability
+
+Per-client latency (queue wait + total, measured in the server) and per-model
+batch sizes are printed every --report-every seconds and on shutdown.
+
+The socket lives in a per-user 0700 directory ($XDG_RUNTIME_DIR/cuphead, else
+<tmp>/cuphead-<uid>) and connections must pass an HMAC challenge before any
+message is unpickled. The key comes from $CUPHEAD_INFERENCE_KEY or, failing
+that, a 0600 key file next to the socket that the first server/client creates.
+"""
+import argparse
+import collections
+import os
+import secrets
+import stat
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+import numpy as np
+
+from gru_stepper import SEQUENCE_LENGTH, LatentRingBuffer
+from numpy_runtime import GRU_PATH, MLP_PATH, load_or_export
+from stage_timer import StageHistogram
+
+SOCKET_DIR = (os.path.join(os.environ["XDG_RUNTIME_DIR"], "cuphead") if os.environ.get("XDG_RUNTIME_DIR")
+              else os.path.join(tempfile.gettempdir(), f"cuphead-{os.getuid()}"))
+DEFAULT_SOCKET = os.path.join(SOCKET_DIR, "cuphead_inference.sock")
+KEY_ENV = "CUPHEAD_INFERENCE_KEY"  # Hex key; overrides the key file
+KEY_FILE = os.path.join(SOCKET_DIR, "cuphead_inference.key")
+MODELS = ("detector", "encoder", "mlp", "gru")
+YOLO_CONF = 0.13  # Same as play_game_a
+
+
+# --- ACCESS CONTROL ---
+def _check_private(path, st):
+    """Refuses files / directories other users own or can reach."""
+    if st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) & 0o077:
+        raise PermissionError(f"{path} must be owned by you and not accessible to others "
+                              f"(owner uid {st.st_uid}, mode {stat.S_IMODE(st.st_mode):o})")
+
+
+def private_dir(path):
+    """Creates `path` as a 0700 directory, or checks that an existing one is."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    _check_private(path, os.lstat(path))
+    return path
+
+
+def load_authkey(path=KEY_FILE):
+    """Shared secret for the connection handshake: $CUPHEAD_INFERENCE_KEY, else a 0600 key file."""
+    if os.environ.get(KEY_ENV):
+        return bytes.fromhex(os.environ[KEY_ENV])
+    private_dir(os.path.dirname(path))
+    if not os.path.lexists(path):
+        # Written in full under a temporary name, then linked into place: a client
+        # starting at the same time as the server never reads a half-written key
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))  # 0600
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass  # Lost the race; use the winner's key
+        finally:
+            os.remove(tmp)
+    with os.fdopen(os.open(path, os.O_RDONLY | os.O_NOFOLLOW), "rb") as f:
+        _check_private(path, os.fstat(f.fileno()))
+        return bytes.fromhex(f.read().decode().strip())
+
+
+# --- SERVER ---
+class ServerStats:
+    """Per-client / per-model latency histograms and per-model batch sizes."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = collections.defaultdict(StageHistogram)  # (client, model) -> total ms
+        self.queue = collections.defaultdict(StageHistogram)    # (client, model) -> wait ms
+        self.batch_sizes = collections.defaultdict(collections.Counter)
+
+    def request_done(self, client, model, wait_ms, total_ms):
+        with self.lock:
+            self.latency[(client, model)].add(total_ms)
+            self.queue[(client, model)].add(wait_ms)
+
+    def batch_done(self, model, rows):
+        with self.lock:
+            self.batch_sizes[model][rows] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "clients": {f"{c}/{m}": {"latency": h.summary(), "queue": self.queue[(c, m)].summary()}
+                            for (c, m), h in sorted(self.latency.items())},
+                "batches": {m: {"count": sum(sizes.values()),
+                                "mean_rows": sum(k * v for k, v in sizes.items()) / max(sum(sizes.values()), 1),
+                                "sizes": dict(sorted(sizes.items()))}
+                            for m, sizes in self.batch_sizes.items()},
+            }
+
+    def report(self):
+        return format_stats(self.snapshot())
+
+
+def format_stats(snap):
+    """Console table for a ServerStats snapshot (also works on one fetched by a client)."""
+    lines = [f"{'client/model':<28}{'count':>8}{'queue p50':>11}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+    for key, s in snap["clients"].items():
+        lat, q = s["latency"], s["queue"]
+        lines.append(f"{key:<28}{lat['count']:>8}{q['p50_ms']:>11.2f}{lat['p50_ms']:>9.2f}"
+                     f"{lat['p95_ms']:>9.2f}{lat['p99_ms']:>9.2f}")
+    for model, b in snap["batches"].items():
+        lines.append(f"batches {model:<10} {b['count']:>7} runs, mean {b['mean_rows']:.2f} rows, "
+                     f"sizes {b['sizes']}")
+    return "\n".join(lines)
+
+
+class _Request:
+    __slots__ = ("client", "x", "t_enqueue", "done", "result", "error")
+
+    def __init__(self, client, x):
+        self.client = client
+        self.x = x
+        self.t_enqueue = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Batcher:
+    """
+    Dynamic batching for one model. submit() blocks the calling connection
+    thread until the batch holding its request has run.
+
+    fn: list of per-request input arrays (each (rows, ...)) -> sequence with one
+        output per row, in order.
+    """
+    def __init__(self, name, fn, stats, max_batch=8, max_wait_ms=2.0):
+        self.name = name
+        self.fn = fn
+        self.stats = stats
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending = collections.deque()
+        self.connections = 0  # Open connections that have used this model
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name=f"batch-{name}", daemon=True)
+        self.thread.start()
+
+    def attach(self):
+        with self.cond:
+            self.connections += 1
+
+    def detach(self):
+        with self.cond:
+            self.connections -= 1
+            self.cond.notify()  # The batch may now be complete
+
+    def submit(self, client, x):
+        req = _Request(client, x)
+        with self.cond:
+            self.pending.append(req)
+            self.cond.notify()
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    def _pending_rows(self):
+        return sum(len(r.x) for r in self.pending)
+
+    def _take(self):
+        """Waits for the batch to fill or the oldest request's deadline, then pops a batch."""
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            deadline = self.pending[0].t_enqueue + self.max_wait
+            while self._pending_rows() < self.max_batch and len(self.pending) < self.connections:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch = [self.pending.popleft()]
+            rows = len(batch[0].x)
+            while self.pending and rows + len(self.pending[0].x) <= self.max_batch:
+                rows += len(self.pending[0].x)
+                batch.append(self.pending.popleft())
+        return batch, rows
+
+    def _run(self):
+        while True:
+            batch, rows = self._take()
+            t_start = time.perf_counter()
+            try:
+                out = self.fn([r.x for r in batch])
+                i = 0
+                for r in batch:
+                    r.result = out[i:i + len(r.x)]
+                    i += len(r.x)
+            except Exception as e:
+                for r in batch:
+                    r.error = e
+            t_end = time.perf_counter()
+            self.stats.batch_done(self.name, rows)
+            for r in batch:
+                self.stats.request_done(r.client, self.name, (t_start - r.t_enqueue) * 1000,
+                                        (t_end - r.t_enqueue) * 1000)
+                r.done.set()
+
+
+def load_model_fns(models, detector_backend="ultralytics", encoder_backend="keras"):
+    """{model name: batched fn} for the requested models, plus detector class names."""
+    fns = {}
+    names = None
+    if "detector" in models:
+        import backends
+        from detections import boxes_array
+        yolo = backends.load_detector(detector_backend)
+        names = yolo.names
+
+        def detect(inputs):
+            frames = [f for x in inputs for f in x]
+            results = yolo.predict(frames, conf=YOLO_CONF, verbose=False)
+            return [boxes_array(r) for r in results]
+        fns["detector"] = detect
+    if "encoder" in models:
+        import backends
+        encoder = backends.load_encoder(encoder_backend)
+        fns["encoder"] = lambda inputs: encoder(np.concatenate(inputs))
+    if "mlp" in models:
+        mlp = load_or_export(MLP_PATH)
+        fns["mlp"] = lambda inputs: mlp.predict(np.concatenate(inputs))
+    if "gru" in models:
+        gru = load_or_export(GRU_PATH)
+        fns["gru"] = lambda inputs: gru.predict(np.concatenate(inputs))
+    return fns, names
+
+
+class InferenceServer:
+    def __init__(self, fns, names=None, address=DEFAULT_SOCKET, max_batch=8, max_wait_ms=2.0, authkey=None):
+        self.address = address
+        self.authkey = authkey or load_authkey()
+        self.names = names
+        self.stats = ServerStats()
+        self.batchers = {m: Batcher(m, fn, self.stats, max_batch, max_wait_ms) for m, fn in fns.items()}
+
+    def serve_forever(self, report_every=10.0):
+        private_dir(os.path.dirname(os.path.abspath(self.address)))
+        if os.path.lexists(self.address):
+            self._remove_stale_socket()
+        listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        print(f"Inference server on {self.address}: {', '.join(self.batchers)}")
+        if report_every:
+            threading.Thread(target=self._reporter, args=(report_every,), daemon=True).start()
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, ConnectionResetError) as e:
+                    print(f"Rejected connection: {type(e).__name__}: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            print("\nShutting down.")
+        finally:
+            listener.close()
+            print(self.stats.report())
+
+    def _remove_stale_socket(self):
+        """Removes a socket left by a dead server; refuses to take over a live one."""
+        try:
+            Client(self.address, family="AF_UNIX", authkey=self.authkey).close()
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(self.address)  # Nobody listening: stale socket from a previous run
+            return
+        except AuthenticationError:
+            pass  # Someone is listening, just not with our key
+        raise SystemExit(f"A server is already listening on {self.address}")
+
+    def _reporter(self, interval):
+        while True:
+            time.sleep(interval)
+            if self.stats.latency:
+                print(self.stats.report() + "\n")
+
+    def _handle(self, conn):
+        """One connection = one client thread. Messages are (op, ...) tuples."""
+        client = "?"
+        used = set()
+        try:
+            while True:
+                msg = conn.recv()
+                op = msg[0]
+                if op == "hello":
+                    client = msg[1]
+                    conn.send({"models": list(self.batchers), "names": self.names})
+                elif op == "infer":
+                    _, model, shape, dtype = msg
+                    # Frame bytes follow as a raw buffer (no pickling of the array)
+                    x = np.frombuffer(conn.recv_bytes(), dtype=dtype).reshape(shape)
+                    if model in self.batchers and model not in used:
+                        used.add(model)
+                        self.batchers[model].attach()
+                    try:
+                        conn.send(("ok", self.batchers[model].submit(client, x)))
+                    except Exception as e:
+                        conn.send(("error", f"{type(e).__name__}: {e}"))
+                elif op == "stats":
+                    conn.send(self.stats.snapshot())
+        except (EOFError, ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            for model in used:
+                self.batchers[model].detach()
+            conn.close()
+
+
+# --- CLIENT ---
+class InferenceClient:
+    """
+    Thread-safe client: every thread gets its own connection, so pipelined bots
+    (detection and decision workers) never wait on each other's requests.
+    """
+    def __init__(self, address=DEFAULT_SOCKET, name=None, authkey=None):
+        self.address = address
+        self.authkey = authkey or load_authkey()
+        self.name = name or f"pid{os.getpid()}"
+        self._local = threading.local()
+        self.latency = collections.defaultdict(StageHistogram)  # Round trip per model (ms)
+        self.models = None
+        self.names = None
+        self._conn()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            conn.send(("hello", self.name))
+            info = conn.recv()
+            self.models, self.names = info["models"], info["names"]
+        return conn
+
+    def infer(self, model, x):
+        """Sends a (rows, ...) array and returns the model's (rows, ...) output."""
+        x = np.ascontiguousarray(x)
+        t0 = time.perf_counter()
+        conn = self._conn()
+        conn.send(("infer", model, x.shape, x.dtype.str))
+        conn.send_bytes(x)
+        status, out = conn.recv()
+        self.latency[model].add((time.perf_counter() - t0) * 1000)
+        if status != "ok":
+            raise RuntimeError(f"Inference server ({model}): {out}")
+        return out
+
+    def detect(self, frame):
+        """(N, 6) boxes [x1, y1, x2, y2, conf, cls] for one BGR frame."""
+        return self.infer("detector", frame[None])[0]
+
+    def model(self, name):
+        return RemoteModel(self, name)
+
+    def stats(self):
+        conn = self._conn()
+        conn.send(("stats",))
+        return conn.recv()
+
+    def report(self):
+        lines = [f"{'model':<10}{'count':>8}{'p50':>9}{'p95':>9}{'p99':>9}  (ms round trip)"]
+        for model, h in self.latency.items():
+            s = h.summary()
+            lines.append(f"{model:<10}{s['count']:>8}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}")
+        return "\n".join(lines)
+
+
+class RemoteModel:
+    """Stands in for a local model: predict(x) / model(x) with a leading batch axis."""
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def predict(self, x):
+        return self.client.infer(self.name, np.asarray(x, dtype=np.float32))
+
+    __call__ = predict
+
+
+class RemoteGRUStepper:
+    """GRUStepper interface (push / reset) backed by the server's gru model."""
+    def __init__(self, client, sequence_length=SEQUENCE_LENGTH, latent_dim=512):
+        self.model = client.model("gru")
+        self.latents = LatentRingBuffer(sequence_length, latent_dim)
+
+    def reset(self):
+        self.latents.reset()
+
+    def push(self, latent):
+        self.latents.push(np.asarray(latent, dtype=np.float32).reshape(-1))
+        if not self.latents.full:
+            return None
+        return float(self.model.predict(self.latents.window()[None])[0, 0])
+
+
+# --- LOAD TEST ---
+def bench(address, clients=4, seconds=5.0, models=("mlp", "gru")):
+    """Synthetic clients hammering the server; prints client-side round trips."""
+    rng = np.random.default_rng(0)
+    inputs = {
+        "detector": rng.integers(0, 256, size=(1, 399, 719, 3), dtype=np.uint8),
+        "encoder": rng.random((1, 72, 128, 1), dtype=np.float32),
+        "mlp": rng.normal(size=(1, 3)).astype(np.float32),
+        "gru": rng.normal(size=(1, SEQUENCE_LENGTH, 512)).astype(np.float32),
+    }
+    results = []
+
+    def run(i):
+        client = InferenceClient(address, name=f"bench{i}")
+        usable = [m for m in models if m in client.models]
+        n = 0
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            for m in usable:
+                client.infer(m, inputs[m])
+            n += 1
+        results.append((client.name, n, client.report()))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for name, n, report in sorted(results):
+        print(f"--- {name}: {n / seconds:.0f} rounds/s ---\n{report}")
+    print("\n--- server ---")
+    print(format_stats(InferenceClient(address, "bench-stats").stats()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared inference server for the Cuphead bots.")
+    parser.add_argument("command", choices=["serve", "bench"])
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--models", default=",".join(MODELS), help="Comma-separated subset of " + ", ".join(MODELS))
+    parser.add_argument("--detector", default="ultralytics", help="Detector backend (see backends.py)")
+    parser.add_argument("--encoder", default="keras", help="Encoder backend (see backends.py)")
+    parser.add_argument("--max-batch", type=int, default=8, help="Max rows per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Batching deadline for the oldest request")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between stats reports (0 = off)")
+    parser.add_argument("--clients", type=int, default=4, help="bench: concurrent synthetic clients")
+    parser.add_argument("--seconds", type=float, default=5.0, help="bench: duration")
+    args = parser.parse_args()
+    models = [m for m in args.models.split(",") if m]
+
+    if args.command == "bench":
+        bench(args.socket, args.clients, args.seconds, models)
+        return
+
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        sys.exit(f"Unknown models: {', '.join(sorted(unknown))}")
+    fns, names = load_model_fns(models, args.detector, args.encoder)
+    server = InferenceServer(fns, names, args.socket, args.max_batch, args.max_wait_ms)
+    server.serve_forever(args.report_every)
+
+
+if __name__ == "__main__":
+    main()
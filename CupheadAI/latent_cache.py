@@ -0,0 +1,194 @@
+"""
+Encoder latent cache for whole gameplay recordings (offline Pipeline B evaluation).
+
+The encoder's latents for a recording never change between experiments, so
+they are computed once: the video is streamed through the bot's own
+preprocess_frame and the encoder in large batches (decoding overlaps
+inference), and the (N, 512) float32 latents are stored as a .npy that later
+runs memory-map:
+
+    latent_cache/<video name>.<encoder backend>-<encoder sha256[:12]>.latents.npy
+    (+ .json with the video size/mtime, frame count and capture size)
+
+The key changes when potato_encoder.keras is retrained, so a stale cache is
+never reused. With the latents on disk, gru_stepper.window_probabilities() scores
+every sliding 10-frame window of the recording in a few batched calls.
+
+    python latent_cache.py build  "[CS156] Pipeline B final gameplay.mp4" [--encoder onnx]
+    python latent_cache.py eval   "[CS156] Pipeline B final gameplay.mp4" --thresholds 0.3 0.36 0.5
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+import backends
+from frame_source import VideoSource
+from gru_stepper import LATENT_DIM, GRU_PATH, window_probabilities
+from numpy_runtime import file_hash, load_or_export
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "latent_cache")
+BATCH_SIZE = 256
+
+
+def cache_key(encoder="keras"):
+    """Encoder backend + hash of the .keras file every backend is exported from."""
+    return f"{encoder}-{file_hash(backends.ENCODER_PATH)[:12]}"
+
+
+def cache_path(video_path, encoder="keras", cache_dir=CACHE_DIR):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(cache_dir, f"{name}.{cache_key(encoder)}.latents.npy")
+
+
+def _video_meta(video_path, size, crop):
+    stat = os.stat(video_path)
+    return {"video_size": stat.st_size, "video_mtime": stat.st_mtime, "capture_size": list(size),
+            "crop": crop}
+
+
+def build(video_path, encoder="keras", batch_size=BATCH_SIZE, crop=None, cache_dir=CACHE_DIR):
+    """Encodes every frame of the video into the cache. Returns the cache path."""
+    from play_game_b import MONITOR, preprocess_frame  # The exact live preprocessing
+
+    size = (MONITOR['width'], MONITOR['height'])
+    path = cache_path(video_path, encoder, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    model = backends.load_encoder(encoder)
+    source = VideoSource(video_path, size=size, crop=crop)
+    capacity = max(source.total_frames, 1)  # Estimate; fixed up below if it was off
+
+    # Decode + preprocess on a thread, so the encoder always has the next batch ready
+    batches = queue.Queue(maxsize=2)
+
+    def produce():
+        batch = np.empty((batch_size, backends.IMG_HEIGHT, backends.IMG_WIDTH, 1), dtype=np.float32)
+        n = 0
+        while True:
+            screenshot = source.read()
+            if screenshot is None:
+                break
+            batch[n] = preprocess_frame(screenshot)[0]
+            n += 1
+            if n == batch_size:
+                batches.put(batch)
+                batch = np.empty_like(batch)
+                n = 0
+        if n:
+            batches.put(batch[:n])
+        batches.put(None)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    t0 = time.perf_counter()
+    batch = batches.get()
+    if batch is None:  # A (0, 512) cache would only fail later, in every reader
+        source.close()
+        raise IOError(f"No frames decoded from video: {video_path}")
+
+    tmp = path + ".tmp"
+    latents = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(capacity, LATENT_DIM))
+    overflow = []
+    done = 0
+    while batch is not None:
+        z = np.asarray(model(batch), dtype=np.float32).reshape(len(batch), LATENT_DIM)
+        fit = max(0, min(len(z), capacity - done))
+        latents[done:done + fit] = z[:fit]
+        if fit < len(z):
+            overflow.append(z[fit:])
+        done += len(z)
+        elapsed = time.perf_counter() - t0
+        print(f"  {done} / ~{capacity} frames, {done / elapsed:.0f} frames/s", end='\r')
+        batch = batches.get()
+    print()
+    source.close()
+
+    if done != capacity:  # CAP_PROP_FRAME_COUNT was off: rewrite at the exact size
+        exact = np.lib.format.open_memmap(path + ".tmp2", mode="w+", dtype=np.float32, shape=(done, LATENT_DIM))
+        kept = min(done, capacity)
+        exact[:kept] = latents[:kept]
+        if overflow:
+            exact[kept:] = np.concatenate(overflow)
+        del latents
+        os.replace(path + ".tmp2", tmp)
+        latents = exact
+    latents.flush()
+    del latents
+    os.replace(tmp, path)
+
+    meta = _video_meta(video_path, size, crop)
+    meta.update({"frames": done, "encoder": encoder, "key": cache_key(encoder),
+                 "seconds": round(time.perf_counter() - t0, 1)})
+    with open(path[:-len(".npy")] + ".json", "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"Cached {done} latents in {meta['seconds']}s -> {path}")
+    return path
+
+
+def load(video_path, encoder="keras", crop=None, cache_dir=CACHE_DIR, build_missing=True):
+    """(N, 512) memory-mapped latents for the video, building the cache if needed."""
+    path = cache_path(video_path, encoder, cache_dir)
+    meta_path = path[:-len(".npy")] + ".json"
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        current = _video_meta(video_path, meta["capture_size"], crop)
+        if all(meta.get(k) == v for k, v in current.items()):
+            return np.load(path, mmap_mode="r")
+    if not build_missing:
+        return None
+    return np.load(build(video_path, encoder, crop=crop, cache_dir=cache_dir), mmap_mode="r")
+
+
+def evaluate(latents, thresholds, resets=()):
+    """GRU probabilities for every frame + a decision summary per threshold."""
+    model = load_or_export(GRU_PATH)
+    t0 = time.perf_counter()
+    probs = window_probabilities(model, latents, resets)
+    elapsed = time.perf_counter() - t0
+    decided = ~np.isnan(probs)
+    print(f"GRU over {decided.sum()} windows in {elapsed:.2f}s ({decided.sum() / max(elapsed, 1e-9):.0f} windows/s)")
+    print(f"{'threshold':>9} {'frames above':>13} {'jump onsets':>12}")
+    for th in thresholds:
+        above = decided & (probs > th)
+        onsets = int(np.count_nonzero(above[1:] & ~above[:-1]) + (above[0] if len(above) else 0))
+        print(f"{th:>9.2f} {above.mean():>12.1%} {onsets:>12}")
+    return probs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache encoder latents of a recording / evaluate the GRU on them.")
+    parser.add_argument("command", choices=["build", "eval"])
+    parser.add_argument("video")
+    parser.add_argument("--encoder", default="keras", help="Encoder backend (see backends.py)")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--crop", type=int, nargs=4, metavar=("TOP", "LEFT", "W", "H"),
+                        help="Game region inside the video (as in replay.py)")
+    parser.add_argument("--thresholds", type=float, nargs="*", default=[0.36])
+    parser.add_argument("--resets", type=int, nargs="*", default=[],
+                        help="eval: frames where runs start (history is cleared there)")
+    parser.add_argument("--output", help="eval: save the per-frame probabilities (.npy)")
+    args = parser.parse_args()
+
+    crop = None
+    if args.crop:
+        top, left, w, h = args.crop
+        crop = {'top': top, 'left': left, 'width': w, 'height': h}
+
+    if args.command == "build":
+        build(args.video, args.encoder, args.batch, crop)
+        return
+    latents = load(args.video, args.encoder, crop)
+    probs = evaluate(latents, args.thresholds, args.resets)
+    if args.output:
+        np.save(args.output, probs)
+        print(f"Probabilities -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
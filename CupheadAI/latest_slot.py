@@ -0,0 +1,32 @@
+import threading
+
+
+class LatestSlot:
+    """
+    Bounded (size 1) hand-off between two pipeline stages.
+    put() never blocks: a newer item overwrites an unread one ("latest value wins"),
+    so a slow consumer always sees the freshest frame instead of a backlog.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self.dropped = 0  # Items overwritten before anyone read them
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Waits for an item and takes it. Returns None on timeout."""
+        with self._cond:
+            if self._item is None:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def clear(self):
+        with self._cond:
+            self._item = None
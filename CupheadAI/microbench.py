@@ -0,0 +1,276 @@
+"""
+Microbenchmark suite for the bots' per-frame hot functions.
+
+Times every step between a captured frame and a decision, on the labelled
+datasets/raw_images frames plus seeded synthetic ones (the same inputs on
+every run), and writes the results to JSON so two commits can be compared:
+
+    preprocess.*   play_game_b.preprocess_frame, fused EncoderInput
+    convert.*      BGRA -> BGR for YOLO (cvtColor, preallocated DetectorInput)
+    detections.*   box centers + nearest projectile (old per-box loop, detections.py)
+    state.*        play_game_a.extract_state (physics + normalization)
+    sequence.*     10-frame latent window assembly (list + tf.concat / np.concatenate, ring buffer)
+    mlp.*, gru.*   one decision call per backend
+
+mss and pynput are blocked before the bots are imported, so the suite runs on
+any machine (and proves the functions it times don't need them); TensorFlow
+benchmarks are skipped when it is not installed.
+
+Each benchmark runs `rounds` rounds of enough calls to last ~20 ms, and the
+per-call median / min / mean / p95 over rounds are stored.
+
+    python microbench.py                          # -> bench_results/<time>_<commit>.json
+    python microbench.py --filter mlp gru --quick
+    python microbench.py --compare bench_results/OLD.json bench_results/NEW.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Headless by construction: `import mss` / `import pynput` raise ImportError from here on
+for _blocked in ("mss", "pynput"):
+    sys.modules[_blocked] = None
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, "bench_results")
+ROUNDS = 15
+ROUND_SECONDS = 0.02
+SLOWER_FLAG = 1.10     # --compare marks benchmarks this much slower
+
+
+# --- TIMING ---
+def measure(fn, inputs, rounds=ROUNDS, round_seconds=ROUND_SECONDS):
+    """Per-call seconds of fn(x) cycling over `inputs`: stats over `rounds` rounds."""
+    n = len(inputs)
+    for x in inputs[:3]:
+        fn(x)  # Warm-up (lazy buffers, BLAS / graph init)
+
+    # Calls per round: enough to last round_seconds
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for i in range(number):
+            fn(inputs[i % n])
+        if time.perf_counter() - t0 >= round_seconds or number >= 1 << 20:
+            break
+        number *= 2
+
+    per_call = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for i in range(number):
+            fn(inputs[i % n])
+        per_call.append((time.perf_counter() - t0) / number)
+    us = np.array(per_call) * 1e6
+    return {
+        "median_us": round(float(np.median(us)), 3),
+        "min_us": round(float(us.min()), 3),
+        "mean_us": round(float(us.mean()), 3),
+        "p95_us": round(float(np.percentile(us, 95)), 3),
+        "rounds": rounds,
+        "calls_per_round": number,
+    }
+
+
+# --- INPUTS ---
+def _try_tf():
+    try:
+        import tensorflow as tf
+        return tf
+    except ImportError:
+        return None
+
+
+def build_cases(seed=0):
+    """[(name, fn, inputs, description)] for every benchmark that can run here."""
+    import play_game_a
+    import play_game_b
+    import detections
+    from gru_stepper import GRU_PATH, LATENT_DIM, SEQUENCE_LENGTH, GRUStepper, LatentRingBuffer
+    from numpy_runtime import MLP_PATH, load_or_export
+    from preprocess import DetectorInput, EncoderInput, load_frames
+
+    rng = np.random.default_rng(seed)
+    frames = load_frames(n_synthetic=20, seed=seed)
+    h, w = frames[0].shape[:2]
+    n_real = len(frames) - 20
+    frame_desc = f"{len(frames)} BGRA {w}x{h} frames ({n_real} raw_images, 20 synthetic)"
+    cases = []
+
+    # Preprocessing / conversion
+    encoder_input = EncoderInput(play_game_b.IMG_WIDTH, play_game_b.IMG_HEIGHT)
+    detector_input = DetectorInput(w, h)
+    cases += [
+        ("preprocess.preprocess_frame", play_game_b.preprocess_frame, frames, frame_desc),
+        ("preprocess.encoder_input_fused", encoder_input, frames, frame_desc),
+        ("convert.cvtcolor_bgra2bgr", lambda f: cv2.cvtColor(f, cv2.COLOR_BGRA2BGR), frames, frame_desc),
+        ("convert.detector_input", detector_input, frames, frame_desc),
+    ]
+
+    # Box centers + nearest projectile, per frame of N boxes
+    names = {0: 'cuphead', 1: 'potato', 2: 'projectile'}
+    ids = detections.class_ids(names, 'cuphead', 'projectile')
+    for n in (5, 50):
+        boxes = [detections.synthetic_boxes(n, rng) for _ in range(50)]
+        desc = f"50 synthetic frames of {n} boxes"
+        cases += [
+            (f"detections.loop_{n}_boxes", lambda b: detections._original(b, names), boxes,
+             desc + " (old get_box_center loop + min(math.dist))"),
+            (f"detections.vectorized_{n}_boxes", lambda b: detections.nearest_offset(*detections.split_boxes(b, *ids)),
+             boxes, desc + " (split_boxes + nearest_offset)"),
+        ]
+
+    # Physics + normalization
+    positions = []
+    for _ in range(100):
+        cuphead = tuple(rng.uniform(0, (w, h)).tolist())
+        projectiles = [tuple(p) for p in rng.uniform(0, (w, h), (3, 2)).tolist()]
+        positions.append((cuphead, projectiles, float(rng.uniform(-600, 600))))
+    cases.append(("state.extract_state", lambda a: play_game_a.extract_state(*a), positions,
+                  "100 (cuphead, 3 projectiles, prev_dist_x) states"))
+
+    # 10-frame sequence assembly (what decide() builds before the GRU)
+    latents = [rng.normal(size=(1, LATENT_DIM)).astype(np.float32) for _ in range(64)]
+    windows = [latents[i:i + SEQUENCE_LENGTH] for i in range(len(latents) - SEQUENCE_LENGTH)]
+    seq_desc = f"{len(windows)} windows of {SEQUENCE_LENGTH} (1, {LATENT_DIM}) latents"
+    cases.append(("sequence.np_concatenate", lambda zs: np.concatenate(zs)[None], windows, seq_desc))
+    ring = LatentRingBuffer(SEQUENCE_LENGTH, LATENT_DIM)
+
+    def ring_step(z):
+        ring.push(z[0])
+        return ring.window()
+    cases.append(("sequence.ring_buffer", ring_step, latents, f"{len(latents)} (1, {LATENT_DIM}) latents, push + window"))
+    tf = _try_tf()
+    if tf is not None:
+        tf_windows = [[tf.constant(z) for z in zs] for zs in windows]
+        cases.append(("sequence.tf_concat", lambda zs: tf.concat([tf.expand_dims(z, axis=1) for z in zs], axis=1),
+                      tf_windows, seq_desc + " (original decide())"))
+
+    # One decision call per backend
+    states = [rng.uniform(-1, 1, (1, 3)).astype(np.float32) for _ in range(100)]
+    mlp_desc = "100 (1, 3) state vectors"
+    cases.append(("mlp.numpy", load_or_export(MLP_PATH).predict, states, mlp_desc))
+    import decision_lut
+    lut = decision_lut.load_or_build(MLP_PATH)
+    cases.append(("mlp.lut", lut.predict, states, mlp_desc))
+
+    gru = load_or_export(GRU_PATH)
+    seqs = [np.concatenate(zs)[None] for zs in windows]
+    cases.append(("gru.numpy_window", gru.predict, seqs, seq_desc))
+    for mode in ("window", "stateful"):
+        stepper = GRUStepper(gru, mode=mode)
+        cases.append((f"gru.stepper_{mode}", stepper.push, latents, f"{len(latents)} latents, one push each"))
+
+    if tf is not None:
+        mlp_keras = tf.keras.models.load_model(MLP_PATH)
+        gru_keras = tf.keras.models.load_model(GRU_PATH, compile=False)
+        cases += [
+            ("mlp.keras_predict", lambda x: mlp_keras.predict(x, verbose=0), states, mlp_desc + " (original decide())"),
+            ("mlp.keras_call", lambda x: mlp_keras(x, training=False), states, mlp_desc),
+            ("gru.keras_call", lambda x: gru_keras(x, training=False), seqs, seq_desc + " (original decide())"),
+        ]
+    return cases
+
+
+# --- RESULTS ---
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True,
+                              timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def environment():
+    tf = sys.modules.get("tensorflow")
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+        "tensorflow": getattr(tf, "__version__", None),
+    }
+
+
+def run(filters=(), rounds=ROUNDS, round_seconds=ROUND_SECONDS, seed=0):
+    results = {}
+    cases = build_cases(seed)
+    print(f"{'benchmark':<34} {'median us':>10} {'min us':>9} {'p95 us':>9}")
+    print("-" * 65)
+    for name, fn, inputs, desc in cases:
+        if filters and not any(f in name for f in filters):
+            continue
+        stats = measure(fn, inputs, rounds, round_seconds)
+        stats["inputs"] = desc
+        results[name] = stats
+        print(f"{name:<34} {stats['median_us']:>10.2f} {stats['min_us']:>9.2f} {stats['p95_us']:>9.2f}")
+    return {"environment": environment(), "seed": seed, "results": results}
+
+
+def save(report, path=None):
+    if path is None:
+        env = report["environment"]
+        tag = (env["commit"] or "nogit") + ("-dirty" if env["dirty"] else "")
+        path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{tag}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare(old_path, new_path):
+    """Median per-call time of every benchmark in both files, new / old."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    label = lambda r: f"{r['environment']['commit']}{'-dirty' if r['environment']['dirty'] else ''}"
+    print(f"{'benchmark':<34} {label(old):>14} {label(new):>14} {'new/old':>8}")
+    print("-" * 73)
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        a, b = old["results"].get(name), new["results"].get(name)
+        if a is None or b is None:
+            cell = lambda r: f"{r['median_us']:.2f}" if r else "-"
+            print(f"{name:<34} {cell(a):>14} {cell(b):>14}")
+            continue
+        ratio = b["median_us"] / a["median_us"] if a["median_us"] else float("nan")
+        flag = "  slower" if ratio > SLOWER_FLAG else ""
+        print(f"{name:<34} {a['median_us']:>14.2f} {b['median_us']:>14.2f} {ratio:>7.2f}x{flag}")
+    for key in ("platform", "cpu_count", "numpy", "opencv", "tensorflow"):
+        if old["environment"].get(key) != new["environment"].get(key):
+            print(f"note: {key} differs ({old['environment'].get(key)} vs {new['environment'].get(key)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the bots' hot functions.")
+    parser.add_argument("--filter", nargs="*", default=[], help="Only benchmarks whose name contains one of these")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--quick", action="store_true", help="5 short rounds (noisier)")
+    parser.add_argument("--output", help="Results file (default: bench_results/<time>_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two results files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    rounds, round_seconds = (5, 0.005) if args.quick else (args.rounds, ROUND_SECONDS)
+    report = run(args.filter, rounds, round_seconds)
+    print(f"\nResults -> {save(report, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
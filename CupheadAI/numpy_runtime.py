@@ -0,0 +1,246 @@
+"""
+Dependency-free NumPy inference for the small decision models.
+
+potato_mlp_decision.keras (Dense 64 -> Dense 32 -> Dense 1) and potato_gru.keras
+(GRU 128 -> GRU 64 -> Dense 1) are tiny, but every Keras call pays a large fixed
+overhead and importing TensorFlow dominates bot startup. This module:
+
+  1. exports the weights of a .keras model to a compact .npz (needs TensorFlow,
+     but only once), and
+  2. runs the forward pass in plain NumPy with a batched API:
+        model = load_or_export(MLP_PATH)        # -> NumpyModel
+        model.predict(states)                   # (B, 3)       -> (B, 1)
+        gru.predict(windows)                    # (B, 10, 512) -> (B, 1)
+
+Dropout layers are skipped (inference only). Run this file to export both models
+and check them against Keras.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MLP_PATH = os.path.join(BASE_DIR, "models", "potato_mlp_decision.keras")
+GRU_PATH = os.path.join(BASE_DIR, "models", "potato_gru.keras")
+
+
+def sigmoid(x):
+    # tanh form: same values as 1 / (1 + exp(-x)) but never overflows
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def relu(x):
+    return np.maximum(x, 0.0)
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": relu,
+    "sigmoid": sigmoid,
+    "tanh": np.tanh,
+}
+
+
+class DenseLayer:
+    def __init__(self, kernel, bias, activation="linear"):
+        self.kernel = kernel.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.activation = activation
+        self._act = ACTIVATIONS[activation]
+
+    def __call__(self, x):
+        return self._act(x @ self.kernel + self.bias)
+
+    def weights(self):
+        return {"kernel": self.kernel, "bias": self.bias}
+
+
+class GRULayer:
+    """Keras GRU (reset_after=True, tanh / sigmoid), gate order z, r, h."""
+    def __init__(self, kernel, recurrent_kernel, bias, return_sequences=False):
+        self.kernel = kernel.astype(np.float32)
+        self.recurrent_kernel = recurrent_kernel.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.input_bias = self.bias[0]
+        self.recurrent_bias = self.bias[1]
+        self.units = recurrent_kernel.shape[0]
+        self.return_sequences = return_sequences
+
+    def project(self, x):
+        """Input half of the gates: x @ W + b_in. Works on (..., in_dim)."""
+        return x @ self.kernel + self.input_bias
+
+    def step(self, x_proj, h):
+        """One recurrent step given an already projected input."""
+        u = self.units
+        h_proj = h @ self.recurrent_kernel + self.recurrent_bias
+        z = sigmoid(x_proj[..., :u] + h_proj[..., :u])
+        r = sigmoid(x_proj[..., u:2 * u] + h_proj[..., u:2 * u])
+        hh = np.tanh(x_proj[..., 2 * u:] + r * h_proj[..., 2 * u:])
+        return z * h + (1.0 - z) * hh
+
+    def run(self, x_projs, h=None):
+        """Runs over (..., T, 3*units) projections from a zero state. Returns (..., T, units)."""
+        if h is None:
+            h = np.zeros(x_projs.shape[:-2] + (self.units,), dtype=np.float32)
+        out = np.empty(x_projs.shape[:-1] + (self.units,), dtype=np.float32)
+        for t in range(x_projs.shape[-2]):
+            h = self.step(x_projs[..., t, :], h)
+            out[..., t, :] = h
+        return out
+
+    def __call__(self, x):
+        seq = self.run(self.project(x))
+        return seq if self.return_sequences else seq[..., -1, :]
+
+    def weights(self):
+        return {"kernel": self.kernel, "recurrent_kernel": self.recurrent_kernel, "bias": self.bias}
+
+
+class NumpyModel:
+    """A stack of DenseLayer / GRULayer applied in order."""
+    def __init__(self, layers, name="", source_hash=None):
+        self.layers = layers
+        self.name = name
+        self.source_hash = source_hash  # sha256 of the .keras file it was exported from
+
+    def predict(self, x):
+        """Batched forward pass. x: (B, ...) -> (B, 1) float32."""
+        x = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            x = layer(x)
+        return x
+
+    __call__ = predict
+
+    # --- Serialization ---
+    def save(self, npz_path):
+        spec = []
+        arrays = {}
+        for i, layer in enumerate(self.layers):
+            if isinstance(layer, GRULayer):
+                spec.append({"type": "GRU", "return_sequences": layer.return_sequences})
+            else:
+                spec.append({"type": "Dense", "activation": layer.activation})
+            for k, w in layer.weights().items():
+                arrays[f"{i}_{k}"] = w
+        spec = {"name": self.name, "source_hash": self.source_hash, "layers": spec}
+        np.savez(npz_path, __spec__=np.array(json.dumps(spec)), **arrays)
+
+    @classmethod
+    def load(cls, npz_path):
+        with np.load(npz_path) as data:
+            spec = json.loads(str(data["__spec__"]))
+            layers = []
+            for i, s in enumerate(spec["layers"]):
+                if s["type"] == "GRU":
+                    layers.append(GRULayer(data[f"{i}_kernel"], data[f"{i}_recurrent_kernel"],
+                                           data[f"{i}_bias"], s["return_sequences"]))
+                else:
+                    layers.append(DenseLayer(data[f"{i}_kernel"], data[f"{i}_bias"], s["activation"]))
+        return cls(layers, spec.get("name", ""), spec.get("source_hash"))
+
+    @classmethod
+    def from_keras(cls, keras_model):
+        """Copies the weights out of a loaded Keras model (Dense / GRU / Dropout only)."""
+        layers = []
+        for layer in keras_model.layers:
+            kind = layer.__class__.__name__
+            if kind in ("InputLayer", "Dropout"):
+                continue
+            cfg = layer.get_config()
+            if kind == "Dense":
+                layers.append(DenseLayer(*layer.get_weights(), activation=cfg["activation"]))
+            elif kind == "GRU":
+                if not cfg.get("reset_after", True) or cfg["activation"] != "tanh" \
+                        or cfg["recurrent_activation"] != "sigmoid":
+                    raise ValueError(f"Unsupported GRU config in layer {layer.name}")
+                layers.append(GRULayer(*layer.get_weights(), return_sequences=cfg["return_sequences"]))
+            else:
+                raise ValueError(f"Unsupported layer type: {kind} ({layer.name})")
+        return cls(layers, keras_model.name)
+
+
+def npz_path_for(keras_path):
+    return os.path.splitext(keras_path)[0] + ".npz"
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def export(keras_path, npz_path=None):
+    """Exports a .keras model to .npz. Imports TensorFlow (only needed here)."""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    import tensorflow as tf
+
+    npz_path = npz_path or npz_path_for(keras_path)
+    keras_model = tf.keras.models.load_model(keras_path, compile=False)
+    model = NumpyModel.from_keras(keras_model)
+    model.source_hash = file_hash(keras_path)
+    model.save(npz_path)
+    print(f"Exported {keras_path} -> {npz_path}")
+    return model, keras_model
+
+
+def load_or_export(keras_path, npz_path=None):
+    """
+    Loads the .npz next to the .keras model, (re-)exporting it if it is missing
+    or was exported from a different version of the .keras file.
+    """
+    npz_path = npz_path or npz_path_for(keras_path)
+    if os.path.exists(npz_path):
+        model = NumpyModel.load(npz_path)
+        if not os.path.exists(keras_path) or model.source_hash == file_hash(keras_path):
+            return model
+    model, _ = export(keras_path, npz_path)
+    return model
+
+
+def check_parity(keras_model, model, inputs, tol=1e-5):
+    """Max abs difference between Keras and NumPy outputs on `inputs`."""
+    ref = keras_model(inputs, training=False).numpy()
+    err = float(np.max(np.abs(ref - model.predict(inputs))))
+    print(f"  parity: max |keras - numpy| = {err:.2e} ({'OK' if err <= tol else 'FAIL'}, tol={tol:g})")
+    return err <= tol
+
+
+def time_call(fn, repeat=200):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    ok = True
+    for keras_path, shape in [(MLP_PATH, (3,)), (GRU_PATH, (10, 512))]:
+        print(f"\n--- {os.path.basename(keras_path)} ---")
+        model, keras_model = export(keras_path)
+        batch = rng.normal(size=(256,) + shape).astype(np.float32)
+        ok &= check_parity(keras_model, model, batch)
+
+        single = batch[:1]
+        keras_predict = time_call(lambda: keras_model.predict(single, verbose=0), repeat=50)
+        keras_call = time_call(lambda: keras_model(single, training=False), repeat=50)
+        numpy_single = time_call(lambda: model.predict(single))
+        numpy_batch = time_call(lambda: model.predict(batch), repeat=20) / len(batch)
+        print(f"  keras .predict (1 sample)  : {keras_predict:10.1f} us")
+        print(f"  keras __call__ (1 sample)  : {keras_call:10.1f} us")
+        print(f"  numpy predict  (1 sample)  : {numpy_single:10.1f} us")
+        print(f"  numpy predict  (per sample, batch {len(batch)}): {numpy_batch:.2f} us")
+
+    t0 = time.perf_counter()
+    NumpyModel.load(npz_path_for(MLP_PATH))
+    print(f"\nLoad time potato_mlp_decision.npz: {(time.perf_counter() - t0) * 1000:.1f} ms")
+    print("All parity checks passed." if ok else "PARITY FAILURE")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,32 @@ import os
 # Suppress TensorFlow logs
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
-import cv2
 import numpy as np
-import mss
-import tensorflow as tf
-from ultralytics import YOLO
 import time
-import math
-from pynput import keyboard as pynput_keyboard
-from pynput.keyboard import Controller, Key
-
-keyboard_controller = Controller()
+import threading
+from latest_slot import LatestSlot
+from frame_source import ScreenSource
+from preprocess import DetectorInput
+from stage_timer import StageTimer
+from telemetry import TraceWriter
+from actuator import JumpActuator
+from tracker import DetectThenTrack
+from roi import RoiDetector
+from frame_gate import FrameGate
+from detections import boxes_array, class_ids, nearest_offset, split_boxes
+from numpy_runtime import load_or_export
+import decision_lut
+import backends
+from inference_server import InferenceClient
+
+try:
+    from pynput import keyboard as pynput_keyboard
+    from pynput.keyboard import Controller, Key
+except ImportError:
+    # Headless (e.g. replay.py on Linux): no live keyboard, but the
+    # detection/decision functions below still work.
+    pynput_keyboard = Controller = None
+    from virtual_keyboard import Key
 
 # --- KEYBOARD LISTENER ---
 class KeyMonitor:
@@ -42,8 +57,6 @@ class KeyMonitor:
     def is_pressed(self, key_char):
         return key_char in self.pressed_keys
 
-key_monitor = KeyMonitor()
-
 # --- CONFIGURATION ---
 MONITOR = {'top': 299, 'left': 1, 'width': 719, 'height': 399}
 
@@ -56,39 +69,336 @@ MLP_PATH = os.path.join(BASE_DIR, "models", "potato_mlp_decision.keras")
 YOLO_CONF = 0.13       # Low threshold to catch fast objects
 DECISION_THRESH = 0.78 # High threshold to prevent panic jumps
 
+# Runtime
+PIPELINED = True       # Run capture / YOLO / MLP on separate threads
+CAPTURE_MAX_FPS = 60   # Cap on screen grabs in pipelined mode (0 = unlimited)
+
+# Shared inference server (see inference_server.py)
+# Socket path of a running server, e.g. inference_server.DEFAULT_SOCKET: YOLO and
+# the MLP then run in the server instead of being loaded in this process.
+INFERENCE_SERVER = None
+
+# Detector backend (see backends.py)
+#  "ultralytics" -> best.pt through PyTorch (original)
+#  "onnx" / "openvino" / "tflite" (+ "-int8") -> exported on first use next to best.pt
+DETECTOR_BACKEND = "ultralytics"
+
+# MLP backend
+#  "numpy" -> exported weights + NumPy forward pass (see numpy_runtime.py), no TensorFlow
+#  "lut"   -> precomputed probability grid, O(1) lookup (see decision_lut.py)
+#  "keras" -> original tf.keras model + .predict()
+MLP_BACKEND = "numpy"
+LUT_INTERPOLATE = True # "lut" backend: trilinear interpolation (False = nearest grid point)
+
+# Detect-then-track (see tracker.py)
+DETECT_EVERY = 1       # Run YOLO every N frames, track in between (1 = YOLO every frame)
+TRACK_MIN_CONF = 0.5   # Force a YOLO pass when tracking confidence drops below this
+
+# Region-of-interest detection (see roi.py): YOLO on a crop around Cuphead's lane,
+# full frame when he is lost. "ultralytics" detector backend, no inference server.
+ROI = False
+ROI_FULL_EVERY = 30    # Full-frame pass at least every N frames (0 = only when Cuphead is lost)
+
+# Change-detection gate (see frame_gate.py): a frame that looks like the last
+# processed one skips YOLO + MLP and the last decision stands
+GATE_THRESHOLD = 0     # Per-cell change (0-255) that counts as "changed"; higher skips more, 0 = off
+
+# Actuation (see actuator.py)
+JUMP_HOLD_MS = 40      # How long space is held per jump
+JUMP_COOLDOWN_MS = 0   # Ignore new taps this soon after a release
+
+# Profiling (see stage_timer.py) -> toggle at runtime with [T]
+PROFILE = False
+PROFILE_LOG = os.path.join(BASE_DIR, "stage_timings_a.jsonl")
+PROFILE_DUMP_EVERY = 10.0 # seconds
+
+stage_timer = StageTimer("pipeline_a", PROFILE_LOG, PROFILE_DUMP_EVERY, enabled=PROFILE)
+
+# Per-frame decision trace (see telemetry.py), one directory per launch under TRACE_DIR
+# state = the normalized MLP input (dist_x / 1280, dist_y / 720, velocity / 50)
+TRACE = False
+TRACE_DIR = os.path.join(BASE_DIR, "traces")
+TRACE_FIELDS = {"t": "f8", "run": "i4", "state": ("f4", 3), "jump_prob": "f4", "jumped": "?"}
+trace = None
+
 # --- LOAD MODELS ---
-print("Loading Models... Please wait.")
-yolo_model = YOLO(YOLO_PATH)
-mlp_model = tf.keras.models.load_model(MLP_PATH)
-
-print("\n" + "="*40)
-print(" CUPHEAD AUTOPILOT READY (MAC OS)")
-print("="*40)
-print(" controls:")
-print("  [P] -> PAUSE / RESUME (Toggle)")
-print("  [Q] -> QUIT Bot")
-print("  [1] -> Log LOST & Pause")
-print("  [2] -> Log WON & Pause")
-print("="*40)
-
-def get_box_center(box):
-    """Helper to get center from YOLO box"""
-    x1, y1, x2, y2 = box.xyxy[0]
-    return float((x1 + x2) / 2), float((y1 + y2) / 2)
+yolo_model = None
+mlp_model = None
+inference_client = None
+roi_detector = None
+CUPHEAD_ID, PROJECTILE_ID = -1, -1  # Class ids, from the detector's names
+
+def load_models():
+    global yolo_model, mlp_model, inference_client, roi_detector, CUPHEAD_ID, PROJECTILE_ID
+    if INFERENCE_SERVER:
+        print(f"Using inference server at {INFERENCE_SERVER}")
+        inference_client = InferenceClient(INFERENCE_SERVER, name=f"pipeline_a-{os.getpid()}")
+        mlp_model = inference_client.model("mlp")
+        CUPHEAD_ID, PROJECTILE_ID = class_ids(inference_client.names, 'cuphead', 'projectile')
+        return
+
+    print("Loading Models... Please wait.")
+    yolo_model = backends.load_detector(DETECTOR_BACKEND)
+    CUPHEAD_ID, PROJECTILE_ID = class_ids(yolo_model.names, 'cuphead', 'projectile')
+    if ROI:
+        if DETECTOR_BACKEND == "ultralytics":
+            roi_detector = RoiDetector(run_detector, CUPHEAD_ID, full_every=ROI_FULL_EVERY)
+        else:
+            print(f"ROI detection needs the ultralytics backend ({DETECTOR_BACKEND} has a fixed input size), disabled")
+    if MLP_BACKEND == "keras":
+        import tensorflow as tf
+        mlp_model = tf.keras.models.load_model(MLP_PATH)
+    elif MLP_BACKEND == "lut":
+        # Memory-mapped table, built on first use from the MLP
+        mlp_model = decision_lut.load_or_build(MLP_PATH, interpolate=LUT_INTERPOLATE)
+    else:
+        # Re-exports models/potato_mlp_decision.npz if the .keras file changed
+        mlp_model = load_or_export(MLP_PATH)
+
+def detect_objects(frame):
+    """
+    Runs YOLO on a BGR frame.
+    Returns (cuphead_pos, projectiles) where cuphead_pos may be None.
+    """
+    if inference_client is not None:
+        # Server returns (N, 6) boxes: x1, y1, x2, y2, conf, cls
+        boxes = inference_client.detect(frame)
+    elif roi_detector is not None:
+        boxes = roi_detector.detect(frame)
+    else:
+        boxes = run_detector(frame)
+
+    return split_boxes(boxes, CUPHEAD_ID, PROJECTILE_ID)
+
+def run_detector(frame, imgsz=None):
+    """(N, 6) YOLO boxes for a BGR frame (or crop); imgsz None = the model's own size."""
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+    results = yolo_model.predict(frame, conf=YOLO_CONF, verbose=False, **kwargs)
+    return boxes_array(results[0])  # One copy off the device instead of one per box
+
+def make_tracker():
+    """Detect-then-track wrapper around detect_objects, or None if DETECT_EVERY is 1."""
+    if DETECT_EVERY <= 1:
+        return None
+    return DetectThenTrack(detect_objects, detect_every=DETECT_EVERY, min_confidence=TRACK_MIN_CONF,
+                           frame_size=(MONITOR['width'], MONITOR['height']))
+
+def locate_objects(frame, t, tracker):
+    """detect_objects(), or the tracker's estimate for frames it decides to skip."""
+    if tracker is None:
+        return detect_objects(frame)
+    return tracker.update(frame, t)
+
+def extract_state(cuphead_pos, projectiles, prev_dist_x):
+    """
+    Physics extraction + normalization.
+    Returns (state_vector, dist_x) so the caller can carry dist_x to the next frame.
+    """
+    # Offset to the nearest projectile, (1280, 0) if there is none or no Cuphead
+    dist_x, dist_y = nearest_offset(cuphead_pos, projectiles)
+
+    # Safety: If we lost tracking (dist_x reset to 1280), assume 0 velocity 
+    # to prevent a massive jump calculation.
+    if dist_x == 1280.0 or prev_dist_x == 1280.0:
+        velocity = 0.0
+    else:
+        velocity = dist_x - prev_dist_x
+
+    # Normalize (Must match training data exactly)
+    state_vector = np.array([[
+        dist_x / 1280.0,
+        dist_y / 720.0,
+        velocity / 50.0
+    ]])
+    return state_vector, dist_x
+
+def decide(state_vector):
+    """Returns the MLP jump probability for a (1, 3) state vector."""
+    if MLP_BACKEND == "keras" and inference_client is None:
+        return mlp_model.predict(state_vector, verbose=0)[0][0]
+    return mlp_model.predict(state_vector)[0, 0]
+
+def act(jump_prob, actuator):
+    """Taps space (non-blocking) if the MLP is confident enough. Returns True if a jump was pressed."""
+    if jump_prob > DECISION_THRESH:
+        # Only print if we actually jump, to reduce console spam
+        # (taps merged into a jump already in progress don't count)
+        if actuator.tap():
+            print(f"ACTION: JUMP (Prob: {jump_prob:.2f})")
+            return True
+    return False
+
+# --- PIPELINED RUNTIME ---
+# Capture -> [frame_slot] -> YOLO -> [detection_slot] -> MLP + Act
+# Each arrow is a LatestSlot: if a stage falls behind, the older item is
+# overwritten instead of queued, so every stage always works on the freshest
+# data and throughput is bound by the slowest stage, not the sum of all three.
+
+class PipelineControl:
+    """Flags shared between the input loop (main thread) and the workers."""
+    def __init__(self):
+        self.active = threading.Event()  # Set while the bot is RESUMED
+        self.stop = threading.Event()    # Set once to shut every worker down
+        self.run_id = 0                  # Bumped on every resume
+
+def capture_worker(control, frame_slot):
+    # mss handles are per-thread, so the source is opened in this thread
+    source = ScreenSource(MONITOR)
+    min_interval = 1.0 / CAPTURE_MAX_FPS if CAPTURE_MAX_FPS else 0.0
+    last_grab = 0.0
+
+    while not control.stop.is_set():
+        if not control.active.wait(timeout=0.1):
+            continue
+
+        wait = min_interval - (time.perf_counter() - last_grab)
+        if wait > 0:
+            time.sleep(wait)
+        last_grab = time.perf_counter()
+
+        run_id = control.run_id
+        t_capture = time.perf_counter()
+        t = stage_timer.start()
+        try:
+            screenshot = source.read()
+        except Exception as e:
+            print(f"\n[ERROR] Screen capture failed: {e}")
+            print("Please check macOS Screen Recording permissions for Visual Studio Code.")
+            print("System Settings > Privacy & Security > Screen & System Audio Recording")
+            control.stop.set()
+            break
+        stage_timer.lap('capture', t)
+        # BGRA view of the grab buffer: converted by the detection worker into its
+        # own preallocated frame, so nothing is copied on this thread
+        frame_slot.put((run_id, t_capture, screenshot))
+
+def detection_worker(control, frame_slot, detection_slot, gate):
+    tracker = make_tracker()
+    to_bgr = DetectorInput(MONITOR['width'], MONITOR['height'])
+    current_run = None
+    seq = 0  # Numbers the detections, so re-published ones can be told apart
+
+    while not control.stop.is_set():
+        item = frame_slot.get(timeout=0.1)
+        if item is None:
+            continue
+        run_id, t_capture, screenshot = item
+        if run_id != control.run_id or not control.active.is_set():
+            continue # Frame from before the last pause
+
+        if run_id != current_run:
+            if tracker is not None:
+                tracker.reset() # Don't extrapolate tracks across a pause
+            if roi_detector is not None:
+                roi_detector.reset() # First frame of a run is detected in full
+            gate.reset()
+        current_run = run_id
+
+        t = stage_timer.start()
+        if not gate.changed(screenshot):
+            # Nothing new on screen: re-publish the last detection under the same number,
+            # the decision worker then repeats its last decision (as in serial mode)
+            stage_timer.lap('gate', t)
+            detection_slot.put((run_id, seq, cuphead_pos, projectiles))
+            continue
+        t = stage_timer.lap('gate', t)
+        # Drop Alpha channel (BGRA -> BGR)
+        frame = to_bgr(screenshot)
+        t = stage_timer.lap('convert', t)
+        cuphead_pos, projectiles = locate_objects(frame, t_capture, tracker)
+        stage_timer.lap('yolo', t)
+        seq += 1
+        detection_slot.put((run_id, seq, cuphead_pos, projectiles))
+
+def decision_worker(control, detection_slot, actuator):
+    prev_dist_x = 1280.0
+    current_run = None
+    last_seq = None
+
+    while not control.stop.is_set():
+        item = detection_slot.get(timeout=0.1)
+        if item is None:
+            continue
+        run_id, seq, cuphead_pos, projectiles = item
+        if run_id != control.run_id or not control.active.is_set():
+            continue
+
+        if run_id != current_run:
+            # IMPORTANT: Reset physics so bot doesn't think projectile teleported
+            prev_dist_x = 1280.0
+            current_run = run_id
+            last_seq = None
+
+        if seq == last_seq:
+            # Gate skipped the frame: the last decision stands (traced, not acted on again)
+            trace.record(time.time(), run_id, state_vector[0], jump_prob, False)
+            stage_timer.frame_done()
+            continue
+        last_seq = seq
+
+        t = stage_timer.start()
+        state_vector, prev_dist_x = extract_state(cuphead_pos, projectiles, prev_dist_x)
+        t = stage_timer.lap('physics', t)
+        jump_prob = decide(state_vector)
+        t = stage_timer.lap('mlp', t)
+        jumped = act(jump_prob, actuator)
+        t = stage_timer.lap('act', t)
+        trace.record(time.time(), run_id, state_vector[0], jump_prob, jumped)
+        stage_timer.lap('trace', t)
+        stage_timer.frame_done()
+
+def start_pipeline(control, actuator, gate):
+    """Starts the three pipeline workers and returns (threads, slots)."""
+    frame_slot = LatestSlot()
+    detection_slot = LatestSlot()
+    threads = [
+        threading.Thread(target=capture_worker, args=(control, frame_slot), name="capture", daemon=True),
+        threading.Thread(target=detection_worker, args=(control, frame_slot, detection_slot, gate), name="yolo", daemon=True),
+        threading.Thread(target=decision_worker, args=(control, detection_slot, actuator), name="decision", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    return threads, (frame_slot, detection_slot)
 
 def main():
+    global trace
+    load_models()
+    trace = TraceWriter(os.path.join(TRACE_DIR, time.strftime("pipeline_a_%Y%m%d_%H%M%S")),
+                        TRACE_FIELDS, enabled=TRACE)
+    actuator = JumpActuator(Controller(), Key.space, hold_ms=JUMP_HOLD_MS, cooldown_ms=JUMP_COOLDOWN_MS)
+    key_monitor = KeyMonitor()
+
+    print("\n" + "="*40)
+    print(" CUPHEAD AUTOPILOT READY (MAC OS)")
+    print("="*40)
+    print(" controls:")
+    print("  [P] -> PAUSE / RESUME (Toggle)")
+    print("  [Q] -> QUIT Bot")
+    print("  [1] -> Log LOST & Pause")
+    print("  [2] -> Log WON & Pause")
+    print("  [T] -> Toggle stage timing")
+    print("="*40)
+
     # Physics State
     prev_dist_x = 1280.0
+    tracker = make_tracker()
+    gate = FrameGate(GATE_THRESHOLD)
     
     # Bot State
     paused = True 
     print("Status: PAUSED (Press 'p' to start)")
 
     current_run_start_time = None
+    run_id = 0 # Serial mode's run counter (pipelined mode uses control.run_id)
 
-
-    # Initialize Screen Capture
-    sct = mss.mss()
+    if PIPELINED:
+        control = PipelineControl()
+        threads, slots = start_pipeline(control, actuator, gate)
+        source = None
+    else:
+        # Initialize Screen Capture
+        source = ScreenSource(MONITOR)
+        to_bgr = DetectorInput(MONITOR['width'], MONITOR['height'])
 
     while True:
         try:
@@ -97,6 +407,10 @@ def main():
                 print("\nBot Stopped by user.")
                 break
 
+            if PIPELINED and control.stop.is_set():
+                # A worker hit a fatal error (e.g. capture permissions)
+                break
+
             if key_monitor.is_pressed('1'):
                 print("\n[RESULT] Logged: LOST. Pausing bot...")
                 
@@ -112,6 +426,8 @@ def main():
                 print(f"Survived: {duration:.2f}s")
 
                 paused = True
+                if PIPELINED:
+                    control.active.clear()
                 time.sleep(0.3)
 
             if key_monitor.is_pressed('2'):
@@ -129,103 +445,131 @@ def main():
                 print(f"Survived: {duration:.2f}s")
 
                 paused = True
+                if PIPELINED:
+                    control.active.clear()
                 time.sleep(0.3)
 
+            if key_monitor.is_pressed('t'):
+                print(f"\n[TIMING] Stage timing {'ON' if stage_timer.toggle() else 'OFF'}")
+                time.sleep(0.1)
+
             if key_monitor.is_pressed('p'):
                 paused = not paused
                 if paused:
                     print("\n[PAUSED] Bot sleeping... (You can retry the level now)")
+                    if PIPELINED:
+                        control.active.clear()
                 else:
                     print("\n[RESUMED] Bot active! resetting physics...")
                     # IMPORTANT: Reset physics so bot doesn't think projectile teleported
                     prev_dist_x = 1280.0 
+                    if tracker is not None:
+                        tracker.reset()
+                    if not PIPELINED:
+                        # (the detection worker resets these on the new run id)
+                        if roi_detector is not None:
+                            roi_detector.reset()
+                        gate.reset()
                     current_run_start_time = time.time()
+                    run_id += 1
+                    if PIPELINED:
+                        # New run id makes the workers drop in-flight frames
+                        # and reset their own prev_dist_x
+                        control.run_id += 1
+                        for slot in slots:
+                            slot.clear()
+                        control.active.set()
                 
                 # Small sleep to prevent double-toggling from one keypress
                 time.sleep(0.1)
 
             # --- PAUSE LOGIC ---
-            if paused:
+            if paused or PIPELINED:
                 # Sleep briefly to save CPU while waiting for user
-                time.sleep(0.1) 
+                # (in pipelined mode the workers do the actual work)
+                time.sleep(0.1 if paused else 0.01)
                 continue
 
-            # --- MAIN LOOP (Only runs when not paused) ---
+            # --- MAIN LOOP (Serial mode, only runs when not paused) ---
             
             # 1. CAPTURE SCREEN
+            t_capture = time.perf_counter()
+            t = stage_timer.start()
             try:
-                screenshot = np.array(sct.grab(MONITOR))
+                screenshot = source.read()
             except Exception as e:
                 print(f"\n[ERROR] Screen capture failed: {e}")
                 print("Please check macOS Screen Recording permissions for Visual Studio Code.")
                 print("System Settings > Privacy & Security > Screen & System Audio Recording")
                 break
+            t = stage_timer.lap('capture', t)
+
+            # Same picture as the last processed frame: skip the models, the last decision
+            # stands (traced, not acted on again)
+            if not gate.changed(screenshot):
+                stage_timer.lap('gate', t)
+                trace.record(time.time(), run_id, state_vector[0], jump_prob, False)
+                stage_timer.frame_done()
+                continue
+            t = stage_timer.lap('gate', t)
 
-            # Drop Alpha channel (BGRA -> BGR)
-            frame = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR)
-
-            # 2. VISION (YOLO)
-            results = yolo_model.predict(frame, conf=YOLO_CONF, verbose=False)
-
-            cuphead_pos = None
-            projectiles = []
+            # Drop Alpha channel (BGRA -> BGR), into the same preallocated frame every time
+            frame = to_bgr(screenshot)
+            t = stage_timer.lap('convert', t)
 
-            for box in results[0].boxes:
-                cls_id = int(box.cls[0])
-                cls_name = yolo_model.names[cls_id]
-                
-                if cls_name == 'cuphead':
-                    cuphead_pos = get_box_center(box)
-                elif cls_name == 'projectile':
-                    projectiles.append(get_box_center(box))
-
-            # 3. PHYSICS EXTRACTION
-            dist_x = 1280.0
-            dist_y = 0.0
-            
-            if cuphead_pos and projectiles:
-                # Find nearest projectile
-                nearest = min(projectiles, key=lambda p: math.dist(p, cuphead_pos))
-                dist_x = nearest[0] - cuphead_pos[0]
-                dist_y = nearest[1] - cuphead_pos[1]
-
-            # 4. VELOCITY CALCULATION
-            # Safety: If we lost tracking (dist_x reset to 1280), assume 0 velocity 
-            # to prevent a massive jump calculation.
-            if dist_x == 1280.0 or prev_dist_x == 1280.0:
-                velocity = 0.0
-            else:
-                velocity = dist_x - prev_dist_x
-            
-            prev_dist_x = dist_x
+            # 2. VISION (YOLO, or tracking between YOLO passes)
+            cuphead_pos, projectiles = locate_objects(frame, t_capture, tracker)
+            t = stage_timer.lap('yolo', t)
 
-            # 5. NORMALIZE (Must match training data exactly)
-            state_vector = np.array([[
-                dist_x / 1280.0,
-                dist_y / 720.0,
-                velocity / 50.0
-            ]])
+            # 3-5. PHYSICS, VELOCITY, NORMALIZE
+            state_vector, prev_dist_x = extract_state(cuphead_pos, projectiles, prev_dist_x)
+            t = stage_timer.lap('physics', t)
 
             # 6. DECISION (MLP)
-            jump_prob = mlp_model.predict(state_vector, verbose=0)[0][0]
+            jump_prob = decide(state_vector)
+            t = stage_timer.lap('mlp', t)
 
             # 7. ACT
-            if jump_prob > DECISION_THRESH:
-                # Only print if we actually jump, to reduce console spam
-                print(f"ACTION: JUMP (Prob: {jump_prob:.2f})")
-                keyboard_controller.press(Key.space)
-                time.sleep(0.04)
-                keyboard_controller.release(Key.space)
+            jumped = act(jump_prob, actuator)
+            t = stage_timer.lap('act', t)
+
+            # 8. TRACE (ring buffer write, flushed to disk in the background)
+            trace.record(time.time(), run_id, state_vector[0], jump_prob, jumped)
+            stage_timer.lap('trace', t)
+            stage_timer.frame_done()
 
             
             # (Optional) Uncomment to see what the bot sees. 
             # WARNING: This slows down the loop significantly.
-            # cv2.imshow("Bot Vision", frame)
+            # import cv2; cv2.imshow("Bot Vision", frame)
             # if cv2.waitKey(1) & 0xFF == ord('q'): break
 
         except KeyboardInterrupt:
             print("\nProgram interrupted.")
             break
 
+    if PIPELINED:
+        control.stop.set()
+        for t in threads:
+            t.join(timeout=1.0)
+        frame_slot, detection_slot = slots
+        print(f"Dropped stale items: frames={frame_slot.dropped}, detections={detection_slot.dropped}")
+
+    actuator.close()
+    act_stats = actuator.stats()
+    print(f"Jumps: {act_stats['pressed']} pressed / {act_stats['requested']} requested "
+          f"({act_stats['merged']} merged), actuation latency p95: {act_stats['latency']['p95_ms']:.2f} ms")
+
+    if GATE_THRESHOLD > 0:
+        print(gate.summary())
+
+    trace.close()
+    if TRACE:
+        print(f"Trace: {trace.rows} frames ({trace.dropped} dropped) -> {trace.directory}")
+
+    if stage_timer.frames:
+        stage_timer.dump()
+        print("\n" + stage_timer.report())
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,13 +4,25 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
 import cv2
 import numpy as np
-import mss
-import tensorflow as tf
 import time
-from pynput import keyboard as pynput_keyboard
-from pynput.keyboard import Controller, Key
-
-keyboard_controller = Controller()
+from gru_stepper import GRUStepper
+from frame_source import ScreenSource
+from stage_timer import StageTimer
+from telemetry import TraceWriter
+from actuator import JumpActuator
+import backends
+from inference_server import InferenceClient, RemoteGRUStepper
+from preprocess import EncoderInput
+from frame_gate import FrameGate
+
+try:
+    from pynput import keyboard as pynput_keyboard
+    from pynput.keyboard import Controller, Key
+except ImportError:
+    # Headless (e.g. replay.py on Linux): no live keyboard, but the
+    # encoding/decision functions below still work.
+    pynput_keyboard = Controller = None
+    from virtual_keyboard import Key
 
 # --- KEYBOARD LISTENER ---
 class KeyMonitor:
@@ -40,8 +52,6 @@ class KeyMonitor:
     def is_pressed(self, key_char):
         return key_char in self.pressed_keys
 
-key_monitor = KeyMonitor()
-
 # --- CONFIGURATION ---
 # Use the exact same capture region as your working script
 MONITOR = {'top': 299, 'left': 1, 'width': 719, 'height': 399}
@@ -60,26 +70,76 @@ GRU_PATH = os.path.join(BASE_DIR, "models", "potato_gru.keras")
 # Pipeline B (GRU) usually requires a lower threshold than MLP
 DECISION_THRESH = 0.36 
 
+# Shared inference server (see inference_server.py)
+# Socket path of a running server, e.g. inference_server.DEFAULT_SOCKET: the encoder
+# and the GRU then run in the server instead of being loaded in this process.
+INFERENCE_SERVER = None
+
+# Preprocessing (see preprocess.py)
+FUSED_PREPROCESS = True # Single-pass BGRA -> input tensor into a preallocated buffer
+
+# Encoder backend (see backends.py)
+#  "keras" -> original tf.keras autoencoder
+#  "onnx" / "openvino" / "tflite" (+ "-int8") -> exported on first use next to the .keras file
+ENCODER_BACKEND = "keras"
+
+# GRU decision mode (see gru_stepper.py)
+#  "full"     -> original path: rebuild the (1, 10, 512) window and run gru_model
+#  "window"   -> exact, NumPy ring buffer of projected latents (much cheaper)
+#  "stateful" -> carry the GRU hidden state, one recurrent step per frame
+GRU_MODE = "window"
+
+# Change-detection gate (see frame_gate.py): a frame that looks like the last
+# processed one reuses its latent (no preprocess / encoder); the GRU still steps
+GATE_THRESHOLD = 0     # Per-cell change (0-255) that counts as "changed"; higher skips more, 0 = off
+
+# Actuation (see actuator.py)
+JUMP_HOLD_MS = 40      # How long space is held per jump
+JUMP_COOLDOWN_MS = 0   # Ignore new taps this soon after a release
+
+# Profiling (see stage_timer.py) -> toggle at runtime with [T]
+PROFILE = False
+PROFILE_LOG = os.path.join(BASE_DIR, "stage_timings_b.jsonl")
+PROFILE_DUMP_EVERY = 10.0 # seconds
+
+stage_timer = StageTimer("pipeline_b", PROFILE_LOG, PROFILE_DUMP_EVERY, enabled=PROFILE)
+
+# Per-frame decision trace (see telemetry.py), one directory per launch under TRACE_DIR
+# jump_prob is NaN while the sequence buffer is still filling
+# Off by default: the 512-float latent makes every row ~2 KB (a few hundred MB per hour)
+TRACE = False
+TRACE_DIR = os.path.join(BASE_DIR, "traces")
+TRACE_FIELDS = {"t": "f8", "run": "i4", "latent": ("f4", 512), "jump_prob": "f4", "jumped": "?"}
+
 # --- LOAD MODELS ---
-print("Loading Models... Please wait.")
-
-# Load Encoder
-# We use compile=False because we only need inference, not training/loss calculation
-encoder_model = tf.keras.models.load_model(ENCODER_PATH, compile=False)
-
-# Load GRU
-# If you used custom Focal Loss, compile=False prevents loading errors
-gru_model = tf.keras.models.load_model(GRU_PATH, compile=False)
-
-print("\n" + "="*40)
-print(" CUPHEAD AUTOPILOT READY (PIPELINE B: AE+GRU)")
-print("="*40)
-print(" controls:")
-print("  [P] -> PAUSE / RESUME (Toggle)")
-print("  [Q] -> QUIT Bot")
-print("  [1] -> Log LOST & Pause")
-print("  [2] -> Log WON & Pause")
-print("="*40)
+encoder_model = None
+gru_model = None
+gru_stepper = None
+tf = None # TensorFlow is only imported by the backends that need it
+
+def load_models():
+    global encoder_model, gru_model, gru_stepper, tf
+    if INFERENCE_SERVER:
+        print(f"Using inference server at {INFERENCE_SERVER}")
+        client = InferenceClient(INFERENCE_SERVER, name=f"pipeline_b-{os.getpid()}")
+        encoder_model = client.model("encoder")
+        # Latent window kept here, GRU forward pass (exact, like "window") in the server
+        gru_stepper = RemoteGRUStepper(client, SEQUENCE_LENGTH)
+        return
+
+    print("Loading Models... Please wait.")
+
+    # Load Encoder -> callable: (1, 72, 128, 1) frame -> (1, 512) latent
+    encoder_model = backends.load_encoder(ENCODER_BACKEND)
+
+    # Load GRU
+    if GRU_MODE == "full":
+        import tensorflow as tf
+        # If you used custom Focal Loss, compile=False prevents loading errors
+        gru_model = tf.keras.models.load_model(GRU_PATH, compile=False)
+    else:
+        # NumPy weights exported from potato_gru.keras (see numpy_runtime.py)
+        gru_stepper = GRUStepper.load(GRU_PATH, mode=GRU_MODE)
 
 def preprocess_frame(sct_img):
     """
@@ -100,18 +160,92 @@ def preprocess_frame(sct_img):
     frame = np.expand_dims(frame, axis=0)
     return frame
 
+# Persistent (1, 72, 128, 1) input tensor, refilled in place every frame
+encoder_input = EncoderInput(IMG_WIDTH, IMG_HEIGHT)
+
+def prepare_input(screenshot):
+    """Screen capture -> encoder input (fused path or the original preprocess_frame)."""
+    if FUSED_PREPROCESS:
+        return encoder_input(screenshot)
+    return preprocess_frame(screenshot)
+
+def encode(screenshot):
+    """Preprocess + encoder. Returns the latent vector (z) -> Shape (1, 512)"""
+    input_frame = prepare_input(screenshot)
+    return encoder_model(input_frame)
+
+def decide(latent_vector, sequence_buffer):
+    """
+    Adds the latent to the history and returns the GRU jump probability,
+    or None until 10 frames of history exist.
+    """
+    if gru_stepper is not None:
+        # Incremental path: only the new latent is processed.
+        return gru_stepper.push(np.asarray(latent_vector))
+
+    # Add to buffer
+    sequence_buffer.append(latent_vector)
+    
+    # Keep only the last 10 frames
+    if len(sequence_buffer) > SEQUENCE_LENGTH:
+        sequence_buffer.pop(0)
+
+    # We can only predict if we have enough history (10 frames)
+    if len(sequence_buffer) < SEQUENCE_LENGTH:
+        return None
+
+    # Stack to create shape (1, 10, 512)
+    # Note: latent_vector is (1, 512), so we stack on axis 1
+    seq_input = tf.concat([tf.expand_dims(z, axis=1) for z in sequence_buffer], axis=1)
+    
+    # Predict
+    return gru_model(seq_input, training=False)[0][0]
+
+def reset_history(sequence_buffer):
+    """Clear history so we don't mix old game state with new"""
+    sequence_buffer.clear()
+    if gru_stepper is not None:
+        gru_stepper.reset()
+
+def act(jump_prob, actuator):
+    """Taps space (non-blocking) if the GRU is confident enough. Returns True if a jump was pressed."""
+    if jump_prob > DECISION_THRESH:
+        if actuator.tap():
+            print(f"ACTION: JUMP (Prob: {float(jump_prob):.2f})")
+            return True
+    return False
+
 def main():
+    load_models()
+    trace = TraceWriter(os.path.join(TRACE_DIR, time.strftime("pipeline_b_%Y%m%d_%H%M%S")),
+                        TRACE_FIELDS, enabled=TRACE)
+    actuator = JumpActuator(Controller(), Key.space, hold_ms=JUMP_HOLD_MS, cooldown_ms=JUMP_COOLDOWN_MS)
+    key_monitor = KeyMonitor()
+
+    print("\n" + "="*40)
+    print(" CUPHEAD AUTOPILOT READY (PIPELINE B: AE+GRU)")
+    print("="*40)
+    print(" controls:")
+    print("  [P] -> PAUSE / RESUME (Toggle)")
+    print("  [Q] -> QUIT Bot")
+    print("  [1] -> Log LOST & Pause")
+    print("  [2] -> Log WON & Pause")
+    print("  [T] -> Toggle stage timing")
+    print("="*40)
+
     # Sequence Buffer (Holds the last 10 latent vectors)
     sequence_buffer = []
+    gate = FrameGate(GATE_THRESHOLD)
     
     # Bot State
     paused = True 
     print("Status: PAUSED (Press 'p' to start)")
 
     current_run_start_time = None
+    run_id = 0
 
     # Initialize Screen Capture
-    sct = mss.mss()
+    source = ScreenSource(MONITOR)
 
     while True:
         try:
@@ -150,6 +284,10 @@ def main():
                 paused = True
                 time.sleep(0.3)
 
+            if key_monitor.is_pressed('t'):
+                print(f"\n[TIMING] Stage timing {'ON' if stage_timer.toggle() else 'OFF'}")
+                time.sleep(0.1)
+
             if key_monitor.is_pressed('p'):
                 paused = not paused
                 if paused:
@@ -157,8 +295,10 @@ def main():
                 else:
                     print("\n[RESUMED] Bot active! Filling sequence buffer...")
                     # RESET LOGIC: Clear buffer so we don't mix old game state with new
-                    sequence_buffer = [] 
+                    reset_history(sequence_buffer)
+                    gate.reset()
                     current_run_start_time = time.time()
+                    run_id += 1
                 
                 time.sleep(0.1)
 
@@ -170,48 +310,59 @@ def main():
             # --- MAIN LOOP ---
             
             # 1. CAPTURE SCREEN
+            t = stage_timer.start()
             try:
-                screenshot = sct.grab(MONITOR)
+                screenshot = source.read()
             except Exception as e:
                 print(f"\n[ERROR] Screen capture failed: {e}")
                 break
+            t = stage_timer.lap('capture', t)
 
             # 2. PREPROCESS & ENCODE (Vision)
-            # Process raw pixels
-            input_frame = preprocess_frame(screenshot)
+            # (same as encode(), split so each half is timed)
+            changed = gate.changed(screenshot)
+            t = stage_timer.lap('gate', t)
+            if changed: # Otherwise the last latent still describes the picture
+                input_frame = prepare_input(screenshot)
+                t = stage_timer.lap('preprocess', t)
+                latent_vector = encoder_model(input_frame)
+                t = stage_timer.lap('encoder', t)
             
-            # Get Latent Vector (z) -> Shape (1, 512)
-            # Use functional call for speed instead of .predict()
-            latent_vector = encoder_model(input_frame, training=False)
-            
-            # 3. SEQUENCE MANAGEMENT (Memory)
-            # Add to buffer
-            sequence_buffer.append(latent_vector)
-            
-            # Keep only the last 10 frames
-            if len(sequence_buffer) > SEQUENCE_LENGTH:
-                sequence_buffer.pop(0)
-
-            # 4. DECISION (GRU)
-            # We can only predict if we have enough history (10 frames)
-            if len(sequence_buffer) == SEQUENCE_LENGTH:
-                # Stack to create shape (1, 10, 512)
-                # Note: latent_vector is (1, 512), so we stack on axis 1
-                seq_input = tf.concat([tf.expand_dims(z, axis=1) for z in sequence_buffer], axis=1)
-                
-                # Predict
-                jump_prob = gru_model(seq_input, training=False)[0][0]
-
-                # 5. ACT
-                if jump_prob > DECISION_THRESH:
-                    print(f"ACTION: JUMP (Prob: {float(jump_prob):.2f})")
-                    keyboard_controller.press(Key.space)
-                    time.sleep(0.04)
-                    keyboard_controller.release(Key.space)
+            # 3. SEQUENCE MANAGEMENT (Memory) + 4. DECISION (GRU)
+            jump_prob = decide(latent_vector, sequence_buffer)
+            t = stage_timer.lap('gru', t)
+
+            # 5. ACT
+            jumped = False
+            if jump_prob is not None:
+                jumped = act(jump_prob, actuator)
+                t = stage_timer.lap('act', t)
+
+            # 6. TRACE (ring buffer write, flushed to disk in the background)
+            trace.record(time.time(), run_id, latent_vector[0],
+                         np.nan if jump_prob is None else jump_prob, jumped)
+            stage_timer.lap('trace', t)
+            stage_timer.frame_done()
 
         except KeyboardInterrupt:
             print("\nProgram interrupted.")
             break
 
+    if GATE_THRESHOLD > 0:
+        print(gate.summary())
+
+    actuator.close()
+    act_stats = actuator.stats()
+    print(f"Jumps: {act_stats['pressed']} pressed / {act_stats['requested']} requested "
+          f"({act_stats['merged']} merged), actuation latency p95: {act_stats['latency']['p95_ms']:.2f} ms")
+
+    trace.close()
+    if TRACE:
+        print(f"Trace: {trace.rows} frames ({trace.dropped} dropped) -> {trace.directory}")
+
+    if stage_timer.frames:
+        stage_timer.dump()
+        print("\n" + stage_timer.report())
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
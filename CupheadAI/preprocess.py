@@ -0,0 +1,154 @@
+"""
+Allocation-free frame preprocessing for both bots.
+
+ScreenSource.read() views the mss buffer directly (np.frombuffer, no copy).
+From there each bot converts the BGRA frame into an input tensor that is
+allocated once and rewritten in place every frame:
+
+    EncoderInput  (Pipeline B): BGRA -> resize -> gray -> /255 into (1, 72, 128, 1) float32
+                  3 passes instead of 7, and the resize runs before the colour
+                  conversion, so only the 128x72 image is converted.
+    DetectorInput (Pipeline A): BGRA -> BGR into a persistent (H, W, 3) frame for YOLO.
+
+The returned arrays are overwritten by the next call, so each instance belongs
+to one thread. Run this file for an allocation / latency comparison against the
+current play_game_b.preprocess_frame and the per-frame cvtColor of play_game_a.
+"""
+import glob
+import os
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_IMAGES_DIR = os.path.join(BASE_DIR, "..", "datasets", "raw_images")
+
+
+def bgra_view(sct_img):
+    """(H, W, 4) uint8 view of an mss ScreenShot's raw buffer (no copy)."""
+    return np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+
+
+class EncoderInput:
+    """Same output as play_game_b.preprocess_frame, written into one persistent tensor."""
+    def __init__(self, width=128, height=72):
+        self.size = (width, height)
+        self.small = np.empty((height, width, 4), dtype=np.uint8)
+        self.gray = np.empty((height, width), dtype=np.uint8)
+        self.tensor = np.empty((1, height, width, 1), dtype=np.float32)
+        self._plane = self.tensor[0, :, :, 0]  # View: writing it fills the tensor
+
+    def __call__(self, bgra):
+        cv2.resize(bgra, self.size, dst=self.small)
+        cv2.cvtColor(self.small, cv2.COLOR_BGRA2GRAY, dst=self.gray)
+        np.divide(self.gray, np.float32(255.0), out=self._plane)
+        return self.tensor
+
+
+class DetectorInput:
+    """
+    BGRA capture -> persistent BGR frame (the layout YOLO is fed).
+
+    width, height size the buffer up front; a capture of any other size (e.g. a
+    2x Retina grab of the MONITOR region) reallocates it to match once.
+    """
+    def __init__(self, width, height):
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+
+    def __call__(self, bgra):
+        if bgra.shape[:2] != self.frame.shape[:2]:
+            # cvtColor would silently write into a new array and leave dst stale
+            self.frame = np.empty((*bgra.shape[:2], 3), dtype=np.uint8)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self.frame)
+
+
+# --- BENCHMARK ---
+def _measure(fn, frames, repeat=5):
+    """(us per call, bytes allocated per call) over `frames`."""
+    for f in frames[:3]:
+        fn(f)  # Warm-up (also lets the fused path allocate its buffers)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for f in frames:
+            fn(f)
+    us = (time.perf_counter() - t0) / (repeat * len(frames)) * 1e6
+
+    # tracemalloc sees numpy (and therefore cv2) array allocations
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    total = 0
+    for f in frames:
+        tracemalloc.reset_peak()
+        fn(f)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return us, total / len(frames)
+
+
+class _FakeShot:
+    """Stands in for mss.ScreenShot: a raw BGRA bytearray plus __array_interface__."""
+    def __init__(self, bgra):
+        self.height, self.width = bgra.shape[:2]
+        self.raw = bytearray(bgra.tobytes())
+        self.__array_interface__ = {"version": 3, "shape": (self.height, self.width, 4),
+                                    "typestr": "|u1", "data": self.raw}
+
+
+def load_frames(monitor_size=(719, 399), n_synthetic=50, seed=0):
+    """BGRA frames at capture size: the labelled raw_images plus random noise frames."""
+    w, h = monitor_size
+    frames = []
+    for path in sorted(glob.glob(os.path.join(RAW_IMAGES_DIR, "*.jpg"))):
+        img = cv2.resize(cv2.imread(path), (w, h), interpolation=cv2.INTER_AREA)
+        frames.append(cv2.cvtColor(img, cv2.COLOR_BGR2BGRA))
+    rng = np.random.default_rng(seed)
+    frames += [rng.integers(0, 256, size=(h, w, 4), dtype=np.uint8) for _ in range(n_synthetic)]
+    return frames
+
+
+def check_detector_input(frame):
+    """DetectorInput == cvtColor for a MONITOR-sized frame and for smaller / 2x larger ones."""
+    h, w = frame.shape[:2]
+    detector_input = DetectorInput(w, h)
+    for f in (frame, frame[:h // 2, :w // 2], cv2.resize(frame, (w * 2, h * 2)), frame):
+        out = detector_input(f)
+        assert out is detector_input.frame, "DetectorInput returned a buffer it does not own"
+        assert np.array_equal(out, cv2.cvtColor(f, cv2.COLOR_BGRA2BGR)), f"DetectorInput wrong for {f.shape}"
+
+
+def main():
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    import play_game_b
+
+    frames = load_frames()
+    encoder_input = EncoderInput(play_game_b.IMG_WIDTH, play_game_b.IMG_HEIGHT)
+    detector_input = DetectorInput(frames[0].shape[1], frames[0].shape[0])
+
+    err = max(float(np.abs(play_game_b.preprocess_frame(f) - encoder_input(f)).max()) for f in frames)
+    print(f"{len(frames)} frames, max |fused - preprocess_frame| = {err:.4f} ({err * 255:.1f} gray levels)")
+    check_detector_input(frames[0])
+    print("DetectorInput matches cvtColor, including captures of another size\n")
+
+    print(f"{'function':<34} {'us/frame':>9} {'bytes alloc/frame':>18}")
+    print("-" * 63)
+    shots = [_FakeShot(f) for f in frames[:20]]
+    for name, fn, inputs in [
+        ("np.array(screenshot) (capture)", np.array, shots),
+        ("bgra_view(screenshot) (capture)", bgra_view, shots),
+    ]:
+        us, alloc = _measure(fn, inputs)
+        print(f"{name:<34} {us:>9.1f} {alloc:>18,.0f}")
+    for name, fn in [
+        ("play_game_b.preprocess_frame", play_game_b.preprocess_frame),
+        ("EncoderInput (fused)", encoder_input),
+        ("cvtColor BGRA->BGR (play_game_a)", lambda f: cv2.cvtColor(f, cv2.COLOR_BGRA2BGR)),
+        ("DetectorInput (preallocated)", detector_input),
+    ]:
+        us, alloc = _measure(fn, frames)
+        print(f"{name:<34} {us:>9.1f} {alloc:>18,.0f}")
+
+
+if __name__ == "__main__":
+    main()
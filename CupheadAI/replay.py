@@ -0,0 +1,220 @@
+"""
+Offline replay harness: runs Pipeline A or B against a recorded gameplay video
+instead of the live screen, with a recording fake keyboard. No display, game,
+mss or pynput needed, and it runs as fast as the CPU allows.
+
+Writes a per-frame decision trace (JSONL) with the jump probability, the action
+taken and timestamps, then prints a throughput summary.
+
+Usage:
+    python replay.py a "[CS156] Pipeline A final gameplay.mp4"
+    python replay.py b "[CS156] Pipeline B final gameplay.mp4" --trace b_trace.jsonl
+
+    # Detect-then-track: YOLO every 4th frame, scored against per-frame YOLO
+    python replay.py a --detect-every 4 --compare
+
+    # Change-detection gate (frame_gate.py) at sensitivity 8
+    python replay.py b --gate 8
+"""
+import argparse
+import json
+import os
+import time
+
+from frame_gate import FrameGate
+from frame_source import VideoSource
+from preprocess import DetectorInput
+from virtual_keyboard import Key, RecordingController
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_VIDEOS = {
+    'a': os.path.join(BASE_DIR, "[CS156] Pipeline A final gameplay.mp4"),
+    'b': os.path.join(BASE_DIR, "[CS156] Pipeline B final gameplay.mp4"),
+}
+
+
+class PipelineARunner:
+    """
+    Per-frame step of play_game_a (serial mode), minus the live I/O.
+    detect_every > 1 enables detect-then-track; compare=True also runs per-frame
+    YOLO as a reference (outside the timed step) so agreement can be scored.
+    With a gate, unchanged frames make no decision (None), like the live bot.
+    """
+    def __init__(self, detect_every=None, compare=False, gate=0):
+        import play_game_a
+        if detect_every is not None:
+            play_game_a.DETECT_EVERY = detect_every
+        play_game_a.load_models()
+        self.bot = play_game_a
+        self.tracker = play_game_a.make_tracker()
+        self.compare = compare and self.tracker is not None
+        self.gate = FrameGate(gate)
+        self.to_bgr = DetectorInput(play_game_a.MONITOR['width'], play_game_a.MONITOR['height'])
+        self.reset()
+
+    def reset(self):
+        self.prev_dist_x = 1280.0
+        self.ref_prev_dist_x = 1280.0
+        if self.tracker is not None:
+            self.tracker.reset()
+        if self.bot.roi_detector is not None:
+            self.bot.roi_detector.reset()
+        self.gate.reset()
+
+    def step(self, screenshot, t):
+        if not self.gate.changed(screenshot):
+            return None
+        self.frame = self.to_bgr(screenshot)  # Same preallocated conversion as the live bot
+        cuphead_pos, projectiles = self.bot.locate_objects(self.frame, t, self.tracker)
+        state_vector, self.prev_dist_x = self.bot.extract_state(cuphead_pos, projectiles, self.prev_dist_x)
+        return float(self.bot.decide(state_vector))
+
+    def reference(self):
+        """Jump probability per-frame YOLO would have given for the last step's frame."""
+        cuphead_pos, projectiles = self.bot.detect_objects(self.frame)
+        state_vector, self.ref_prev_dist_x = self.bot.extract_state(cuphead_pos, projectiles, self.ref_prev_dist_x)
+        return float(self.bot.decide(state_vector))
+
+
+class PipelineBRunner:
+    """Per-frame step of play_game_b, minus the live I/O. With a gate, unchanged frames reuse the last latent."""
+    compare = False
+
+    def __init__(self, gate=0):
+        import play_game_b
+        play_game_b.load_models()
+        self.bot = play_game_b
+        self.sequence_buffer = []
+        self.gate = FrameGate(gate)
+        self.reset()
+
+    def reset(self):
+        self.bot.reset_history(self.sequence_buffer)
+        self.gate.reset()
+
+    def step(self, screenshot, t):
+        if self.gate.changed(screenshot):
+            self.latent_vector = self.bot.encode(screenshot)
+        latent_vector = self.latent_vector
+        jump_prob = self.bot.decide(latent_vector, self.sequence_buffer)
+        return None if jump_prob is None else float(jump_prob)
+
+
+def replay(runner, source, controller, threshold, trace_path=None):
+    """
+    Feeds every frame of `source` through `runner`, "presses" space on the
+    fake controller like the live bot would, and records one trace row per frame.
+    Returns the trace rows.
+    """
+    rows = []
+    t_begin = time.perf_counter()
+    while True:
+        screenshot = source.read()
+        if screenshot is None:
+            break
+        t_start = time.perf_counter()
+        jump_prob = runner.step(screenshot, source.video_time)
+        action = jump_prob is not None and jump_prob > threshold
+        if action:
+            controller.tap(Key.space)
+        t_end = time.perf_counter()
+        row = {
+            "frame": source.frame_idx,
+            "video_time": round(source.video_time, 4),
+            "t_start": t_start - t_begin,
+            "t_end": t_end - t_begin,
+            "latency_ms": (t_end - t_start) * 1000,
+            "jump_prob": jump_prob,
+            "action": "JUMP" if action else None,
+        }
+        if runner.compare and jump_prob is not None:
+            row["detected"] = runner.tracker.last_was_detection
+            row["ref_jump_prob"] = runner.reference()
+        rows.append(row)
+
+    if trace_path:
+        with open(trace_path, "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+    return rows
+
+
+def summarize(rows, controller, threshold=None):
+    if not rows:
+        print("No frames replayed.")
+        return
+    elapsed = rows[-1]["t_end"]
+    latencies = sorted(r["latency_ms"] for r in rows)
+    decided = sum(1 for r in rows if r["jump_prob"] is not None)
+    print("\n" + "="*40)
+    print(f" Frames replayed : {len(rows)}")
+    print(f" Decisions       : {decided}")
+    print(f" Jumps           : {controller.presses}")
+    print(f" Wall time       : {elapsed:.2f}s")
+    print(f" Throughput      : {len(rows) / elapsed:.1f} frames/s")
+    # Decision rate counts only the bot's own step (no video decode / reference)
+    print(f" Decision rate   : {len(rows) / (sum(latencies) / 1000):.1f} decisions/s")
+    print(f" Latency p50/p95 : {latencies[len(latencies) // 2]:.2f} / "
+          f"{latencies[int(len(latencies) * 0.95)]:.2f} ms")
+
+    scored = [r for r in rows if "ref_jump_prob" in r]
+    if scored and threshold is not None:
+        same = sum((r["jump_prob"] > threshold) == (r["ref_jump_prob"] > threshold) for r in scored)
+        tracked = [r for r in scored if not r["detected"]]
+        err = [abs(r["jump_prob"] - r["ref_jump_prob"]) for r in tracked]
+        print(f" YOLO frames     : {len(scored) - len(tracked)} / {len(scored)} "
+              f"({(len(scored) - len(tracked)) / len(scored):.1%})")
+        print(f" Action agreement: {same / len(scored):.1%} vs per-frame YOLO")
+        if err:
+            print(f" |dProb| tracked : mean {sum(err) / len(err):.3f}, max {max(err):.3f}")
+    print("="*40)
+
+
+def make_runner(pipeline, detect_every=None, compare=False, gate=0):
+    if pipeline == 'a':
+        return PipelineARunner(detect_every, compare, gate)
+    return PipelineBRunner(gate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a gameplay video through a bot pipeline.")
+    parser.add_argument("pipeline", choices=["a", "b"])
+    parser.add_argument("video", nargs="?", help="Defaults to the matching final gameplay recording")
+    parser.add_argument("--trace", help="Output JSONL (default: replay_<pipeline>_trace.jsonl)")
+    parser.add_argument("--start", type=int, default=0, help="First frame to replay")
+    parser.add_argument("--end", type=int, default=None, help="Stop before this frame")
+    parser.add_argument("--crop", type=int, nargs=4, metavar=("TOP", "LEFT", "W", "H"),
+                        help="Game region inside the video (for full-screen recordings)")
+    parser.add_argument("--detect-every", type=int, default=None,
+                        help="Pipeline A: run YOLO every N frames and track in between")
+    parser.add_argument("--compare", action="store_true",
+                        help="Pipeline A: score tracked decisions against per-frame YOLO")
+    parser.add_argument("--gate", type=float, default=0,
+                        help="Change-detection gate threshold (see frame_gate.py, 0 = off)")
+    args = parser.parse_args()
+
+    video = args.video or DEFAULT_VIDEOS[args.pipeline]
+    trace_path = args.trace or f"replay_{args.pipeline}_trace.jsonl"
+
+    runner = make_runner(args.pipeline, args.detect_every, args.compare, args.gate)
+    bot = runner.bot
+    crop = None
+    if args.crop:
+        top, left, w, h = args.crop
+        crop = {'top': top, 'left': left, 'width': w, 'height': h}
+    source = VideoSource(video, size=(bot.MONITOR['width'], bot.MONITOR['height']),
+                         crop=crop, start_frame=args.start, end_frame=args.end)
+    controller = RecordingController()
+
+    print(f"Replaying {video} through Pipeline {args.pipeline.upper()}...")
+    rows = replay(runner, source, controller, bot.DECISION_THRESH, trace_path)
+    source.close()
+
+    summarize(rows, controller, bot.DECISION_THRESH)
+    if args.gate > 0:
+        print(runner.gate.summary())
+    print(f"Trace written to {trace_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Region-of-interest detection for Pipeline A.
+
+YOLO gets the whole 719x399 capture (letterboxed to 640), but only projectiles
+in Cuphead's lane, between him and the potato firing along the ground, can
+change the jump decision. RoiDetector remembers Cuphead's last box and runs
+the detector on a fixed-size crop around it, at a smaller inference size:
+
+    x: ROI_BACK_PX behind Cuphead's center -> ROI_AHEAD_PX in front (toward the potato)
+    y: ROI_HALF_HEIGHT above and below his center
+
+Near the edges of the capture the crop is shifted inside rather than clipped,
+so the detector always sees the same input shape. With the defaults (480x180
+at imgsz 416) objects keep the pixel scale full-frame detection at 640 sees,
+on about a quarter of the pixels. Boxes are mapped back to capture coordinates,
+so callers can't tell the difference.
+
+The full frame is detected instead:
+  - while Cuphead's position is unknown (first frame, after he was lost),
+  - when a crop misses Cuphead (the same frame is re-detected in full),
+  - every `full_every` frames, to pick up anything outside the lane.
+
+Only for the "ultralytics" detector backend: the exported ones have a fixed
+640 input.
+
+    # Latency and misses vs full-frame detection on a recording
+    python roi.py "[CS156] Pipeline A final gameplay.mp4" [--start N] [--end M]
+    python roi.py "[CS156] Pipeline A final gameplay.mp4" --ahead 480 --imgsz 512   # wider lane
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+ROI_BACK_PX = 120      # Crop width behind Cuphead's center
+ROI_AHEAD_PX = 360     # Crop width in front of him, where the projectiles come from
+ROI_HALF_HEIGHT = 90   # Crop height above / below his center (covers a jump's start)
+ROI_IMGSZ = 416        # Inference size for the crop (multiple of 32)
+ROI_FULL_EVERY = 30    # Full-frame refresh every N frames (0 = only when Cuphead is lost)
+
+
+class RoiDetector:
+    """
+    detect_fn:  (frame, imgsz) -> (N, 6) boxes [x1, y1, x2, y2, conf, cls] in the
+                coordinates of the frame it was given; imgsz None = full-frame size.
+    cuphead_id: class id of Cuphead (the box the crop follows).
+    """
+    def __init__(self, detect_fn, cuphead_id, back_px=ROI_BACK_PX, ahead_px=ROI_AHEAD_PX,
+                 half_height=ROI_HALF_HEIGHT, imgsz=ROI_IMGSZ, full_every=ROI_FULL_EVERY):
+        self.detect_fn = detect_fn
+        self.cuphead_id = cuphead_id
+        self.back_px = back_px
+        self.ahead_px = ahead_px
+        self.half_height = half_height
+        self.imgsz = imgsz
+        self.full_every = full_every
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.fallbacks = 0      # Crops that missed Cuphead and were re-detected in full
+        self.last_was_roi = False
+        self.last_window = None  # Crop of the last frame answered from the crop
+        self.reset()
+
+    def reset(self):
+        self.cuphead = None     # (cx, cy) of the last Cuphead box
+        self.since_full = 0
+
+    def window(self, frame_shape):
+        """(x0, y0, x1, y1) of the crop around the last Cuphead position."""
+        h, w = frame_shape[:2]
+        cw = min(self.back_px + self.ahead_px, w)
+        ch = min(2 * self.half_height, h)
+        cx, cy = self.cuphead
+        x0 = min(max(int(round(cx)) - self.back_px, 0), w - cw)
+        y0 = min(max(int(round(cy)) - self.half_height, 0), h - ch)
+        return x0, y0, x0 + cw, y0 + ch
+
+    def _remember(self, boxes):
+        """Updates the Cuphead position (last box, like split_boxes). False if he is not in `boxes`."""
+        hits = np.flatnonzero(boxes[:, 5] == self.cuphead_id)
+        if not len(hits):
+            self.cuphead = None
+            return False
+        x1, y1, x2, y2 = boxes[hits[-1], :4].tolist()
+        self.cuphead = ((x1 + x2) / 2, (y1 + y2) / 2)
+        return True
+
+    def detect(self, frame):
+        """(N, 6) boxes for a BGR frame, in frame coordinates."""
+        if self.cuphead is not None and not (self.full_every and self.since_full >= self.full_every):
+            x0, y0, x1, y1 = self.window(frame.shape)
+            boxes = self.detect_fn(np.ascontiguousarray(frame[y0:y1, x0:x1]), self.imgsz)
+            self.roi_frames += 1
+            self.since_full += 1
+            if len(boxes):
+                boxes = boxes.copy()
+                boxes[:, [0, 2]] += x0
+                boxes[:, [1, 3]] += y0
+            if self._remember(boxes):
+                self.last_was_roi = True
+                self.last_window = (x0, y0, x1, y1)
+                return boxes
+            self.fallbacks += 1  # Cuphead left the crop: this frame gets a full pass too
+
+        boxes = self.detect_fn(frame, None)
+        self.full_frames += 1
+        self.since_full = 0
+        self.last_was_roi = False
+        self._remember(boxes)
+        return boxes
+
+    @property
+    def roi_ratio(self):
+        """Share of frames answered from the crop alone."""
+        total = self.roi_frames + self.full_frames - self.fallbacks
+        return (self.roi_frames - self.fallbacks) / total if total else 0.0
+
+
+# --- EVALUATION ---
+def _matched(ref, got, iou_thresh):
+    """Per row of `ref`: does `got` have a box of the same class with IoU >= iou_thresh?"""
+    from backends import _iou
+    out = np.zeros(len(ref), dtype=bool)
+    for i, box in enumerate(ref):
+        same = got[got[:, 5] == box[5]]
+        out[i] = len(same) > 0 and _iou(box, same).max() >= iou_thresh
+    return out
+
+
+def _latency_line(label, ms):
+    ms = np.asarray(ms)
+    return (f" {label:<22}: mean {ms.mean():6.2f}  p50 {np.percentile(ms, 50):6.2f}  "
+            f"p95 {np.percentile(ms, 95):6.2f} ms")
+
+
+def evaluate(video, start=0, end=None, crop=None, iou_thresh=0.5, threat_tol_px=10.0, **roi_kwargs):
+    """
+    Runs full-frame and ROI detection on every frame of a recording and prints
+    their detection latency and what the ROI missed, taking full-frame YOLO as truth.
+    Projectile misses are split into those inside the crop (the detector lost
+    them) and outside it (out of the lane by design).
+    """
+    import play_game_a as bot
+    from detections import NO_THREAT, nearest_offset, split_boxes
+    from frame_source import VideoSource
+
+    bot.load_models()
+    if bot.yolo_model is None:
+        raise SystemExit("ROI evaluation needs the detector in this process (INFERENCE_SERVER = None)")
+    roi_kwargs.setdefault("full_every", bot.ROI_FULL_EVERY)
+    roi = RoiDetector(bot.run_detector, bot.CUPHEAD_ID, **roi_kwargs)
+    source = VideoSource(video, size=(bot.MONITOR['width'], bot.MONITOR['height']), crop=crop,
+                         start_frame=start, end_frame=end)
+
+    full_ms, roi_ms, roi_only_ms = [], [], []
+    cuphead_frames = cuphead_missed = 0
+    projectiles = projectiles_missed = 0
+    in_crop = in_crop_missed = 0
+    threat_frames = threat_missed = 0
+    decisions = same_action = 0
+    ref_prev = got_prev = 1280.0
+    warm = False
+    while True:
+        screenshot = source.read()
+        if screenshot is None:
+            break
+        frame = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR)
+        if not warm:  # First calls at each input size include graph setup
+            bot.run_detector(frame, None)
+            bot.run_detector(np.ascontiguousarray(frame[:2 * roi.half_height, :roi.back_px + roi.ahead_px]),
+                             roi.imgsz)
+            warm = True
+
+        t0 = time.perf_counter()
+        ref = bot.run_detector(frame, None)
+        t1 = time.perf_counter()
+        got = roi.detect(frame)
+        t2 = time.perf_counter()
+        full_ms.append((t1 - t0) * 1000)
+        roi_ms.append((t2 - t1) * 1000)
+        if roi.last_was_roi:
+            roi_only_ms.append((t2 - t1) * 1000)
+
+        ref_cuphead, ref_proj = split_boxes(ref, bot.CUPHEAD_ID, bot.PROJECTILE_ID)
+        got_cuphead, got_proj = split_boxes(got, bot.CUPHEAD_ID, bot.PROJECTILE_ID)
+        if ref_cuphead is not None:
+            cuphead_frames += 1
+            cuphead_missed += got_cuphead is None
+        ref_projectile_boxes = ref[ref[:, 5] == bot.PROJECTILE_ID]
+        missed = ~_matched(ref_projectile_boxes, got, iou_thresh)
+        projectiles += len(missed)
+        projectiles_missed += int(missed.sum())
+        if roi.last_was_roi:
+            x0, y0, x1, y1 = roi.last_window
+            cx = (ref_projectile_boxes[:, 0] + ref_projectile_boxes[:, 2]) / 2
+            cy = (ref_projectile_boxes[:, 1] + ref_projectile_boxes[:, 3]) / 2
+            inside = (cx >= x0) & (cx < x1) & (cy >= y0) & (cy < y1)
+            in_crop += int(inside.sum())
+            in_crop_missed += int((missed & inside).sum())
+
+        # The offset the MLP sees: is the nearest threat still the same one?
+        ref_offset = nearest_offset(ref_cuphead, ref_proj)
+        got_offset = nearest_offset(got_cuphead, got_proj)
+        if ref_offset != NO_THREAT:
+            threat_frames += 1
+            threat_missed += max(abs(a - b) for a, b in zip(ref_offset, got_offset)) > threat_tol_px
+
+        ref_state, ref_prev = bot.extract_state(ref_cuphead, ref_proj, ref_prev)
+        got_state, got_prev = bot.extract_state(got_cuphead, got_proj, got_prev)
+        decisions += 1
+        same_action += ((bot.decide(ref_state) > bot.DECISION_THRESH)
+                        == (bot.decide(got_state) > bot.DECISION_THRESH))
+    source.close()
+
+    if not decisions:
+        print("No frames.")
+        return
+    saving = 1 - np.mean(roi_ms) / np.mean(full_ms)
+    print("\n" + "=" * 60)
+    print(f" Frames                : {decisions}")
+    print(f" ROI frames            : {roi.roi_ratio:.1%} (fallbacks to full: {roi.fallbacks}, "
+          f"full passes: {roi.full_frames})")
+    print(_latency_line("Full-frame detection", full_ms))
+    print(_latency_line("ROI detection (all)", roi_ms))
+    if roi_only_ms:
+        print(_latency_line("ROI detection (crop)", roi_only_ms))
+    print(f" Latency saving        : {saving:.1%} of detection time")
+    print(f" Cuphead missed        : {cuphead_missed} / {cuphead_frames} frames "
+          f"({cuphead_missed / max(cuphead_frames, 1):.2%})")
+    print(f" Projectiles missed    : {projectiles_missed} / {projectiles} boxes "
+          f"({projectiles_missed / max(projectiles, 1):.2%}, IoU < {iou_thresh})")
+    print(f"   inside the crop     : {in_crop_missed} / {in_crop} "
+          f"({in_crop_missed / max(in_crop, 1):.2%}; the rest were outside the lane)")
+    print(f" Nearest threat off    : {threat_missed} / {threat_frames} frames "
+          f"({threat_missed / max(threat_frames, 1):.2%}, > {threat_tol_px:g} px)")
+    print(f" Action agreement      : {same_action / decisions:.2%} vs full-frame")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ROI vs full-frame detection on a recording.")
+    parser.add_argument("video")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=None)
+    parser.add_argument("--crop", type=int, nargs=4, metavar=("TOP", "LEFT", "W", "H"),
+                        help="Game region inside the video (as in replay.py)")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU for a projectile to count as found")
+    parser.add_argument("--back", type=int, default=ROI_BACK_PX)
+    parser.add_argument("--ahead", type=int, default=ROI_AHEAD_PX)
+    parser.add_argument("--half-height", type=int, default=ROI_HALF_HEIGHT)
+    parser.add_argument("--imgsz", type=int, default=ROI_IMGSZ)
+    parser.add_argument("--full-every", type=int, default=None, help="Default: play_game_a.ROI_FULL_EVERY")
+    args = parser.parse_args()
+
+    crop = None
+    if args.crop:
+        top, left, w, h = args.crop
+        crop = {'top': top, 'left': left, 'width': w, 'height': h}
+    roi_kwargs = {"back_px": args.back, "ahead_px": args.ahead, "half_height": args.half_height,
+                  "imgsz": args.imgsz}
+    if args.full_every is not None:
+        roi_kwargs["full_every"] = args.full_every
+    evaluate(args.video, args.start, args.end, crop, args.iou, **roi_kwargs)
+
+
+if __name__ == "__main__":
+    main()
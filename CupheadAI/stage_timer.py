@@ -0,0 +1,160 @@
+"""
+Low-overhead per-stage latency instrumentation for the bot main loops.
+
+Usage in a loop:
+    t = timer.start()
+    screenshot = source.read()
+    t = timer.lap('capture', t)
+    ...
+    timer.frame_done()   # once per decision: FPS + periodic JSONL dump
+
+Each stage keeps a streaming log-bucket histogram (no per-sample storage), so
+p50/p95/p99 are available at any time for a fixed memory cost. With
+timer.enabled = False every call returns immediately, so it can stay wired
+into production runs and be toggled at runtime. One timer can be shared by the
+threads of a pipelined loop: updates and dumps are serialized by a lock.
+"""
+import json
+import math
+import threading
+import time
+
+# Histogram buckets: 1 µs .. 10 s, log-spaced (~6% relative resolution)
+BUCKETS_PER_DECADE = 40
+MIN_MS = 1e-3
+NUM_BUCKETS = 7 * BUCKETS_PER_DECADE
+
+
+class StageHistogram:
+    def __init__(self):
+        self.counts = [0] * (NUM_BUCKETS + 1)
+        self.n = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        if ms <= MIN_MS:
+            i = 0
+        else:
+            i = min(int(math.log10(ms / MIN_MS) * BUCKETS_PER_DECADE) + 1, NUM_BUCKETS)
+        self.counts[i] += 1
+        self.n += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile (ms)."""
+        if not self.n:
+            return 0.0
+        target = q / 100.0 * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(MIN_MS * 10 ** (i / BUCKETS_PER_DECADE), self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.n,
+            "mean_ms": round(self.total_ms / self.n, 4) if self.n else 0.0,
+            "p50_ms": round(self.percentile(50), 4),
+            "p95_ms": round(self.percentile(95), 4),
+            "p99_ms": round(self.percentile(99), 4),
+            "max_ms": round(self.max_ms, 4),
+        }
+
+
+class StageTimer:
+    """
+    log_path:      JSONL file a summary line is appended to every `dump_interval`
+                   seconds (and on dump()). None = keep in memory only.
+    """
+    def __init__(self, name, log_path=None, dump_interval=10.0, enabled=True):
+        self.name = name
+        self.log_path = log_path
+        self.dump_interval = dump_interval
+        self.enabled = enabled
+        self.stages = {}
+        self.frames = 0
+        self._lock = threading.Lock()  # Capture / detection / decision threads share one timer
+        self._t0 = time.perf_counter()
+        self._window_t0 = self._t0
+        self._window_frames = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        return self.enabled
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def lap(self, stage, t):
+        """Records the time since `t` under `stage` and returns the new start time."""
+        if not self.enabled:
+            return 0.0
+        now = time.perf_counter()
+        if t:  # t == 0.0 if timing was switched on mid-frame
+            with self._lock:
+                hist = self.stages.get(stage)
+                if hist is None:
+                    hist = self.stages[stage] = StageHistogram()
+                hist.add((now - t) * 1000.0)
+        return now
+
+    def frame_done(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.frames += 1
+            self._window_frames += 1
+            if not self.log_path or time.perf_counter() - self._window_t0 < self.dump_interval:
+                return
+            snap = self._roll_window()
+        self._write(snap)
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        now = time.perf_counter()
+        window = now - self._window_t0
+        return {
+            "time": time.time(),
+            "bot": self.name,
+            "frames": self.frames,
+            "fps": round(self._window_frames / window, 2) if window > 0 else 0.0,
+            "fps_overall": round(self.frames / (now - self._t0), 2),
+            "stages": {k: h.summary() for k, h in self.stages.items()},
+        }
+
+    def dump(self):
+        """Appends a snapshot to log_path and starts a new FPS window."""
+        with self._lock:
+            snap = self._roll_window()
+        self._write(snap)
+        return snap
+
+    def _roll_window(self):
+        """Snapshot + new FPS window; caller holds the lock."""
+        snap = self._snapshot()
+        self._window_t0 = time.perf_counter()
+        self._window_frames = 0
+        return snap
+
+    def _write(self, snap):
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(snap) + "\n")
+
+    def report(self):
+        """Human readable table for the console."""
+        snap = self.snapshot()
+        lines = [f"{'stage':<12}{'count':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for stage, s in snap["stages"].items():
+            lines.append(f"{stage:<12}{s['count']:>8}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}"
+                         f"{s['p99_ms']:>9.2f}{s['max_ms']:>9.2f}")
+        lines.append(f"FPS (overall): {snap['fps_overall']:.1f}")
+        return "\n".join(lines)
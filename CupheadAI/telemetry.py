@@ -0,0 +1,213 @@
+"""
+Asynchronous per-frame trace recorder for the bots.
+
+The bot loops only log one line per win/loss; everything they computed per
+frame (state, jump probability, latents) is thrown away. TraceWriter keeps it
+without stalling the loop:
+
+    trace = TraceWriter("traces_a", {"t": "f8", "state": ("f4", 3), "jump_prob": "f4"})
+    trace.record(time.time(), state_vector[0], jump_prob)   # hot loop: a few array stores
+    trace.close()                                            # flushes the rest
+
+record() writes one row into preallocated per-field ring arrays and returns;
+a background thread drains the ring every `flush_interval` seconds into
+columnar chunk files, one .npy per field per chunk:
+
+    <dir>/meta.json              fields, dtypes, shapes, rows per chunk
+    <dir>/<field>.00000.npy      rows [0, chunk_rows)
+    <dir>/<field>.00001.npy      ...
+
+so analysis tools can memory-map single columns (read_trace). If the writer
+ever falls a full ring behind, new rows are dropped and counted (dropped),
+never waited on. record() is single-producer: one thread per writer.
+
+    python telemetry.py          # record() overhead vs an empty loop
+    python telemetry.py DIR      # summary of a recorded trace
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+CAPACITY = 8192        # Ring rows (~2 min at 60 FPS before anything could be dropped)
+CHUNK_ROWS = 4096      # Rows per chunk file
+FLUSH_INTERVAL = 1.0   # Seconds between drains of the ring
+
+
+def _spec(spec):
+    """'f4' or ('f4', 512) -> (dtype, shape)."""
+    if isinstance(spec, tuple):
+        dtype, shape = spec
+        return np.dtype(dtype), (shape,) if isinstance(shape, int) else tuple(shape)
+    return np.dtype(spec), ()
+
+
+class TraceWriter:
+    """
+    fields:    {name: dtype | (dtype, shape)}, in record() argument order.
+    enabled:   False makes record() a no-op (and creates no files).
+    """
+    def __init__(self, directory, fields, capacity=CAPACITY, chunk_rows=CHUNK_ROWS,
+                 flush_interval=FLUSH_INTERVAL, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+        self.names = list(fields)
+        self.specs = {name: _spec(spec) for name, spec in fields.items()}
+        self.capacity = capacity
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self._ring = [np.zeros((capacity,) + shape, dtype) for dtype, shape in self.specs.values()]
+        self._head = 0          # Rows ever recorded (written by record() only)
+        self._tail = 0          # Rows ever drained (written by the flush thread only)
+        self.dropped = 0
+        self._pending = []      # Drained rows waiting for a full chunk: list of per-field arrays
+        self._pending_rows = 0
+        self._chunk_sizes = []
+        self._stop = threading.Event()
+        self._thread = None
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+            self._write_meta()
+            self._thread = threading.Thread(target=self._flush_loop, name="trace-writer", daemon=True)
+            self._thread.start()
+
+    # --- Hot path ---
+    def record(self, *values):
+        """One row, one value per field in declaration order. Never blocks."""
+        if not self.enabled:
+            return
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self.dropped += 1
+            return
+        i = head % self.capacity
+        for column, value in zip(self._ring, values):
+            column[i] = value
+        self._head = head + 1  # Publish the row only once it is complete
+
+    # --- Background flush ---
+    def _drain(self):
+        head, tail = self._head, self._tail
+        if head == tail:
+            return
+        a, b = tail % self.capacity, head % self.capacity
+        if a < b:
+            rows = [column[a:b].copy() for column in self._ring]
+        else:  # Wrapped around the end of the ring
+            rows = [np.concatenate([column[a:], column[:b]]) for column in self._ring]
+        self._tail = head  # Slots are free again once copied out
+        self._pending.append(rows)
+        self._pending_rows += head - tail
+
+    def _write_chunks(self, final=False):
+        if self._pending_rows < self.chunk_rows and not (final and self._pending_rows):
+            return
+        columns = [np.concatenate(parts) for parts in zip(*self._pending)]
+        start = 0
+        while self._pending_rows - start >= self.chunk_rows or (final and start < self._pending_rows):
+            n = min(self.chunk_rows, self._pending_rows - start)
+            chunk = len(self._chunk_sizes)
+            for name, column in zip(self.names, columns):
+                np.save(os.path.join(self.directory, f"{name}.{chunk:05d}.npy"), column[start:start + n])
+            self._chunk_sizes.append(n)
+            start += n
+        self._pending_rows -= start
+        self._pending = [[column[start:] for column in columns]] if self._pending_rows else []
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "fields": {name: {"dtype": dtype.str, "shape": list(shape)} for name, (dtype, shape) in self.specs.items()},
+            "chunks": self._chunk_sizes,
+            "rows": sum(self._chunk_sizes),
+            "dropped": self.dropped,
+        }
+        tmp = os.path.join(self.directory, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(self.directory, "meta.json"))  # Readers never see a partial file
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+            self._write_chunks()
+
+    def close(self):
+        """Stops the flush thread and writes everything recorded so far."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._drain()
+        self._write_chunks(final=True)
+        self._write_meta()
+
+    @property
+    def rows(self):
+        return self._head
+
+
+def read_trace(directory, fields=None, mmap_mode="r"):
+    """
+    {field: array of all rows} for a recorded trace. Single-chunk fields stay
+    memory-mapped; longer ones are concatenated (pass fields=[...] to load less).
+    """
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    out = {}
+    for name in fields or meta["fields"]:
+        chunks = [np.load(os.path.join(directory, f"{name}.{i:05d}.npy"), mmap_mode=mmap_mode)
+                  for i in range(len(meta["chunks"]))]
+        if not chunks:
+            spec = meta["fields"][name]
+            out[name] = np.zeros([0] + spec["shape"], dtype=spec["dtype"])
+        else:
+            out[name] = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+    return out
+
+
+def bench(n=200_000):
+    """Hot-loop cost of record() for a Pipeline A row and a Pipeline B row (with a 512-d latent)."""
+    import tempfile
+    state = np.zeros(3, dtype=np.float32)
+    latent = np.zeros(512, dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [
+            ("empty loop", None, lambda w, i: None),
+            ("pipeline_a row", {"t": "f8", "run": "i4", "state": ("f4", 3), "jump_prob": "f4", "jumped": "?"},
+             lambda w, i: w.record(1.0, 1, state, 0.5, False)),
+            ("pipeline_b row", {"t": "f8", "run": "i4", "latent": ("f4", 512), "jump_prob": "f4", "jumped": "?"},
+             lambda w, i: w.record(1.0, 1, latent, 0.5, False)),
+        ]
+        base = None
+        for label, fields, fn in cases:
+            writer = TraceWriter(os.path.join(tmp, label.replace(" ", "_")), fields, capacity=n) if fields else None
+            t0 = time.perf_counter()
+            for i in range(n):
+                fn(writer, i)
+            us = (time.perf_counter() - t0) * 1e6 / n
+            base = us if base is None else base
+            extra = ""
+            if writer is not None:
+                t1 = time.perf_counter()
+                writer.close()
+                extra = (f"  -> {writer.rows} rows, {len(writer._chunk_sizes)} chunks, dropped {writer.dropped}, "
+                         f"close {(time.perf_counter() - t1) * 1000:.0f} ms")
+            print(f"{label:<16} {us:6.3f} us/frame  (+{us - base:.3f}){extra}")
+
+
+def main():
+    if len(sys.argv) > 1:
+        data = read_trace(sys.argv[1])
+        for name, column in data.items():
+            print(f"{name:<12} {str(column.dtype):<8} {column.shape}")
+        return
+    bench()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Detect-then-track for Pipeline A.
+
+Cuphead and the projectiles move smoothly between frames, so running YOLO on
+every frame is mostly wasted work. DetectThenTrack runs the real detector every
+`detect_every` frames (or sooner when it is unsure) and in between propagates
+the last detections with a constant-velocity model:
+
+  - After each detection, the new centers are matched to the previous tracks
+    (nearest neighbour inside a gate) and their velocity is re-estimated.
+  - Tracked frames move every center by velocity * dt. Projectiles that leave
+    the capture region are dropped.
+  - Confidence decays with every tracked frame and is 0 after a detection that
+    missed Cuphead or saw a new, unmatched projectile (no velocity yet). A
+    detection is forced as soon as it would drop below `min_confidence`.
+
+Positions are box centers, the same (x, y) tuples detect_objects() returns.
+"""
+import math
+
+
+class Track:
+    __slots__ = ("x", "y", "vx", "vy", "has_velocity")
+
+    def __init__(self, x, y, vx=0.0, vy=0.0, has_velocity=False):
+        self.x, self.y, self.vx, self.vy = x, y, vx, vy
+        self.has_velocity = has_velocity
+
+
+def _match(prev_tracks, centers, dt, gate_px):
+    """Builds tracks for `centers`, taking velocity from the nearest previous track."""
+    tracks = []
+    matched_all = True
+    used = set()
+    for cx, cy in centers:
+        best, best_d = None, gate_px
+        for i, t in enumerate(prev_tracks):
+            if i in used:
+                continue
+            # Compare against where the old track should be by now
+            d = math.hypot(cx - (t.x + t.vx * dt), cy - (t.y + t.vy * dt))
+            if d < best_d:
+                best, best_d = i, d
+        if best is None or dt <= 0:
+            tracks.append(Track(cx, cy))
+            matched_all = matched_all and best is not None
+            continue
+        used.add(best)
+        t = prev_tracks[best]
+        vx = (cx - t.x) / dt
+        vy = (cy - t.y) / dt
+        if t.has_velocity:
+            # Light smoothing against detector box jitter
+            vx = 0.5 * t.vx + 0.5 * vx
+            vy = 0.5 * t.vy + 0.5 * vy
+        tracks.append(Track(cx, cy, vx, vy, True))
+    return tracks, matched_all
+
+
+class DetectThenTrack:
+    """
+    detect_fn:      frame -> (cuphead_pos, projectiles), i.e. play_game_a.detect_objects
+    detect_every:   run the detector at least every N frames (1 = every frame)
+    frame_size:     (width, height) of the capture, for dropping tracks that leave it
+    gate_px:        max distance (px) between a prediction and a detection to match them
+    """
+    def __init__(self, detect_fn, detect_every=3, min_confidence=0.5, decay=0.8,
+                 frame_size=(719, 399), gate_px=120.0):
+        self.detect_fn = detect_fn
+        self.detect_every = max(1, detect_every)
+        self.min_confidence = min_confidence
+        self.decay = decay
+        self.frame_size = frame_size
+        self.gate_px = gate_px
+        self.detections = 0
+        self.tracked = 0
+        self.reset()
+
+    def reset(self):
+        # Tracks are stored as they were at the last detection (anchor_t);
+        # tracked frames extrapolate from there, so errors don't accumulate.
+        self.cuphead = None
+        self.projectiles = []
+        self.anchor_t = None
+        self.base_confidence = 0.0
+        self.since_detect = 0
+        self.last_was_detection = False
+
+    @property
+    def confidence(self):
+        return self.base_confidence * self.decay ** self.since_detect
+
+    def _needs_detection(self):
+        return (self.anchor_t is None
+                or self.since_detect + 1 >= self.detect_every
+                or self.base_confidence * self.decay ** (self.since_detect + 1) < self.min_confidence)
+
+    def update(self, frame, t):
+        """Returns (cuphead_pos, projectiles) for the frame captured at time t (seconds)."""
+        dt = 0.0 if self.anchor_t is None else t - self.anchor_t
+
+        if self._needs_detection():
+            cuphead_pos, centers = self.detect_fn(frame)
+            confidence = 1.0
+            if cuphead_pos is not None:
+                prev = [self.cuphead] if self.cuphead else []
+                (self.cuphead,), _ = _match(prev, [cuphead_pos], dt, self.gate_px)
+            else:
+                # Nothing to track relative to: detect again next frame
+                self.cuphead = None
+                confidence = 0.0
+            self.projectiles, matched_all = _match(self.projectiles, centers, dt, self.gate_px)
+            if not matched_all:
+                # New projectile: velocity unknown until the next detection
+                confidence = 0.0
+            self.base_confidence = confidence
+            self.anchor_t = t
+            self.since_detect = 0
+            self.detections += 1
+            self.last_was_detection = True
+            return cuphead_pos, centers
+
+        # --- Track: extrapolate from the last detection ---
+        w, h = self.frame_size
+        m = self.gate_px
+        projectiles = []
+        for p in self.projectiles:
+            x, y = p.x + p.vx * dt, p.y + p.vy * dt
+            if -m <= x <= w + m and -m <= y <= h + m:
+                projectiles.append((x, y))
+        cuphead_pos = None
+        if self.cuphead:
+            cuphead_pos = (self.cuphead.x + self.cuphead.vx * dt, self.cuphead.y + self.cuphead.vy * dt)
+        self.since_detect += 1
+        self.tracked += 1
+        self.last_was_detection = False
+        return cuphead_pos, projectiles
+
+    @property
+    def detect_ratio(self):
+        total = self.detections + self.tracked
+        return self.detections / total if total else 0.0
@@ -0,0 +1,33 @@
+"""
+Stand-ins for pynput when there is no display / no game (headless replays).
+"""
+import time
+
+
+class Key:
+    """Mirrors the pynput.keyboard.Key members the bots use."""
+    space = "space"
+
+
+class RecordingController:
+    """
+    Fake pynput Controller: records press/release events instead of sending them.
+    events -> list of (timestamp, 'press' | 'release', key)
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.events = []
+
+    def press(self, key):
+        self.events.append((self.clock(), 'press', str(key)))
+
+    def release(self, key):
+        self.events.append((self.clock(), 'release', str(key)))
+
+    def tap(self, key):
+        self.press(key)
+        self.release(key)
+
+    @property
+    def presses(self):
+        return sum(1 for _, kind, _ in self.events if kind == 'press')
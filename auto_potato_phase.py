@@ -0,0 +1,250 @@
+"""
+Automatic potato-phase segmentation with the trained YOLO detector.
+
+Instead of scrubbing the whole recording in mark_potato_phase.py, this proposes
+the segments and the tagger only reviews them:
+
+  1. Decode the video once and run YOLO on every STRIDE-th frame, in batches
+     (decoding of the next batch overlaps inference of the current one).
+  2. Presence signal = a 'potato' box with conf >= POTATO_CONF. Median-smooth it,
+     merge short gaps and drop short blips to get the phases.
+  3. Binary-search each boundary between its two samples, frame by frame,
+     so start_frame / end_frame are exact.
+
+Output has the same schema as mark_potato_phase.py (start_utc / end_utc from the
+frames log). end_frame is the first frame after the phase, so
+range(start_frame, end_frame) are the potato frames (as extract_frames_for_labeling.py uses it).
+
+    python auto_potato_phase.py                # Train.mp4 -> potato_phase_segments_proposed.json
+    python auto_potato_phase.py --test         # test.mp4  -> test_potato_segments_proposed.json
+    python auto_potato_phase.py VIDEO --frames-log LOG --output OUT.json --stride 10
+
+Then review with: python mark_potato_phase.py --proposals potato_phase_segments_proposed.json
+(saving there writes the reviewed potato_phase_segments.json as before).
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+import mark_potato_phase
+import seek_index
+from video_reader import open_decoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "CupheadAI"))
+import backends  # noqa: E402  (CupheadAI/backends.py)
+
+STRIDE = 5              # Run YOLO on every Nth frame
+BATCH_SIZE = 16         # Frames per YOLO call
+POTATO_CONF = 0.5       # A 'potato' box at least this confident = potato on screen
+SMOOTH_SAMPLES = 5      # Median filter width, in samples
+MIN_PHASE_SECONDS = 3.0 # Drop shorter detections
+MAX_GAP_SECONDS = 2.0   # Merge phases separated by less than this
+
+
+class PresenceDetector:
+    """YOLO presence check for one class ('potato' here, 'cuphead' in auto_survival_time.py)."""
+    def __init__(self, class_name="potato", backend="ultralytics", conf=POTATO_CONF):
+        self.model = backends.load_detector(backend)
+        names = self.model.names
+        names = names.items() if isinstance(names, dict) else enumerate(names)
+        self.class_id = next(i for i, n in names if n == class_name)
+        self.conf = conf
+        self.frames_run = 0
+
+    def present(self, frames):
+        """Bool per frame: is the class on screen?"""
+        results = self.model.predict(frames, conf=self.conf, imgsz=backends.YOLO_IMGSZ, verbose=False)
+        self.frames_run += len(frames)
+        return [bool((r.boxes.cls.cpu().numpy() == self.class_id).any()) for r in results]
+
+
+def sample_presence(video_path, detector, stride=STRIDE, batch_size=BATCH_SIZE, index=None):
+    """Presence at frames 0, stride, 2*stride, ... -> (sample_frames, present)."""
+    batches = queue.Queue(maxsize=2)
+
+    def decode():
+        decoder = open_decoder(video_path, index)
+        batch_idx, batch = [], []
+        idx = 0
+        while True:
+            frame = decoder.read()
+            if frame is None:
+                break
+            batch_idx.append(idx)
+            batch.append(frame)
+            if len(batch) == batch_size:
+                batches.put((batch_idx, batch))
+                batch_idx, batch = [], []
+            # Skip to the next sample: grab() decodes without converting the frame
+            for _ in range(stride - 1):
+                if not decoder.grab():
+                    break
+            idx += stride
+        if batch:
+            batches.put((batch_idx, batch))
+        batches.put(None)
+        decoder.release()
+
+    threading.Thread(target=decode, daemon=True).start()
+    sample_frames, present = [], []
+    while True:
+        item = batches.get()
+        if item is None:
+            break
+        batch_idx, batch = item
+        sample_frames += batch_idx
+        present += detector.present(batch)
+        print(f"  sampled up to frame {batch_idx[-1]}", end='\r')
+    print()
+    return np.array(sample_frames), np.array(present, dtype=bool)
+
+
+def find_runs(mask):
+    """(first, last) sample positions of every True run."""
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return list(zip(edges[::2], edges[1::2] - 1))
+
+
+def smooth_phases(present, stride, fps, smooth=SMOOTH_SAMPLES,
+                  min_seconds=MIN_PHASE_SECONDS, max_gap_seconds=MAX_GAP_SECONDS):
+    """Raw per-sample presence -> list of (first_sample, last_sample) phases."""
+    if smooth > 1 and len(present) >= smooth:
+        pad = smooth // 2
+        padded = np.pad(present.astype(np.float32), pad, mode="edge")
+        windows = np.lib.stride_tricks.sliding_window_view(padded, smooth)
+        mask = np.median(windows, axis=1) > 0.5
+    else:
+        mask = present.copy()
+
+    samples_per_second = fps / stride
+    runs = []
+    for first, last in find_runs(mask):
+        if runs and (first - runs[-1][1] - 1) < max_gap_seconds * samples_per_second:
+            runs[-1] = (runs[-1][0], last)
+        else:
+            runs.append((first, last))
+    runs = [(a, b) for a, b in runs if (b - a + 1) >= min_seconds * samples_per_second]
+
+    # Snap to raw detections inside the run: smoothing can pull an edge onto an absent sample
+    snapped = []
+    for a, b in runs:
+        hits = np.flatnonzero(present[a:b + 1])
+        if len(hits):
+            snapped.append((a + hits[0], a + hits[-1]))
+    return snapped
+
+
+def refine_boundary(decoder, detector, lo, hi, want_present):
+    """
+    Smallest frame in (lo, hi] whose presence == want_present, assuming
+    presence(lo) != want_present and presence(hi) == want_present.
+    """
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if detector.present([decoder.get(mid)])[0] == want_present:
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
+def detect_phases(video_path, detector, stride=STRIDE, batch_size=BATCH_SIZE, index=None,
+                  min_seconds=MIN_PHASE_SECONDS, max_gap_seconds=MAX_GAP_SECONDS):
+    """
+    Frame-exact [start, end) ranges where detector.present() holds.
+    Returns (phases, fps, frame_count).
+    """
+    decoder = open_decoder(video_path, index)
+    fps = decoder.fps
+    sample_frames, present = sample_presence(video_path, detector, stride, batch_size, index)
+    phases = smooth_phases(present, stride, fps, min_seconds=min_seconds, max_gap_seconds=max_gap_seconds)
+    frame_count = index.frame_count if index is not None else int(sample_frames[-1]) + 1
+
+    ranges = []
+    for first, last in phases:
+        start = int(sample_frames[first])
+        if first > 0:  # Exact first frame with the class, between the two samples
+            start = refine_boundary(decoder, detector, int(sample_frames[first - 1]), start, True)
+        if last + 1 < len(sample_frames):  # Exact first frame without it
+            end = refine_boundary(decoder, detector, int(sample_frames[last]), int(sample_frames[last + 1]), False)
+        else:
+            end = min(int(sample_frames[last]) + stride, frame_count)
+        ranges.append((start, end))
+    decoder.release()
+    return ranges, fps, frame_count
+
+
+def segment_video(video_path, frames_log=None, detector_backend="ultralytics", stride=STRIDE,
+                  batch_size=BATCH_SIZE, conf=POTATO_CONF):
+    """Runs the full pipeline and returns the mark_potato_phase.py JSON dict."""
+    index = seek_index.load_or_build(video_path)
+    detector = PresenceDetector("potato", detector_backend, conf)
+    utc_map = mark_potato_phase.load_utc_map(frames_log) if frames_log else []
+
+    def utc(i):
+        return utc_map[i] if i < len(utc_map) else None
+
+    t0 = time.perf_counter()
+    phases, fps, frame_count = detect_phases(video_path, detector, stride, batch_size, index)
+    segments = []
+    for start, end in phases:
+        segments.append({
+            "id": len(segments) + 1,
+            "start_frame": start,
+            "start_utc": utc(start),
+            "end_frame": end,
+            "end_utc": utc(end),
+        })
+
+    elapsed = time.perf_counter() - t0
+    video_seconds = frame_count / fps
+    print(f"{len(segments)} potato phases, YOLO on {detector.frames_run} frames, "
+          f"{elapsed:.1f}s for {video_seconds:.0f}s of video ({video_seconds / elapsed:.1f}x real time)")
+    return {
+        "source_video": os.path.basename(video_path),
+        "total_segments": len(segments),
+        "segments": segments,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose potato-phase segments with YOLO.")
+    parser.add_argument("video", nargs="?", help="Default: Train.mp4 (test.mp4 with --test)")
+    parser.add_argument("--frames-log", help="Frame timestamps JSONL (default: <video>_frames.jsonl)")
+    parser.add_argument("--output", help="Default: <tagger output>_proposed.json")
+    parser.add_argument("--test", action="store_true", help="Use the paths of mark_potato_phase_test.py")
+    parser.add_argument("--detector", default="ultralytics", help="Detector backend (see CupheadAI/backends.py)")
+    parser.add_argument("--stride", type=int, default=STRIDE)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--conf", type=float, default=POTATO_CONF)
+    args = parser.parse_args()
+
+    if args.test:
+        import mark_potato_phase_test as tagger
+    else:
+        tagger = mark_potato_phase
+    video = args.video or tagger.VIDEO_PATH
+    frames_log = args.frames_log or (tagger.FRAMES_LOG_PATH if args.video is None
+                                     else os.path.splitext(video)[0] + "_frames.jsonl")
+    output = args.output or os.path.splitext(tagger.OUTPUT_FILE)[0] + "_proposed.json"
+
+    if not os.path.exists(video):
+        print(f"Error: Video not found at {video}")
+        sys.exit(1)
+
+    data = segment_video(video, frames_log, args.detector, args.stride, args.batch, args.conf)
+    with open(output, "w") as f:
+        json.dump(data, f, indent=4)
+    script = "mark_potato_phase_test.py" if args.test else "mark_potato_phase.py"
+    print(f"Proposals written to {output}. Review with: python {script} --proposals {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Automatic survival-time measurement for recorded bot runs.
+
+Replaces scrubbing through measure_survival_time.py: the recording is decoded
+once and every run (fight start -> death) is found from a per-frame signal.
+
+  stats  (default) Each frame is decoded straight to a 64x36 gray thumbnail and
+         reduced to (brightness, motion). A run is where the screen is neither
+         dark (iris transitions / loading) nor frozen (the death freeze and the
+         "YOU DIED" card). Motion of frame i is its diff to frame i+1, max-pooled
+         over the next MOTION_WINDOW_SECONDS so duplicated frames in the
+         recording don't read as a freeze and the last run frame is exact.
+  yolo   Presence of a 'cuphead' box on every STRIDE-th frame, boundaries
+         refined frame by frame (same machinery as auto_potato_phase.py).
+
+Both are median-smoothed, gaps shorter than MAX_GAP_SECONDS are merged and runs
+shorter than MIN_RUN_SECONDS dropped. Output is the measure_survival_time.py
+JSON (sessions with start_frame, end_frame, duration_seconds).
+
+With hand-tagged sessions for a recording, --labels reports the per-session
+error and --calibrate grid-searches the stats thresholds against them first.
+
+    python auto_survival_time.py                        # Pipeline B video -> pipeline_b_survival_auto.json
+    python auto_survival_time.py VIDEO [VIDEO ...]      # -> <video name>_survival_auto.json each
+    python auto_survival_time.py "CupheadAI/[CS156] Pipeline A final gameplay.mp4" \\
+        --labels pipeline_a_survival.json --calibrate
+"""
+import argparse
+import cv2
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import measure_survival_time
+import seek_index
+from auto_potato_phase import PresenceDetector, detect_phases, smooth_phases
+from video_reader import stream_frames
+
+# --- Stats signal ---
+SIGNAL_SIZE = (64, 36)         # Thumbnail the signals are computed on
+DARK_LEVEL = 40.0              # Mean gray below this = transition / loading screen
+MOTION_LEVEL = 0.25            # Mean abs frame diff below this = frozen screen (0 on a still, ~0.1 codec noise)
+MOTION_WINDOW_SECONDS = 0.25   # Max-pool motion over this window
+
+# --- YOLO signal ---
+STRIDE = 3
+BATCH_SIZE = 16
+CUPHEAD_CONF = 0.25
+
+# --- Runs ---
+SMOOTH_SECONDS = 0.3
+MIN_RUN_SECONDS = 2.0
+MAX_GAP_SECONDS = 0.5
+
+
+def frame_signals(video_path, size=SIGNAL_SIZE):
+    """Per-frame brightness and motion (diff to the next frame) from one decode pass -> (brightness, motion, fps)."""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    brightness, motion = [], []
+    prev = None
+    for idx, small in stream_frames(video_path, size, gray=True):
+        small = small.astype(np.int16)
+        brightness.append(small.mean())
+        if prev is not None:
+            motion.append(np.abs(small - prev).mean())
+        prev = small
+        if idx % 1000 == 0:
+            print(f"  frame {idx}", end='\r')
+    print()
+    if not brightness:
+        return np.zeros(0, np.float32), np.zeros(0, np.float32), fps  # Nothing decoded
+    motion.append(motion[-1] if motion else 0.0)
+    return np.array(brightness, dtype=np.float32), np.array(motion, dtype=np.float32), fps
+
+
+def rolling_max(values, width):
+    """max(values[i:i + width]) for every i."""
+    if width <= 1 or len(values) < width:
+        return values
+    padded = np.pad(values, (0, width - 1), mode="edge")
+    return np.lib.stride_tricks.sliding_window_view(padded, width).max(axis=1)
+
+
+def stats_runs(brightness, motion, fps, dark_level=DARK_LEVEL, motion_level=MOTION_LEVEL):
+    """[start, end) frame ranges of the runs from the stats signal."""
+    if not len(brightness):
+        return []
+    pooled = rolling_max(motion, max(int(MOTION_WINDOW_SECONDS * fps), 1))
+    active = (brightness > dark_level) & (pooled > motion_level)
+    phases = smooth_phases(active, 1, fps, smooth=int(SMOOTH_SECONDS * fps) | 1,
+                           min_seconds=MIN_RUN_SECONDS, max_gap_seconds=MAX_GAP_SECONDS)
+    return [(int(a), int(b) + 1) for a, b in phases]
+
+
+def yolo_runs(video_path, backend="ultralytics", stride=STRIDE, batch_size=BATCH_SIZE, conf=CUPHEAD_CONF):
+    detector = PresenceDetector("cuphead", backend, conf)
+    runs, fps, frame_count = detect_phases(video_path, detector, stride, batch_size,
+                                           seek_index.load_or_build(video_path),
+                                           min_seconds=MIN_RUN_SECONDS, max_gap_seconds=MAX_GAP_SECONDS)
+    return runs, fps, frame_count
+
+
+def to_sessions(video_path, runs, fps):
+    """measure_survival_time.py JSON dict."""
+    sessions = [{
+        "id": i + 1,
+        "start_frame": start,
+        "end_frame": end,
+        "duration_seconds": (end - start) / fps,
+    } for i, (start, end) in enumerate(runs)]
+    return {"source_video": video_path, "total_sessions": len(sessions), "sessions": sessions}
+
+
+# --- Evaluation against hand-tagged sessions ---
+def run_mask(runs, n):
+    mask = np.zeros(n, dtype=bool)
+    for start, end in runs:
+        mask[start:min(end, n)] = True
+    return mask
+
+
+def frame_f1(runs, label_runs, n):
+    pred, truth = run_mask(runs, n), run_mask(label_runs, n)
+    tp = (pred & truth).sum()
+    return 2 * tp / max(pred.sum() + truth.sum(), 1)
+
+
+def compare(runs, label_runs, fps, n):
+    """Prints per-session boundary errors; each labelled session is matched to the run overlapping it most."""
+    print(f"\n{'#':>3} {'manual':>13} {'auto':>13} {'start err':>10} {'end err':>8} {'duration err':>13}")
+    for i, (ls, le) in enumerate(label_runs):
+        overlaps = [max(0, min(le, e) - max(ls, s)) for s, e in runs]
+        if not overlaps or max(overlaps) == 0:
+            print(f"{i + 1:>3} {ls:>6}-{le:<6} {'MISSED':>13}")
+            continue
+        s, e = runs[int(np.argmax(overlaps))]
+        dur_err = ((e - s) - (le - ls)) / fps
+        print(f"{i + 1:>3} {ls:>6}-{le:<6} {s:>6}-{e:<6} {s - ls:>+10} {e - le:>+8} {dur_err:>+12.2f}s")
+    print(f"{len(runs)} auto runs vs {len(label_runs)} tagged, frame F1 {frame_f1(runs, label_runs, n):.3f}")
+
+
+def calibrate(brightness, motion, fps, label_runs):
+    """(dark_level, motion_level) that best reproduces the tagged sessions (frame F1)."""
+    n = len(brightness)
+    inside = run_mask(label_runs, n)
+    pooled = rolling_max(motion, max(int(MOTION_WINDOW_SECONDS * fps), 1))
+    # Candidate thresholds from the distribution of both classes of frames
+    darks = np.unique(np.percentile(brightness, np.linspace(0, 30, 13)).round(1))
+    motions = np.unique(np.percentile(pooled[~inside] if (~inside).any() else pooled,
+                                      np.linspace(10, 95, 18)).round(2))
+    best = (-1.0, DARK_LEVEL, MOTION_LEVEL)
+    for dark in darks:
+        for mot in motions:
+            f1 = frame_f1(stats_runs(brightness, motion, fps, dark, mot), label_runs, n)
+            if f1 > best[0]:
+                best = (f1, float(dark), float(mot))
+    print(f"Calibrated on {len(label_runs)} tagged sessions: --dark {best[1]} --motion {best[2]} (frame F1 {best[0]:.3f})")
+    return best[1], best[2]
+
+
+def load_label_runs(path):
+    with open(path, 'r') as f:
+        return [(s['start_frame'], s['end_frame']) for s in json.load(f)['sessions']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bot survival times from gameplay recordings.")
+    parser.add_argument("videos", nargs="*", help="Default: the video of measure_survival_time.py")
+    parser.add_argument("--output", help="Output JSON (one video only)")
+    parser.add_argument("--signal", choices=["stats", "yolo"], default="stats")
+    parser.add_argument("--dark", type=float, default=DARK_LEVEL, help="stats: brightness threshold")
+    parser.add_argument("--motion", type=float, default=MOTION_LEVEL, help="stats: motion threshold")
+    parser.add_argument("--detector", default="ultralytics", help="yolo: detector backend")
+    parser.add_argument("--stride", type=int, default=STRIDE, help="yolo: frames between samples")
+    parser.add_argument("--labels", help="Hand-tagged sessions JSON to compare against (one video only)")
+    parser.add_argument("--calibrate", action="store_true", help="stats: fit --dark/--motion to --labels first")
+    args = parser.parse_args()
+
+    videos = args.videos or [measure_survival_time.VIDEO_PATH]
+    if len(videos) > 1 and (args.output or args.labels):
+        parser.error("--output / --labels need a single video")
+    if args.calibrate and (args.signal != "stats" or not args.labels):
+        parser.error("--calibrate needs --labels and the stats signal")
+
+    for video in videos:
+        if not os.path.exists(video):
+            print(f"Error: Video not found at {video}")
+            sys.exit(1)
+        t0 = time.perf_counter()
+        if args.signal == "stats":
+            brightness, motion, fps = frame_signals(video)
+            n = len(brightness)
+            dark, mot = args.dark, args.motion
+            if args.calibrate:
+                dark, mot = calibrate(brightness, motion, fps, load_label_runs(args.labels))
+            runs = stats_runs(brightness, motion, fps, dark, mot)
+        else:
+            runs, fps, n = yolo_runs(video, args.detector, args.stride)
+        elapsed = time.perf_counter() - t0
+        if not n:
+            print(f"{video}: no frames decoded, skipped")
+            continue
+
+        data = to_sessions(video, runs, fps)
+        if args.output:
+            output = args.output
+        elif video == measure_survival_time.VIDEO_PATH:
+            output = os.path.splitext(measure_survival_time.OUTPUT_FILE)[0] + "_auto.json"
+        else:
+            output = os.path.splitext(os.path.basename(video))[0] + "_survival_auto.json"
+        with open(output, "w") as f:
+            json.dump(data, f, indent=4)
+
+        durations = [s['duration_seconds'] for s in data['sessions']]
+        print(f"{video}: {len(runs)} runs, mean survival "
+              f"{np.mean(durations) if durations else 0:.2f}s -> {output}")
+        print(f"  {n / fps:.0f}s of video in {elapsed:.1f}s ({n / fps / elapsed:.1f}x real time)")
+        if args.labels:
+            compare(runs, load_label_runs(args.labels), fps, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,92 @@
+import bisect
 import cv2
 import json
 import os
 import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import seek_index
+from video_reader import open_decoder
 
 ASSIGNMENT_2_DIR = os.path.join("..", "Assignment 2", "data", "sessions")
 VIDEO_PATH = os.path.join(ASSIGNMENT_2_DIR, "Train.mp4")
 SEGMENTS_FILE = "potato_phase_segments.json"
 OUTPUT_DIR = "datasets/raw_images"
 
-NUM_FRAMES_TO_EXTRACT = 60  # Extract 60 frames total for labeling
+NUM_FRAMES_TO_EXTRACT = 60  # Extract 60 frames total for labeling (override: first CLI argument)
+
+# --- Extraction engine ---
+# Each potato segment is split into chunks of at most CHUNK_SPAN frames; chunks
+# run on a process pool, each decoding its range front to back (grab() skips the
+# frames we don't want) and handing JPEG encoding + writing to a thread pool.
+DECODE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+WRITER_THREADS = 4
+CHUNK_SPAN = 3000      # ~100 s of video per job
+MAX_GRAB_GAP = 250     # Seek instead of grabbing when the next wanted frame is further away
+JPEG_QUALITY = 95      # cv2.imwrite default
+
+
+def make_jobs(segments, selected_indices):
+    """Sorted selected frames grouped into (chunk_start, chunk_end, frames) jobs."""
+    jobs = []
+    selected = sorted(selected_indices)
+    for seg in segments:
+        for start in range(seg['start_frame'], seg['end_frame'], CHUNK_SPAN):
+            end = min(start + CHUNK_SPAN, seg['end_frame'])
+            frames = selected[bisect.bisect_left(selected, start):bisect.bisect_left(selected, end)]
+            if frames:
+                jobs.append((start, end, frames))
+    return jobs
+
+
+def extract_chunk(video_path, frames, output_dir):
+    """Decodes one chunk sequentially and writes the wanted frames. Runs in a worker process."""
+    decoder = open_decoder(video_path, seek_index.load_or_build(video_path, quiet=True))
+    params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+    in_flight = threading.BoundedSemaphore(2 * WRITER_THREADS)  # Caps decoded frames held in memory
+
+    def write(filename, frame):
+        try:
+            return cv2.imwrite(filename, frame, params)
+        finally:
+            in_flight.release()
+
+    futures = []
+    with ThreadPoolExecutor(WRITER_THREADS) as writers:
+        for idx in frames:
+            if idx - decoder.pos > MAX_GRAB_GAP or idx < decoder.pos:
+                decoder.seek(idx)
+            while decoder.pos < idx and decoder.grab():
+                pass
+            frame = decoder.read()
+            if frame is None:
+                break
+            in_flight.acquire()
+            futures.append(writers.submit(write, os.path.join(output_dir, f"frame_{idx}.jpg"), frame))
+    decoder.release()
+    return sum(f.result() for f in futures)
+
+
+def extract_frames(video_path, segments, selected_indices, output_dir, workers=DECODE_WORKERS):
+    """Runs every chunk job on a process pool. Returns the number of images written."""
+    os.makedirs(output_dir, exist_ok=True)
+    # Build (or validate) the seek index once, before the workers all need it
+    seek_index.load_or_build(video_path)
+    jobs = make_jobs(segments, selected_indices)
+    total = sum(len(frames) for _, _, frames in jobs)
+    print(f"{total} frames in {len(jobs)} chunks across {workers} decode workers...")
+
+    saved_count = 0
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(extract_chunk, video_path, frames, output_dir) for _, _, frames in jobs]
+        for future in as_completed(futures):
+            saved_count += future.result()
+            print(f"Saved {saved_count} / {total}", end='\r')
+    return saved_count
+
 
 def main():
     if not os.path.exists(SEGMENTS_FILE):
@@ -25,31 +103,19 @@ def main():
     for seg in segments:
         # Add frames from start to end of each segment
         valid_indices.extend(range(seg['start_frame'], seg['end_frame']))
-    
+
     print(f"Found {len(valid_indices)} frames belonging to Potato Phase.")
 
     # 3. Randomly sample frames
-    selected_indices = sorted(random.sample(valid_indices, min(len(valid_indices), NUM_FRAMES_TO_EXTRACT)))
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_FRAMES_TO_EXTRACT
+    selected_indices = sorted(random.sample(valid_indices, min(len(valid_indices), num_frames)))
     print(f"Selected {len(selected_indices)} frames to extract.")
 
-    # 4. Extract Images
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    cap = cv2.VideoCapture(VIDEO_PATH)
-    
-    saved_count = 0
-    for idx in selected_indices:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-        ret, frame = cap.read()
-        if ret:
-            # Save as jpg
-            filename = os.path.join(OUTPUT_DIR, f"frame_{idx}.jpg")
-            cv2.imwrite(filename, frame)
-            saved_count += 1
-            print(f"Saved {filename}", end='\r')
-    
-    cap.release()
-    print(f"\n\nDone! Saved {saved_count} images to '{OUTPUT_DIR}'")
+    # 4. Extract Images (parallel, one sequential decode per chunk)
+    t0 = time.perf_counter()
+    saved_count = extract_frames(VIDEO_PATH, segments, selected_indices, OUTPUT_DIR)
+    print(f"\n\nDone! Saved {saved_count} images to '{OUTPUT_DIR}' in {time.perf_counter() - t0:.1f}s")
     print("NEXT STEP: Upload these images to Roboflow or CVAT for labeling.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,6 +3,10 @@ import json
 import os
 import sys
 
+import utc_index
+from segment_store import SegmentStore
+from video_reader import CachedVideoReader
+
 # --- Configuration ---
 ASSIGNMENT_2_DIR = os.path.join("..", "Assignment 2", "data", "sessions")
 VIDEO_PATH = os.path.join(ASSIGNMENT_2_DIR, "Train.mp4")
@@ -10,18 +14,16 @@ FRAMES_LOG_PATH = os.path.join(ASSIGNMENT_2_DIR, "Train_frames.jsonl")
 OUTPUT_FILE = "potato_phase_segments.json"
 
 def load_utc_map(log_path):
-    """Loads timestamps."""
+    """Loads timestamps: frame -> UTC, memory-mapped from a sidecar built on first use (see utc_index.py)."""
     print(f"Loading timestamps from {log_path}...")
-    timestamps = []
-    if os.path.exists(log_path):
-        with open(log_path, 'r') as f:
-            for line in f:
-                try:
-                    data = json.loads(line)
-                    timestamps.append(data.get('t'))
-                except:
-                    timestamps.append(None)
-    return timestamps
+    return utc_index.load_or_build(log_path)
+
+def load_proposals(path):
+    """Segments proposed by auto_potato_phase.py, to review instead of tagging from scratch."""
+    with open(path, 'r') as f:
+        segments = json.load(f)['segments']
+    print(f"Loaded {len(segments)} proposed segments from {path}")
+    return sorted(segments, key=lambda s: s['start_frame'])
 
 def main():
     if not os.path.exists(VIDEO_PATH):
@@ -29,15 +31,30 @@ def main():
         sys.exit(1)
 
     utc_map = load_utc_map(FRAMES_LOG_PATH)
-    cap = cv2.VideoCapture(VIDEO_PATH)
-    base_fps = cap.get(cv2.CAP_PROP_FPS)
-    if base_fps <= 0: base_fps = 30.0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    # Decoded-frame cache + background decode around the cursor (see video_reader.py)
+    reader = CachedVideoReader(VIDEO_PATH)
+    base_fps = reader.fps
+    total_frames = reader.total_frames
 
     # State variables
     frame_idx = 0
     start_point = None # Stores {frame, utc}
-    segments = []      # Stores list of completed segments
+    # Every committed segment goes straight to the store (see segment_store.py),
+    # so a relaunch after a crash resumes where you were
+    store = SegmentStore()
+    video_key = os.path.basename(VIDEO_PATH)
+    segments = store.segments(video_key, "potato")  # Completed segments
+    if segments:
+        print(f"Resumed {len(segments)} segments of {video_key} from {store.path}")
+    # Review mode: python <this script> --proposals <auto_potato_phase.py output>
+    if '--proposals' in sys.argv:
+        if segments:
+            print("Store already has segments for this video: reviewing those, proposals ignored.")
+        else:
+            for seg in load_proposals(sys.argv[sys.argv.index('--proposals') + 1]):
+                store.add(video_key, "potato", seg['start_frame'], seg['end_frame'],
+                          seg.get('start_utc'), seg.get('end_utc'), base_fps)
+            segments = store.segments(video_key, "potato")
     
     paused = True
     speed_mult = 1.0
@@ -50,24 +67,17 @@ def main():
     print("    (This saves the segment and lets you find the next one)")
     print(" 3. Repeat for all 15 sessions.")
     print(" 4. Press [ Q ] to finish and write to file.")
+    print(" Review: [ N ] / [ B ] next / previous segment boundary,")
+    print("         [ X ] delete the segment under the cursor (then re-mark it with S / E)")
     print("="*50 + "\n")
 
     while True:
         # --- Video Logic ---
-        if need_seek:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            need_seek = False
-        
-        if not paused:
-            ret, frame = cap.read()
-            if not ret:
-                paused = True
-                frame_idx = total_frames - 1
-            else:
-                frame_idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-        else:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
+        # Playing advances one frame; after a jump, show the target frame first
+        if not paused and not need_seek:
+            frame_idx += 1
+        need_seek = False
+        frame = reader.get(frame_idx) # None past the last frame
 
         if frame is None: break
 
@@ -85,7 +95,11 @@ def main():
         
         # Segment Info
         seg_count = len(segments)
-        cv2.putText(display, f"Segments Captured: {seg_count}", (10, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        current = next((s for s in segments if s['start_frame'] <= frame_idx < s['end_frame']), None)
+        seg_txt = f"Segments Captured: {seg_count}"
+        if current:
+            seg_txt += f"  (in {current['start_frame']}-{current['end_frame']})"
+        cv2.putText(display, seg_txt, (10, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
         # Current Marking Status
         if start_point:
@@ -126,14 +140,9 @@ def main():
         elif key == ord('e'):
             if start_point:
                 if frame_idx > start_point['frame']:
-                    new_seg = {
-                        "id": seg_count + 1,
-                        "start_frame": start_point['frame'],
-                        "start_utc": start_point['utc'],
-                        "end_frame": frame_idx,
-                        "end_utc": curr_utc
-                    }
-                    segments.append(new_seg)
+                    store.add(video_key, "potato", start_point['frame'], frame_idx,
+                              start_point['utc'], curr_utc, base_fps)
+                    segments = store.segments(video_key, "potato")
                     print(f"[{seg_count+1}] CAPTURED! ({start_point['frame']} -> {frame_idx})")
                     start_point = None # Reset for next session
                     paused = True # Pause to confirm
@@ -142,6 +151,25 @@ def main():
             else:
                 print("Error: Press [S] to mark start first.")
 
+        # Review proposals: jump between boundaries / drop a wrong segment
+        elif key == ord('n') or key == ord('b'):
+            bounds = sorted({f for s in segments for f in (s['start_frame'], s['end_frame'])})
+            if key == ord('n'):
+                targets = [f for f in bounds if f > frame_idx]
+                target = targets[0] if targets else None
+            else:
+                targets = [f for f in bounds if f < frame_idx]
+                target = targets[-1] if targets else None
+            if target is not None:
+                frame_idx = min(target, total_frames - 1); need_seek = True; paused = True
+        elif key == ord('x'):
+            if current:
+                store.delete(current['db_id'])
+                segments = store.segments(video_key, "potato")
+                print(f"Deleted segment {current['start_frame']} -> {current['end_frame']}")
+            else:
+                print("Error: No segment at this frame.")
+
         # Navigation (Arrows / J / L)
         elif key == 81 or key == 2 or key == ord('j'): # Left
             frame_idx = max(0, frame_idx - 1); need_seek = True; paused = True
@@ -152,23 +180,18 @@ def main():
         elif key == ord('d'): # Fast Forward
             frame_idx = min(total_frames - 1, frame_idx + 50); need_seek = True
 
-    cap.release()
+    reader.close()
     cv2.destroyAllWindows()
 
-    # Save to JSON
+    # Save to JSON (exported from the store, same format as before)
     if segments:
-        data = {
-            "source_video": "Train.mp4",
-            "total_segments": len(segments),
-            "segments": segments
-        }
-        with open(OUTPUT_FILE, "w") as f:
-            json.dump(data, f, indent=4)
+        store.export_json(video_key, "potato", OUTPUT_FILE)
         print("\n" + "="*50)
         print(f"SAVED {len(segments)} SEGMENTS TO {OUTPUT_FILE}")
         print("="*50)
     else:
         print("Exited without saving any segments.")
+    store.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,8 +1,10 @@
 import cv2
-import json
 import os
 import sys
 
+from segment_store import SegmentStore
+from video_reader import CachedVideoReader
+
 # --- Configuration ---
 # Adjust this path if the filename is different
 VIDEO_PATH = os.path.join("CupheadAI", "[CS156] Pipeline B final gameplay.mp4")
@@ -20,15 +22,21 @@ def main():
         else:
             sys.exit(1)
 
-    cap = cv2.VideoCapture(VIDEO_PATH)
-    base_fps = cap.get(cv2.CAP_PROP_FPS)
-    if base_fps <= 0: base_fps = 30.0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    # Decoded-frame cache + background decode around the cursor (see video_reader.py)
+    reader = CachedVideoReader(VIDEO_PATH)
+    base_fps = reader.fps
+    total_frames = reader.total_frames
 
     # State variables
     frame_idx = 0
     start_point = None # Stores {frame}
-    segments = []      # Stores list of completed segments
+    # Every committed session goes straight to the store (see segment_store.py),
+    # so a relaunch after a crash resumes where you were
+    store = SegmentStore()
+    video_key = os.path.basename(VIDEO_PATH)  # Same key scheme as the potato taggers
+    segments = store.segments(video_key, "survival")  # Completed sessions
+    if segments:
+        print(f"Resumed {len(segments)} sessions of {video_key} from {store.path}")
     
     paused = True
     speed_mult = 1.0
@@ -45,20 +53,11 @@ def main():
 
     while True:
         # --- Video Logic ---
-        if need_seek:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            need_seek = False
-        
-        if not paused:
-            ret, frame = cap.read()
-            if not ret:
-                paused = True
-                frame_idx = total_frames - 1
-            else:
-                frame_idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-        else:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
+        # Playing advances one frame; after a jump, show the target frame first
+        if not paused and not need_seek:
+            frame_idx += 1
+        need_seek = False
+        frame = reader.get(frame_idx) # None past the last frame
 
         if frame is None: break
 
@@ -123,13 +122,8 @@ def main():
             if start_point:
                 if frame_idx > start_point['frame']:
                     duration_sec = (frame_idx - start_point['frame']) / base_fps
-                    new_seg = {
-                        "id": seg_count + 1,
-                        "start_frame": start_point['frame'],
-                        "end_frame": frame_idx,
-                        "duration_seconds": duration_sec
-                    }
-                    segments.append(new_seg)
+                    store.add(video_key, "survival", start_point['frame'], frame_idx, fps=base_fps)
+                    segments = store.segments(video_key, "survival")
                     print(f"[{seg_count+1}] CAPTURED! ({start_point['frame']} -> {frame_idx}) Duration: {duration_sec:.2f}s")
                     start_point = None # Reset
                     paused = True # Pause to confirm
@@ -148,23 +142,18 @@ def main():
         elif key == ord('d'): # Fast Forward
             frame_idx = min(total_frames - 1, frame_idx + 50); need_seek = True
 
-    cap.release()
+    reader.close()
     cv2.destroyAllWindows()
 
-    # Save to JSON
+    # Save to JSON (exported from the store, same format as before)
     if segments:
-        data = {
-            "source_video": VIDEO_PATH,
-            "total_sessions": len(segments),
-            "sessions": segments
-        }
-        with open(OUTPUT_FILE, "w") as f:
-            json.dump(data, f, indent=4)
+        store.export_json(video_key, "survival", OUTPUT_FILE)
         print("\n" + "="*50)
         print(f"SAVED {len(segments)} SEGMENTS TO {OUTPUT_FILE}")
         print("="*50)
     else:
         print("Exited without saving any segments.")
+    store.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,185 @@
+"""
+Persistent keyframe / seek index for gameplay recordings.
+
+OpenCV seeks by estimating a timestamp from the frame number and decoding
+forward from whatever keyframe the demuxer lands on, which is slow and not
+always frame-accurate on long MP4s. This scans the video's packets once (no
+decoding) and stores, for every frame in presentation order:
+
+    pts       presentation timestamp (stream time_base units)
+    keyframe  frame number of the keyframe to start decoding from
+    offset    byte offset of that frame's packet in the file
+
+as <video>.seekidx.npz next to the video. The index is rebuilt automatically
+when the video's size or mtime changes. video_reader.py uses it so any random
+read decodes at most one GOP.
+
+Scanning uses PyAV if installed, otherwise ffprobe.
+
+    python seek_index.py "../Assignment 2/data/sessions/Train.mp4" [--rebuild]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import time
+from fractions import Fraction
+
+import numpy as np
+
+INDEX_SUFFIX = ".seekidx.npz"
+
+
+class SeekIndex:
+    def __init__(self, pts, keyframe, offset, time_base, fps, video_size=None, video_mtime=None):
+        self.pts = np.asarray(pts, dtype=np.int64)
+        self.keyframe = np.asarray(keyframe, dtype=np.int64)
+        self.offset = np.asarray(offset, dtype=np.int64)
+        self.time_base = Fraction(time_base)
+        self.fps = float(fps)
+        self.video_size = video_size
+        self.video_mtime = video_mtime
+
+    @property
+    def frame_count(self):
+        return len(self.pts)
+
+    def keyframe_for(self, idx):
+        return int(self.keyframe[idx])
+
+    def frame_of_pts(self, pts):
+        """Frame number of a decoded frame's pts (exact match or the nearest earlier frame)."""
+        return int(np.searchsorted(self.pts, pts, side="right")) - 1
+
+    def seconds(self, idx):
+        return float((int(self.pts[idx]) - int(self.pts[0])) * self.time_base)
+
+    @property
+    def gop_sizes(self):
+        starts = np.flatnonzero(np.diff(self.keyframe, prepend=-1))
+        return np.diff(np.append(starts, self.frame_count))
+
+    # --- Build ---
+    @classmethod
+    def from_packets(cls, pts, is_key, pos, time_base, fps, video_path=None):
+        """Builds the index from per-packet (pts, keyframe flag, byte offset) in any order."""
+        order = np.argsort(pts, kind="stable")
+        pts = np.asarray(pts, dtype=np.int64)[order]
+        is_key = np.asarray(is_key, dtype=bool)[order]
+        pos = np.asarray(pos, dtype=np.int64)[order]
+        # Keyframe for frame i = last keyframe at or before it in presentation order.
+        # (Leading B-frames shown before a keyframe still decode from the previous one.)
+        keyframe = np.maximum.accumulate(np.where(is_key, np.arange(len(pts)), 0))
+        stat = os.stat(video_path) if video_path else None
+        return cls(pts, keyframe, pos, time_base, fps,
+                   stat.st_size if stat else None, stat.st_mtime if stat else None)
+
+    @classmethod
+    def scan(cls, video_path):
+        try:
+            import av
+        except ImportError:
+            return cls._scan_ffprobe(video_path)
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            pts, is_key, pos = [], [], []
+            for packet in container.demux(stream):
+                if packet.pts is None:
+                    continue  # Flush packet
+                pts.append(packet.pts)
+                is_key.append(packet.is_keyframe)
+                pos.append(packet.pos if packet.pos is not None else -1)
+            fps = float(stream.average_rate or stream.guessed_rate or 30)
+            return cls.from_packets(pts, is_key, pos, stream.time_base, fps, video_path)
+
+    @classmethod
+    def _scan_ffprobe(cls, video_path):
+        if shutil.which("ffprobe") is None:
+            raise RuntimeError("Building a seek index needs PyAV (pip install av) or ffprobe")
+        info = json.loads(subprocess.check_output(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-of", "json",
+             "-show_entries", "stream=time_base,avg_frame_rate", video_path]))["streams"][0]
+        out = subprocess.check_output(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-of", "csv=p=0",
+             "-show_entries", "packet=pts,pos,flags", video_path], text=True)
+        pts, is_key, pos = [], [], []
+        for line in out.splitlines():
+            p, offset, flags = (line.split(",") + ["", ""])[:3]
+            if p in ("", "N/A"):
+                continue
+            pts.append(int(p))
+            is_key.append("K" in flags)
+            pos.append(int(offset) if offset not in ("", "N/A") else -1)
+        fps = float(Fraction(info.get("avg_frame_rate", "30/1"))) or 30.0
+        return cls.from_packets(pts, is_key, pos, Fraction(info["time_base"]), fps, video_path)
+
+    # --- Persistence ---
+    def save(self, path):
+        np.savez(path, pts=self.pts, keyframe=self.keyframe, offset=self.offset,
+                 meta=np.array(json.dumps({
+                     "time_base": str(self.time_base), "fps": self.fps,
+                     "video_size": self.video_size, "video_mtime": self.video_mtime,
+                 })))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(data["pts"], data["keyframe"], data["offset"], Fraction(meta["time_base"]),
+                       meta["fps"], meta["video_size"], meta["video_mtime"])
+
+    def matches(self, video_path):
+        stat = os.stat(video_path)
+        return self.video_size == stat.st_size and self.video_mtime == stat.st_mtime
+
+
+def index_path(video_path):
+    return video_path + INDEX_SUFFIX
+
+
+def load_or_build(video_path, rebuild=False, quiet=False):
+    """
+    The cached index for `video_path`, (re)built if missing or stale.
+    Returns None if no demuxer is available (callers fall back to plain OpenCV seeks).
+    """
+    path = index_path(video_path)
+    if not rebuild and os.path.exists(path):
+        try:
+            index = SeekIndex.load(path)
+            if index.matches(video_path):
+                return index
+        except (OSError, ValueError, KeyError):
+            pass  # Corrupt / old format: rebuild
+    try:
+        t0 = time.perf_counter()
+        index = SeekIndex.scan(video_path)
+    except RuntimeError as e:
+        if not quiet:
+            print(f"[seek index] {e}; falling back to OpenCV seeking")
+        return None
+    try:
+        index.save(path)
+    except OSError:
+        pass  # Read-only location: still use it for this run
+    if not quiet:
+        print(f"[seek index] {os.path.basename(video_path)}: {index.frame_count} frames, "
+              f"{len(index.gop_sizes)} GOPs, built in {time.perf_counter() - t0:.1f}s")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build keyframe/seek indexes for videos.")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore an existing index")
+    args = parser.parse_args()
+    for video in args.videos:
+        index = load_or_build(video, rebuild=args.rebuild)
+        if index is not None:
+            gops = index.gop_sizes
+            print(f"{video}: {index.frame_count} frames @ {index.fps:.2f} fps, "
+                  f"GOP mean {gops.mean():.1f} / max {gops.max()} frames -> {index_path(video)}")
+
+
+if __name__ == "__main__":
+    main()
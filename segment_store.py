@@ -0,0 +1,188 @@
+"""
+Crash-safe segment store shared by the taggers.
+
+mark_potato_phase*.py and measure_survival_time.py used to keep their segments
+in memory and dump a JSON file on [Q], so a crash lost the whole session. They
+now commit every [E] (and every delete) to one SQLite database in WAL mode,
+keyed by video, segment kind and frame range, and reload it on the next launch.
+The JSON files are still written on [Q] (exported from the store) so everything
+downstream keeps reading the same formats.
+
+    kind "potato"    -> potato_phase_segments.json format (segments, start/end UTC)
+    kind "survival"  -> pipeline_*_survival.json format (sessions, duration_seconds)
+
+Deletes are soft (deleted_at is set), so the table only ever grows and any
+earlier state can be recovered.
+
+    python segment_store.py list
+    python segment_store.py import potato_phase_segments.json --kind potato
+    python segment_store.py import test_potato_segments.json --kind potato --video test.mp4
+    python segment_store.py query Train.mp4 potato 1000 5000
+    python segment_store.py export Train.mp4 potato potato_phase_segments.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+# Next to the taggers, whatever directory they are started from
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "segments.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id          INTEGER PRIMARY KEY,
+    video       TEXT    NOT NULL,
+    kind        TEXT    NOT NULL,
+    start_frame INTEGER NOT NULL,
+    end_frame   INTEGER NOT NULL,
+    start_utc   REAL,
+    end_utc     REAL,
+    fps         REAL,
+    created_at  REAL    NOT NULL,
+    deleted_at  REAL
+);
+CREATE INDEX IF NOT EXISTS segments_start ON segments (video, kind, start_frame);
+CREATE INDEX IF NOT EXISTS segments_end ON segments (video, kind, end_frame);
+"""
+
+LIVE = "deleted_at IS NULL"
+
+
+class SegmentStore:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")  # A committed [E] survives a crash of the whole machine
+        self.db.executescript(SCHEMA)
+
+    # --- Writes (each one its own transaction) ---
+    def add(self, video, kind, start_frame, end_frame, start_utc=None, end_utc=None, fps=None):
+        """Persists one segment right away. Returns its store id."""
+        with self.db:
+            cur = self.db.execute(
+                "INSERT INTO segments (video, kind, start_frame, end_frame, start_utc, end_utc, fps, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (video, kind, int(start_frame), int(end_frame), start_utc, end_utc, fps, time.time()))
+        return cur.lastrowid
+
+    def delete(self, segment_id):
+        with self.db:
+            self.db.execute(f"UPDATE segments SET deleted_at = ? WHERE id = ? AND {LIVE}", (time.time(), segment_id))
+
+    # --- Reads ---
+    def segments(self, video, kind):
+        """Live segments of one video, by start frame, as dicts (store id in 'db_id')."""
+        rows = self.db.execute(
+            f"SELECT * FROM segments WHERE video = ? AND kind = ? AND {LIVE} ORDER BY start_frame, id",
+            (video, kind))
+        return [_to_dict(row) for row in rows]
+
+    def overlapping(self, video, kind, lo, hi):
+        """Live segments intersecting frames [lo, hi)."""
+        rows = self.db.execute(
+            f"SELECT * FROM segments WHERE video = ? AND kind = ? AND {LIVE} "
+            "AND start_frame < ? AND end_frame > ? ORDER BY start_frame, id",
+            (video, kind, int(hi), int(lo)))
+        return [_to_dict(row) for row in rows]
+
+    def videos(self):
+        """(video, kind, live segment count) for everything in the store."""
+        return [tuple(row) for row in self.db.execute(
+            f"SELECT video, kind, COUNT(*) FROM segments WHERE {LIVE} GROUP BY video, kind ORDER BY video, kind")]
+
+    # --- JSON compatibility ---
+    def to_json(self, video, kind):
+        """The dict the taggers used to dump for this video."""
+        segments = self.segments(video, kind)
+        if kind == "survival":
+            sessions = [{
+                "id": i + 1,
+                "start_frame": s["start_frame"],
+                "end_frame": s["end_frame"],
+                "duration_seconds": (s["end_frame"] - s["start_frame"]) / (s["fps"] or 30.0),
+            } for i, s in enumerate(segments)]
+            return {"source_video": video, "total_sessions": len(sessions), "sessions": sessions}
+        out = [{
+            "id": i + 1,
+            "start_frame": s["start_frame"],
+            "start_utc": s["start_utc"],
+            "end_frame": s["end_frame"],
+            "end_utc": s["end_utc"],
+        } for i, s in enumerate(segments)]
+        return {"source_video": video, "total_segments": len(out), "segments": out}
+
+    def export_json(self, video, kind, path):
+        data = self.to_json(video, kind)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+        return len(data.get("segments", data.get("sessions", [])))
+
+    def import_json(self, path, kind, video=None):
+        """Loads one of the existing JSON files (under its source_video unless given). Returns (video, added)."""
+        with open(path, "r") as f:
+            data = json.load(f)
+        video = video or data["source_video"]
+        rows = data.get("segments") or data.get("sessions") or []
+        with self.db:
+            for s in rows:
+                fps = None
+                if s.get("duration_seconds"):
+                    fps = (s["end_frame"] - s["start_frame"]) / s["duration_seconds"]
+                self.db.execute(
+                    "INSERT INTO segments (video, kind, start_frame, end_frame, start_utc, end_utc, fps, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (video, kind, s["start_frame"], s["end_frame"], s.get("start_utc"), s.get("end_utc"), fps,
+                     time.time()))
+        return video, len(rows)
+
+    def close(self):
+        self.db.close()
+
+
+def _to_dict(row):
+    d = dict(row)
+    d["db_id"] = d.pop("id")
+    return d
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect / import / export the tagger segment store.")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    p = sub.add_parser("import")
+    p.add_argument("json_file")
+    p.add_argument("--kind", choices=["potato", "survival"], required=True)
+    p.add_argument("--video", help="Store under this video instead of the file's source_video")
+    p = sub.add_parser("query")
+    p.add_argument("video")
+    p.add_argument("kind")
+    p.add_argument("lo", type=int)
+    p.add_argument("hi", type=int)
+    p = sub.add_parser("export")
+    p.add_argument("video")
+    p.add_argument("kind")
+    p.add_argument("output")
+    args = parser.parse_args()
+
+    store = SegmentStore(args.db)
+    if args.command == "list":
+        for video, kind, count in store.videos():
+            print(f"{count:>5}  {kind:<9} {video}")
+    elif args.command == "import":
+        video, count = store.import_json(args.json_file, args.kind, args.video)
+        print(f"Imported {count} {args.kind} segments of {video}")
+    elif args.command == "query":
+        for s in store.overlapping(args.video, args.kind, args.lo, args.hi):
+            print(f"{s['start_frame']:>7} -> {s['end_frame']:<7} (store id {s['db_id']})")
+    elif args.command == "export":
+        count = store.export_json(args.video, args.kind, args.output)
+        print(f"Wrote {count} segments to {args.output}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Memory-mapped frame <-> UTC index for recordings.
+
+Every recording comes with a <video>_frames.jsonl log holding the wall-clock
+time ('t', UNIX seconds) of each captured frame. Parsing it with json.loads on
+every launch is slow for long sessions, so it is converted once into a float64
+.npy sidecar (<log>.utc.npy, NaN where a line was unreadable) that later runs
+memory-map instead. The sidecar is rebuilt when the log is newer than it.
+
+    index = load_or_build("Train_frames.jsonl")
+    index[frame_idx]                 # float UTC or None (drop-in for the old list)
+    index.utc_of(frames)             # vectorized frame -> UTC (NaN outside the log)
+    index.frame_of(utcs)             # vectorized UTC -> frame (binary search)
+
+frame_of() is what joins wall-clock bot logs (game_log.txt, yolo_segments.txt,
+stage timings) to video frames.
+
+    python utc_index.py "../Assignment 2/data/sessions/Train_frames.jsonl" [--frame N] [--utc T]
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+INDEX_SUFFIX = ".utc.npy"
+
+
+class UtcIndex:
+    def __init__(self, utc):
+        self.utc = utc  # float64 per frame, usually a read-only memmap
+        self._valid_frames = None
+        self._valid_utc = None
+
+    def __len__(self):
+        return len(self.utc)
+
+    @property
+    def frame_count(self):
+        return len(self.utc)
+
+    def __getitem__(self, idx):
+        """UTC of one frame as a float (None if the log line was unreadable), like the old list."""
+        t = float(self.utc[idx])
+        return None if np.isnan(t) else t
+
+    def utc_of(self, frames):
+        """Vectorized frame -> UTC. NaN for frames outside the log or with no timestamp."""
+        frames = np.asarray(frames, dtype=np.int64)
+        inside = (frames >= 0) & (frames < len(self.utc))
+        out = np.full(frames.shape, np.nan)
+        out[inside] = self.utc[frames[inside]]
+        return out
+
+    def _searchable(self):
+        if self._valid_frames is None:
+            self._valid_frames = np.flatnonzero(~np.isnan(self.utc))
+            self._valid_utc = np.asarray(self.utc[self._valid_frames])
+        return self._valid_frames, self._valid_utc
+
+    def frame_of(self, utcs, side="nearest"):
+        """
+        Vectorized UTC -> frame by binary search.
+        side="nearest": closest frame in time; "before": last frame captured at or
+        before the time (what was on screen then; -1 for times before the first frame).
+        """
+        frames, times = self._searchable()
+        utcs = np.asarray(utcs, dtype=np.float64)
+        if len(times) == 0:
+            return np.full(utcs.shape, -1, dtype=np.int64)
+        right = np.searchsorted(times, utcs, side="right")
+        before = right - 1
+        if side == "before":
+            return np.where(before >= 0, frames[np.maximum(before, 0)], -1)
+        after = np.minimum(right, len(times) - 1)
+        before = np.maximum(before, 0)
+        use_after = np.abs(times[after] - utcs) < np.abs(utcs - times[before])
+        return frames[np.where(use_after, after, before)]
+
+    def frames_between(self, start_utc, end_utc):
+        """[first, last) frames captured within [start_utc, end_utc]."""
+        frames, times = self._searchable()
+        lo = np.searchsorted(times, start_utc, side="left")
+        hi = np.searchsorted(times, end_utc, side="right")
+        if lo >= hi:
+            return 0, 0
+        return int(frames[lo]), int(frames[hi - 1]) + 1
+
+    # --- Build / persistence ---
+    @classmethod
+    def parse_log(cls, log_path):
+        utc = []
+        with open(log_path, 'r') as f:
+            for line in f:
+                try:
+                    t = json.loads(line).get('t')
+                    utc.append(float(t) if t is not None else np.nan)
+                except (ValueError, TypeError, AttributeError):
+                    utc.append(np.nan)
+        return cls(np.array(utc, dtype=np.float64))
+
+    def save(self, path):
+        np.save(path, np.asarray(self.utc, dtype=np.float64))
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(path, mmap_mode="r"))
+
+
+def index_path(log_path):
+    return log_path + INDEX_SUFFIX
+
+
+def load_or_build(log_path, rebuild=False, quiet=False):
+    """The memory-mapped index for `log_path`, (re)built if missing or older than the log."""
+    if not os.path.exists(log_path):
+        if not quiet:
+            print(f"[utc index] No frames log at {log_path}")
+        return UtcIndex(np.empty(0, dtype=np.float64))
+    path = index_path(log_path)
+    if not rebuild and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(log_path):
+        try:
+            return UtcIndex.load(path)
+        except (OSError, ValueError):
+            pass  # Corrupt sidecar: rebuild
+
+    t0 = time.perf_counter()
+    index = UtcIndex.parse_log(log_path)
+    times = index.utc[~np.isnan(index.utc)]
+    if np.any(np.diff(times) < 0) and not quiet:
+        print(f"[utc index] Warning: timestamps in {log_path} are not monotonic; UTC -> frame is approximate")
+    try:
+        index.save(path)
+        index = UtcIndex.load(path)
+    except OSError:
+        pass  # Read-only location: keep the in-memory array
+    if not quiet:
+        print(f"[utc index] {os.path.basename(log_path)}: {index.frame_count} frames, "
+              f"built in {time.perf_counter() - t0:.2f}s -> {path}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build / query the frame <-> UTC index of a frames log.")
+    parser.add_argument("log", help="<video>_frames.jsonl")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--frame", type=int, nargs="*", default=[], help="Frames to look up")
+    parser.add_argument("--utc", type=float, nargs="*", default=[], help="UNIX times to look up")
+    args = parser.parse_args()
+
+    index = load_or_build(args.log, rebuild=args.rebuild)
+    if index.frame_count:
+        span = index.utc_of([0, index.frame_count - 1])
+        print(f"{index.frame_count} frames, {span[0]:.3f} -> {span[1]:.3f} ({span[1] - span[0]:.1f}s)")
+
+    # Launch cost: parsing the log (old load_utc_map) vs mapping the sidecar
+    t0 = time.perf_counter()
+    UtcIndex.parse_log(args.log)
+    t1 = time.perf_counter()
+    load_or_build(args.log, quiet=True)
+    t2 = time.perf_counter()
+    print(f"load: parse jsonl {(t1 - t0) * 1000:.1f} ms, mmap sidecar {(t2 - t1) * 1000:.2f} ms")
+
+    for f, t in zip(args.frame, index.utc_of(args.frame)):
+        print(f"frame {f} -> {t:.6f}")
+    for t, f in zip(args.utc, index.frame_of(args.utc)):
+        print(f"utc {t:.6f} -> frame {f}")
+
+
+if __name__ == "__main__":
+    main()
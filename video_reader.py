@@ -0,0 +1,316 @@
+"""
+Shared random-access video reader for the tagging scripts.
+
+cv2.VideoCapture only decodes forward: every cap.set(CAP_PROP_POS_FRAMES) goes
+back to the previous keyframe and re-decodes up to the target, which makes
+stepping backwards (or pausing) in long recordings slow. CachedVideoReader keeps
+decoded frames in an LRU cache under a memory cap, and a background thread with
+its own decoder fills the cache ahead of and behind the cursor, so stepping,
+playing and +/-50 jumps are served from memory.
+
+    reader = CachedVideoReader(VIDEO_PATH, cache_mb=1024)
+    frame = reader.get(frame_idx)   # BGR, read-only; None past the end
+    reader.close()
+
+Seeks go through the keyframe index of seek_index.py when one can be built. With
+PyAV installed, frames are located by pts (exact) and a cache miss decodes at
+most one GOP; with OpenCV only, the index just avoids re-seeking when the target
+is later in the GOP being decoded.
+open_decoder() gives the same uncached random access to one-off scripts, and
+stream_frames() a single front-to-back pass for whole-video analysis.
+"""
+import collections
+import threading
+
+import cv2
+
+import seek_index
+
+
+class CvDecoder:
+    """cv2.VideoCapture with index-guided seeks. get(idx) -> BGR frame or None."""
+    def __init__(self, path, index=None):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video: {path}")
+        self.index = index
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.pos = 0  # Next frame read() returns
+
+    def seek(self, idx):
+        if idx == self.pos:
+            return
+        if self.index is not None and self.index.keyframe_for(idx) <= self.pos < idx:
+            # Same GOP, ahead of us: decoding forward is cheaper than any seek
+            while self.pos < idx and self.cap.grab():
+                self.pos += 1
+            return
+        # OpenCV backs off before the target and decodes forward itself
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        self.pos = idx
+
+    def grab(self):
+        ok = self.cap.grab()
+        self.pos += 1
+        return ok
+
+    def read(self):
+        ok, frame = self.cap.read()
+        self.pos += 1
+        return frame if ok else None
+
+    def get(self, idx):
+        self.seek(idx)
+        return self.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class AvDecoder:
+    """PyAV decoding located by pts through the index: frame-exact random access."""
+    def __init__(self, path, index):
+        import av
+        self.container = av.open(path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        self.index = index
+        self.fps = index.fps
+        self._frames = self.container.decode(self.stream)
+        self.pos = 0
+
+    def _restart(self, key):
+        self.container.seek(int(self.index.pts[key]), stream=self.stream, backward=True)
+        self._frames = self.container.decode(self.stream)
+        self.pos = key
+
+    def _next(self):
+        """Next decoded frame at or after self.pos (skips leading frames of an open GOP)."""
+        for frame in self._frames:
+            if frame.pts is None:
+                continue
+            idx = self.index.frame_of_pts(frame.pts)
+            if idx >= self.pos:
+                self.pos = idx + 1
+                return frame
+        self.pos = self.index.frame_count
+        return None
+
+    def seek(self, idx):
+        if idx == self.pos:
+            return
+        key = self.index.keyframe_for(idx)
+        if not key <= self.pos < idx:
+            self._restart(key)
+        while self.pos < idx and self._next() is not None:
+            pass
+
+    def grab(self):
+        return self._next() is not None
+
+    def read(self):
+        frame = self._next()
+        return None if frame is None else frame.to_ndarray(format="bgr24")
+
+    def get(self, idx):
+        self.seek(idx)
+        return self.read()
+
+    def release(self):
+        self.container.close()
+
+
+def open_decoder(path, index=None):
+    """Best available random-access decoder for `path` (index from seek_index.load_or_build)."""
+    if index is not None:
+        try:
+            return AvDecoder(path, index)
+        except ImportError:
+            pass
+    return CvDecoder(path, index)
+
+
+def stream_frames(path, size=None, gray=False):
+    """
+    Yields (idx, frame) for every frame, front to back. size=(w, h) downscales;
+    with PyAV the scaling and gray conversion happen in swscale, so full-size BGR
+    frames are never materialized.
+    """
+    try:
+        import av
+    except ImportError:
+        av = None
+    if av is not None:
+        with av.open(path) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            w, h = size if size else (None, None)
+            fmt = "gray" if gray else "bgr24"
+            for idx, frame in enumerate(container.decode(stream)):
+                yield idx, frame.reformat(width=w, height=h, format=fmt,
+                                          interpolation="AREA" if size else None).to_ndarray()
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {path}")
+    idx = 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if size:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if gray:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        yield idx, frame
+        idx += 1
+    cap.release()
+
+
+class CachedVideoReader:
+    """
+    cache_mb: memory cap for decoded frames.
+    ahead / behind: frames around the cursor the prefetcher keeps decoded
+                    (trimmed so the window always fits in the cache).
+    """
+    def __init__(self, path, cache_mb=1024, ahead=90, behind=60, prefetch=True, use_index=True):
+        self.path = path
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video: {path}")
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        if self.fps <= 0: self.fps = 30.0
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+
+        self.index = seek_index.load_or_build(path) if use_index else None
+        if self.index is not None:
+            self.total_frames = self.index.frame_count  # Exact, unlike CAP_PROP_FRAME_COUNT
+        self.decoder = open_decoder(path, self.index)
+
+        self.cache_bytes = int(cache_mb * 1024 * 1024)
+        capacity = max(self.cache_bytes // max(w * h * 3, 1), 2)
+        scale = min(1.0, 0.8 * capacity / max(ahead + behind + 1, 1))
+        self.ahead = int(ahead * scale)
+        self.behind = int(behind * scale)
+
+        self._cache = collections.OrderedDict()  # frame idx -> frame, oldest use first
+        self._used_bytes = 0
+        self._lock = threading.Condition()
+        self._cursor = 0
+        self._generation = 0   # Bumped on every get(), wakes the prefetcher
+        self._stop = False
+        self.hits = 0
+        self.misses = 0
+
+        self._thread = None
+        if prefetch:
+            self._thread = threading.Thread(target=self._prefetch_loop, name="video-prefetch", daemon=True)
+            self._thread.start()
+
+    # --- Cache ---
+    def _put(self, idx, frame):
+        """Caller holds the lock."""
+        if idx in self._cache:
+            return
+        frame.flags.writeable = False  # Shared between callers: copy before drawing on it
+        self._cache[idx] = frame
+        self._used_bytes += frame.nbytes
+        while self._used_bytes > self.cache_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self._used_bytes -= old.nbytes
+
+    def cached(self, idx):
+        with self._lock:
+            return idx in self._cache
+
+    # --- Foreground reads ---
+    def get(self, idx):
+        """Frame `idx` (BGR, read-only), or None outside the video."""
+        if idx < 0 or idx >= self.total_frames:
+            return None
+        with self._lock:
+            self._cursor = idx
+            self._generation += 1
+            self._lock.notify_all()
+            frame = self._cache.get(idx)
+            if frame is not None:
+                self._cache.move_to_end(idx)
+                self.hits += 1
+                return frame
+            self.misses += 1
+
+        # Foreground decoder: sequential reads need no seek, others cost <= 1 GOP
+        frame = self.decoder.get(idx)
+        if frame is not None:
+            with self._lock:
+                self._put(idx, frame)
+        return frame
+
+    # --- Background prefetch ---
+    def _next_missing(self, start, end):
+        """First frame in [start, end] that is not cached, or None. Caller holds the lock."""
+        for i in range(start, end + 1):
+            if i not in self._cache:
+                return i
+        return None
+
+    def _next_range(self):
+        """(start, end) of the next run to decode around the cursor, or None. Caller holds the lock."""
+        cursor = self._cursor
+        hi = min(self.total_frames - 1, cursor + self.ahead)
+        # Ahead first: it is what playback and stepping forward need next
+        start = self._next_missing(cursor + 1, hi)
+        if start is not None:
+            return start, hi
+        start = self._next_missing(max(0, cursor - self.behind), cursor - 1)
+        if start is not None:
+            return start, cursor - 1
+        return None
+
+    def _prefetch_loop(self):
+        decoder = open_decoder(self.path, self.index)
+        while True:
+            with self._lock:
+                while not self._stop and self._next_range() is None:
+                    self._lock.wait()
+                if self._stop:
+                    break
+                start, end = self._next_range()
+                generation = self._generation
+
+            decoder.seek(start)
+            # Re-plan whenever the cursor moves (usually just continues from here)
+            while decoder.pos <= end and generation == self._generation and not self._stop:
+                pos = decoder.pos
+                if self.cached(pos):
+                    ok = decoder.grab()  # Still decoded to move on, but not converted / copied out
+                else:
+                    frame = decoder.read()
+                    ok = frame is not None
+                    if ok:
+                        with self._lock:
+                            self._put(pos, frame)
+                if not ok:
+                    with self._lock:
+                        self.total_frames = min(self.total_frames, pos)  # Frame count overestimated
+                    break
+        decoder.release()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"frames_cached": len(self._cache), "cache_mb": round(self._used_bytes / 2**20, 1),
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._stop = True
+            self._lock.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.decoder.release()